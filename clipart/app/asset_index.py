@@ -0,0 +1,247 @@
+"""
+asset_index.py — Постоянный индекс ассетов (метаданные файлов элементов).
+
+Для каждого файла хранится: имя, формат, размеры, число кадров, общая
+длительность анимации и хеш содержимого. Запись действительна, пока
+у файла не изменились размер и mtime; индекс сохраняется в
+cache/asset_index.json и переживает перезапуск — файл анализируется
+(открывается Pillow и хешируется) один раз.
+
+Индекс общий для библиотеки элементов (подсказки, фоновая индексация
+новых файлов — index_workers.AssetIndexWorker) и рендера: file_digest() и размеры оверлеев в рендере
+берутся отсюда, процессы пакетного рендера тоже читают готовый индекс.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from PIL import Image as PILImage
+
+from app.cache_dir import CACHE_DIR
+from app.gif_timeline import frame_duration_ms, gif_frame_durations
+
+_INDEX_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Запись индекса
+# ---------------------------------------------------------------------------
+@dataclass
+class AssetInfo:
+    """Метаданные одного файла ассета."""
+    path: str
+    name: str
+    format: str                 # формат по Pillow (GIF, PNG, …) или расширение
+    width: int
+    height: int
+    frame_count: int
+    duration_ms: int            # общая длительность анимации (0 — статичный)
+    digest: str                 # blake2b-128 содержимого
+    size: int
+    mtime_ns: int
+
+    @property
+    def animated(self) -> bool:
+        return self.frame_count > 1
+
+    def describe(self) -> str:
+        """Короткое описание для подсказки: «GIF · 576×576 · 9 кадров, 2.3 с»."""
+        parts = [self.format, f"{self.width}×{self.height}"]
+        if self.animated:
+            parts.append(f"{self.frame_count} кадров, {self.duration_ms / 1000:.1f} с")
+        return " · ".join(parts)
+
+
+def hash_file(path: str) -> Optional[str]:
+    """Хеш содержимого файла (blake2b, 128 бит). None — файл не читается."""
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def probe_asset(path: str, st: Optional[os.stat_result] = None) -> Optional[AssetInfo]:
+    """Анализирует файл: размеры, кадры, длительность, хеш. None — файл не читается."""
+    try:
+        st = st or os.stat(path)
+    except OSError:
+        return None
+    digest = hash_file(path)
+    if digest is None:
+        return None
+
+    fmt = Path(path).suffix.lstrip(".").upper()
+    width = height = 0
+    frame_count, duration_ms = 1, 0
+    try:
+        with PILImage.open(path) as img:
+            fmt = img.format or fmt
+            width, height = img.size
+            gif_durations = gif_frame_durations(path) if img.format == "GIF" else None
+            if gif_durations is not None:
+                # GIF — по блокам файла, без декодирования кадров
+                frame_count = len(gif_durations)
+                duration_ms = sum(gif_durations) if frame_count > 1 else 0
+            else:
+                frame_count = max(1, getattr(img, "n_frames", 1))
+                if frame_count > 1:
+                    for i in range(frame_count):
+                        img.seek(i)
+                        duration_ms += frame_duration_ms(img.info.get("duration"))
+    except Exception:
+        # Не картинка для Pillow (например, SVG) — только хеш и имя
+        pass
+
+    return AssetInfo(path=path, name=Path(path).name, format=fmt,
+                     width=int(width), height=int(height),
+                     frame_count=int(frame_count), duration_ms=int(duration_ms),
+                     digest=digest, size=st.st_size, mtime_ns=st.st_mtime_ns)
+
+
+# ---------------------------------------------------------------------------
+# Индекс
+# ---------------------------------------------------------------------------
+class AssetIndex:
+    """
+    Потокобезопасный индекс «путь → AssetInfo» с сохранением в JSON.
+
+    get() возвращает актуальную запись, при необходимости анализируя файл;
+    peek() — только уже известную (без обращения к содержимому файла).
+    Сохранение сливает записи с файлом на диске: индекс могут дополнять
+    несколько процессов (пакетный рендер).
+    """
+
+    def __init__(self, index_path: Path):
+        self._index_path = Path(index_path)
+        self._entries: Dict[str, AssetInfo] = {}
+        self._removed: Set[str] = set()
+        self._dirty = False
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    # --- Диск ---
+    def _read_disk(self) -> Dict[str, AssetInfo]:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != _INDEX_VERSION:
+            return {}
+        entries = {}
+        for key, value in data.get("assets", {}).items():
+            try:
+                entries[key] = AssetInfo(**value)
+            except TypeError:
+                continue
+        return entries
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._entries = self._read_disk()
+            self._loaded = True
+
+    def save(self) -> None:
+        """Сохраняет изменения (слияние с записями других процессов)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read_disk()
+            for key in self._removed:
+                merged.pop(key, None)
+            merged.update(self._entries)
+            self._entries = merged
+            data = {"version": _INDEX_VERSION,
+                    "assets": {k: asdict(v) for k, v in merged.items()}}
+            tmp = self._index_path.with_name(f"{self._index_path.name}.{os.getpid()}.tmp")
+            try:
+                self._index_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self._index_path)
+                self._dirty = False
+                self._removed.clear()
+            except OSError:
+                tmp.unlink(missing_ok=True)
+
+    @property
+    def dirty(self) -> bool:
+        """Есть несохранённые изменения."""
+        return self._dirty
+
+    # --- Доступ ---
+    def peek(self, path: str) -> Optional[AssetInfo]:
+        """Известная запись без проверки актуальности и без анализа файла."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._entries.get(self._key(path))
+
+    def is_fresh(self, path: str) -> bool:
+        """Есть ли актуальная запись (по размеру и mtime файла)."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        info = self.peek(path)
+        return (info is not None and info.size == st.st_size
+                and info.mtime_ns == st.st_mtime_ns)
+
+    def get(self, path: str, save: bool = True) -> Optional[AssetInfo]:
+        """
+        Актуальная запись для файла; новый или изменённый файл анализируется
+        и (при save=True) индекс сразу сохраняется. None — файл не читается.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = self._key(path)
+        with self._lock:
+            self._ensure_loaded()
+            info = self._entries.get(key)
+            if info is not None and info.size == st.st_size and info.mtime_ns == st.st_mtime_ns:
+                return info
+
+        info = probe_asset(path, st)
+        if info is None:
+            return None
+        with self._lock:
+            self._entries[key] = info
+            self._removed.discard(key)
+            self._dirty = True
+        if save:
+            self.save()
+        return info
+
+    def digest(self, path: str) -> Optional[str]:
+        info = self.get(path)
+        return info.digest if info is not None else None
+
+    def forget(self, paths: List[str]) -> None:
+        """Удаляет записи файлов (например, удалённых из assets/)."""
+        with self._lock:
+            self._ensure_loaded()
+            for path in paths:
+                key = self._key(path)
+                if self._entries.pop(key, None) is not None:
+                    self._removed.add(key)
+                    self._dirty = True
+
+
+# Общий индекс процесса
+asset_index = AssetIndex(CACHE_DIR / "asset_index.json")
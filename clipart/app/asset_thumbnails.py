@@ -0,0 +1,154 @@
+"""
+asset_thumbnails.py — Иконки файлов библиотеки элементов (assets/).
+
+Иконка декодируется в пуле потоков (QThreadPool) через QImageReader сразу
+в нужном размере (JPEG уменьшается ещё при декодировании, у GIF читается
+только первый кадр) и сохраняется в cache/icons/ как PNG. Ключ кеша —
+путь, размер и mtime файла и размер иконки: повторный запуск читает
+готовые PNG 48×48 вместо исходных файлов.
+
+QImage безопасно создавать вне GUI-потока; QPixmap/QIcon из него делает
+уже получатель сигнала в GUI-потоке.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional, Set
+
+from PyQt6.QtCore import (
+    Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+)
+from PyQt6.QtGui import QImage, QImageReader
+
+from app.cache_dir import cache_subdir
+
+ICON_SIZE = 48
+# Потоков декодирования: файлы маленькие, упор в диск
+MAX_THREADS = 4
+
+_ICON_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Кеш на диске
+# ---------------------------------------------------------------------------
+def _cache_path(path: str, size: int) -> Optional[Path]:
+    """Путь к PNG в кеше; None — файл недоступен."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    ident = (str(Path(path).resolve()), st.st_size, st.st_mtime_ns, size, _ICON_VERSION)
+    name = hashlib.blake2b(repr(ident).encode("utf-8"), digest_size=16).hexdigest()
+    return cache_subdir("icons") / f"{name}.png"
+
+
+def build_asset_thumbnail(path: str, size: int = ICON_SIZE) -> Optional[QImage]:
+    """Декодирует файл сразу в размер не больше size×size (с пропорциями)."""
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    src = reader.size()
+    if src.isValid() and (src.width() > size or src.height() > size):
+        reader.setScaledSize(src.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio))
+    img = reader.read()
+    if img.isNull():
+        return None
+    if img.width() > size or img.height() > size:
+        # Формат без размера в заголовке (например, SVG без viewBox)
+        img = img.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                         Qt.TransformationMode.SmoothTransformation)
+    return img
+
+
+def get_asset_thumbnail(path: str, size: int = ICON_SIZE) -> Optional[QImage]:
+    """Иконка из кеша или новая (с сохранением в кеш). None — файл не читается."""
+    cache_path = _cache_path(path, size)
+    if cache_path is not None and cache_path.exists():
+        img = QImage(str(cache_path))
+        if not img.isNull():
+            return img
+
+    img = build_asset_thumbnail(path, size)
+    if img is not None and cache_path is not None:
+        tmp = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.png")
+        try:
+            if img.save(str(tmp), "PNG"):
+                os.replace(tmp, cache_path)
+        except OSError:
+            pass
+        finally:
+            if tmp.exists():
+                tmp.unlink(missing_ok=True)
+    return img
+
+
+# ---------------------------------------------------------------------------
+# Фоновая загрузка
+# ---------------------------------------------------------------------------
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(str, object)      # путь, QImage или None
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, path: str, size: int, signals: _ThumbnailSignals):
+        super().__init__()
+        self._path = path
+        self._size = size
+        self._signals = signals
+
+    def run(self):
+        try:
+            img = get_asset_thumbnail(self._path, self._size)
+        except Exception:
+            img = None
+        self._signals.done.emit(self._path, img)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Очередь декодирования иконок в собственном QThreadPool.
+    request() не блокирует; готовая иконка приходит сигналом
+    thumbnail_ready(путь, QImage или None) в GUI-потоке.
+    """
+
+    thumbnail_ready = pyqtSignal(str, object)
+
+    def __init__(self, size: int = ICON_SIZE, parent=None):
+        super().__init__(parent)
+        self._size = size
+        self._pending: Set[str] = set()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, min(MAX_THREADS,
+                                                QThreadPool.globalInstance().maxThreadCount())))
+        self._signals = _ThumbnailSignals(self)
+        self._signals.done.connect(self._on_done)
+
+    @property
+    def icon_size(self) -> QSize:
+        return QSize(self._size, self._size)
+
+    def request(self, path: str) -> None:
+        """Поставить файл в очередь (повторный запрос того же файла игнорируется)."""
+        if path in self._pending:
+            return
+        self._pending.add(path)
+        self._pool.start(_ThumbnailTask(path, self._size, self._signals))
+
+    def cancel(self) -> None:
+        """Убрать из очереди ещё не начатые задачи."""
+        self._pool.clear()
+        self._pending.clear()
+
+    def shutdown(self) -> None:
+        """Отменить очередь и дождаться выполняющихся задач (при закрытии окна)."""
+        self.cancel()
+        self._pool.waitForDone()
+
+    def _on_done(self, path: str, img) -> None:
+        if path not in self._pending:
+            return          # запрос отменён (библиотека перечитана)
+        self._pending.discard(path)
+        self.thumbnail_ready.emit(path, img)
@@ -0,0 +1,26 @@
+"""
+cache_dir.py — Папка для кешей приложения (индексы, миниатюры).
+
+Кеш лежит в cache/ в корне проекта (рядом с assets/ и outputs/),
+его можно безопасно удалить целиком — всё пересоздаётся автоматически.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "cache"
+
+
+def cache_subdir(name: str) -> Path:
+    """Возвращает (и при необходимости создаёт) подпапку кеша."""
+    path = CACHE_DIR / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def path_key(path: str) -> str:
+    """Короткий ключ для имени файла кеша по абсолютному пути."""
+    norm = str(Path(path).resolve()).lower()
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=12).hexdigest()
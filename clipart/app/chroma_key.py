@@ -0,0 +1,218 @@
+"""
+chroma_key.py — Удаление фона по цвету углов (общий движок превью и рендера).
+
+Алгоритм прежний: цвет фона — медиана пикселей четырёх углов, пиксели
+ближе tolerance к нему становятся прозрачными, с плавным краем шириной
+0.3·tolerance. Реализация целочисленная:
+  • квадрат расстояния d² = Σ (c − bg_c)² считается через три таблицы
+    (256 значений на канал) — без float и np.sqrt на каждый пиксель;
+  • множитель альфы берётся из таблицы «d² → k» (одна на tolerance);
+  • для палитровых кадров (индексы + палитра) всё считается
+    для 256 цветов палитры, а кадр получается одной выборкой по индексам.
+
+ChromaKeyEngine оценивает фон и d² один раз на ассет, а результат кеширует
+по (ключ ассета, tolerance): смена допуска в свойствах элемента — это
+только выборка из таблицы по готовым d², без повторного анализа кадров.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from app.overlay_cache import OverlayAssetCache
+
+# Максимальный квадрат расстояния в RGB: 3·255²
+MAX_DIST2 = 3 * 255 * 255
+
+
+# ---------------------------------------------------------------------------
+# Цвет фона
+# ---------------------------------------------------------------------------
+def _corner_pixels(arr: np.ndarray) -> np.ndarray:
+    """Пиксели четырёх угловых квадратов (до 4×4) одним массивом."""
+    h, w = arr.shape[:2]
+    corner_size = max(1, min(4, h // 10, w // 10))
+    corners = []
+    for cy, cx in [(0, 0), (0, w - corner_size), (h - corner_size, 0),
+                   (h - corner_size, w - corner_size)]:
+        patch = arr[cy:cy + corner_size, cx:cx + corner_size]
+        corners.append(patch.reshape((-1,) + arr.shape[2:]))
+    return np.concatenate(corners, axis=0)
+
+
+def estimate_background(arr: np.ndarray) -> np.ndarray:
+    """Медианный цвет угловых пикселей (RGB, int32)."""
+    bg = np.median(_corner_pixels(arr)[:, :3], axis=0)
+    return np.rint(bg).astype(np.int32)
+
+
+def estimate_background_indexed(indices: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """Цвет фона по углам палитрового кадра (индексы H×W, палитра N×4)."""
+    bg = np.median(palette[_corner_pixels(indices)][:, :3], axis=0)
+    return np.rint(bg).astype(np.int32)
+
+
+# ---------------------------------------------------------------------------
+# Целочисленное расстояние и таблицы
+# ---------------------------------------------------------------------------
+def distance2(rgb: np.ndarray, bg: np.ndarray) -> np.ndarray:
+    """Квадрат расстояния каждого пикселя до bg (H×W, int32)."""
+    levels = np.arange(256, dtype=np.int32)
+    d2 = ((levels - bg[0]) ** 2)[rgb[:, :, 0]]
+    d2 += ((levels - bg[1]) ** 2)[rgb[:, :, 1]]
+    d2 += ((levels - bg[2]) ** 2)[rgb[:, :, 2]]
+    return d2
+
+
+@lru_cache(maxsize=16)
+def alpha_factor_lut(tolerance: int) -> np.ndarray:
+    """
+    Таблица «d² → множитель альфы k» (0‥256, uint16):
+    новая альфа = (a·k + 128) >> 8.
+    """
+    d = np.sqrt(np.arange(MAX_DIST2 + 1, dtype=np.float64))
+    edge_zone = tolerance * 0.3
+    soft = np.clip((d - tolerance + edge_zone) / max(edge_zone, 1), 0, 1)
+    lut = np.rint(soft * 256).astype(np.uint16)
+    lut.setflags(write=False)
+    return lut
+
+
+def apply_alpha(arr: np.ndarray, d2: np.ndarray, tolerance: int) -> np.ndarray:
+    """Новый RGBA-массив: альфа умножена на множитель по d²."""
+    if arr.shape[2] == 4:
+        out = arr.copy()          # сплошное копирование быстрее поканального
+    else:
+        h, w = arr.shape[:2]
+        out = np.empty((h, w, 4), dtype=np.uint8)
+        out[:, :, :3] = arr
+    k = alpha_factor_lut(tolerance)[d2]
+    if arr.shape[2] == 4:
+        k *= arr[:, :, 3]
+    else:
+        k *= 255
+    k += 128
+    k >>= 8
+    out[:, :, 3] = k
+    return out
+
+
+def remove_background(arr: np.ndarray, tolerance: int = 40,
+                      bg: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Удаляет фон из RGB/RGBA-массива (H, W, 3|4) без кеширования.
+    bg — заранее оценённый цвет фона (иначе — по углам этого кадра).
+    Возвращает RGBA (H, W, 4).
+    """
+    if arr.ndim != 3 or arr.shape[2] < 3:
+        return arr
+    if bg is None:
+        bg = estimate_background(arr)
+    return apply_alpha(arr, distance2(arr, bg), tolerance)
+
+
+# ---------------------------------------------------------------------------
+# Палитровые кадры
+# ---------------------------------------------------------------------------
+def key_palette(palette: np.ndarray, tolerance: int, bg: np.ndarray) -> np.ndarray:
+    """Палитра N×4 RGBA с альфой, умноженной по расстоянию до фона."""
+    return apply_alpha(palette[np.newaxis], distance2(palette[np.newaxis], bg),
+                       tolerance)[0]
+
+
+def remove_background_indexed(indices: np.ndarray, palette: np.ndarray,
+                              tolerance: int, bg: np.ndarray) -> np.ndarray:
+    """
+    Удаление фона для кадра в виде индексов палитры.
+    palette — (N, 4) RGBA uint8. Считается N цветов вместо H×W пикселей.
+    """
+    keyed = key_palette(palette, tolerance, bg)
+    # Выборка 4-байтовых цветов одним словом uint32 вместо поканальной
+    packed = np.ascontiguousarray(keyed).view(np.uint32).reshape(-1)
+    return np.take(packed, indices).view(np.uint8).reshape(indices.shape + (4,))
+
+
+# ---------------------------------------------------------------------------
+# Движок с кешем
+# ---------------------------------------------------------------------------
+class ChromaKeyEngine:
+    """
+    Удаление фона для ассетов с кешированием.
+
+    asset_key — ключ содержимого (например, хеш файла + вид ассета);
+    None отключает кеш. Фон оценивается по первому кадру ассета.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        # d² пикселей до фона — один раз на содержимое ассета
+        self._prepared = OverlayAssetCache(max_bytes // 2)
+        # Готовые кадры на (ассет, tolerance)
+        self._results = OverlayAssetCache(max_bytes // 2)
+
+    def key_frames(self, asset_key: Optional[Hashable], frames: Sequence[np.ndarray],
+                   tolerance: int) -> List[np.ndarray]:
+        """RGB/RGBA-кадры ассета → RGBA-кадры с удалённым фоном."""
+        frames = [f for f in frames if f.ndim == 3 and f.shape[2] >= 3]
+        if not frames:
+            return []
+        if asset_key is None:
+            bg = estimate_background(frames[0])
+            return [remove_background(f, tolerance, bg) for f in frames]
+
+        def build_prepared():
+            bg = estimate_background(frames[0])
+            return [distance2(f, bg) for f in frames]
+
+        def build_result():
+            d2 = self._prepared.get_or_build(("rgba", asset_key), build_prepared)
+            return [apply_alpha(f, d, tolerance) for f, d in zip(frames, d2)]
+
+        return self._results.get_or_build(("rgba", asset_key, tolerance), build_result)
+
+    def key_palettes(self, asset_key: Optional[Hashable], first_indices: np.ndarray,
+                     palettes: Sequence[np.ndarray], tolerance: int) -> List[np.ndarray]:
+        """
+        Палитры кадров с удалённым фоном (фон — по углам первого кадра
+        first_indices). Кадры разворачиваются в RGBA по этим палитрам
+        отдельно и только по мере надобности.
+        """
+        def build():
+            bg = estimate_background_indexed(first_indices, palettes[0])
+            return [key_palette(pal, tolerance, bg) for pal in palettes]
+
+        if asset_key is None:
+            return build()
+        return self._results.get_or_build(("palettes", asset_key, tolerance), build)
+
+    def key_indexed(self, asset_key: Optional[Hashable], indices: Sequence[np.ndarray],
+                    palettes: Sequence[np.ndarray], tolerance: int) -> List[np.ndarray]:
+        """
+        Палитровые кадры (индексы H×W + палитра N×4 RGBA на кадр) →
+        RGBA-кадры с удалённым фоном. Фон — по углам первого кадра.
+        """
+        if not indices:
+            return []
+
+        def build_result():
+            bg = estimate_background_indexed(indices[0], palettes[0])
+            return [remove_background_indexed(idx, pal, tolerance, bg)
+                    for idx, pal in zip(indices, palettes)]
+
+        if asset_key is None:
+            return build_result()
+        return self._results.get_or_build(("indexed", asset_key, tolerance), build_result)
+
+    def clear(self) -> None:
+        self._prepared.clear()
+        self._results.clear()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._prepared.size_bytes + self._results.size_bytes
+
+
+# Общий движок процесса (превью и рендер)
+chroma_key = ChromaKeyEngine()
@@ -0,0 +1,193 @@
+"""
+compositor.py — Композиция оверлеев поверх кадра видео (numpy).
+
+Каждый оверлей хранится один раз как uint8 RGBA с предумноженной альфой
+(premultiplied) — вместо пары «RGB-клип + float64-маска» MoviePy.
+Смешивание выполняется целочисленно и только в пределах
+прямоугольника оверлея:
+
+    dst = src_rgb·k + dst·(255 − src_a·k) / 255,   k = прозрачность с учётом fade
+
+FrameCompositor держит один буфер кадра и временные буферы на каждый слой:
+за кадр фон копируется в буфер, а активные слои пишутся на месте в свои
+срезы (pos_x, pos_y, w, h) — без промежуточных полнокадровых массивов.
+Неактивные элементы отсекаются по отсортированным временам начала.
+
+Используется в render_project вместо CompositeVideoClip.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.gif_timeline import GifTimeline
+from app.models import OverlayElement
+
+
+# ---------------------------------------------------------------------------
+# Предумножение альфы
+# ---------------------------------------------------------------------------
+def premultiply_rgba(arr: np.ndarray) -> np.ndarray:
+    """RGBA (uint8, обычная альфа) → RGBA с предумноженной альфой (uint8)."""
+    arr = np.asarray(arr, dtype=np.uint8)
+    if arr.ndim == 2:
+        arr = np.dstack([arr, arr, arr])
+    if arr.shape[2] == 3:
+        alpha = np.full(arr.shape[:2] + (1,), 255, dtype=np.uint8)
+        return np.ascontiguousarray(np.concatenate([arr, alpha], axis=2))
+
+    out = np.empty(arr.shape[:2] + (4,), dtype=np.uint8)
+    a = arr[:, :, 3:4].astype(np.uint16)
+    rgb = arr[:, :, :3].astype(np.uint16) * a
+    out[:, :, :3] = (rgb + 127) // 255
+    out[:, :, 3:4] = arr[:, :, 3:4]
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Смешивание одного оверлея
+# ---------------------------------------------------------------------------
+def blend_premultiplied(dst: np.ndarray, src: np.ndarray, opacity: float,
+                        scratch: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> None:
+    """
+    Смешивает предумноженный RGBA *src* поверх RGB *dst* на месте.
+    dst и src — одинакового размера (H×W×3 и H×W×4, uint8).
+    scratch — пара буферов uint16 (H×W×4, H×W×3) для повторного
+    использования между кадрами; без него буферы выделяются заново.
+    """
+    k = int(round(opacity * 256))
+    if k <= 0:
+        return
+
+    if scratch is None:
+        src16 = src.astype(np.uint16)
+        acc = dst.astype(np.uint16)
+    else:
+        src16, acc = scratch
+        np.copyto(src16, src)
+        np.copyto(acc, dst)
+
+    if k < 256:
+        src16 *= k
+        src16 += 128
+        src16 >>= 8
+
+    # dst·(255 − a) / 255 с округлением: (x + 128 + ((x + 128) >> 8)) >> 8
+    acc *= 255 - src16[:, :, 3:4]
+    acc += 128
+    acc += acc >> 8
+    acc >>= 8
+    acc += src16[:, :, :3]
+    np.copyto(dst, acc, casting="unsafe")
+
+
+# ---------------------------------------------------------------------------
+# Слой оверлея
+# ---------------------------------------------------------------------------
+@dataclass
+class OverlayLayer:
+    """Подготовленный оверлей: позиция, предумноженные кадры, временная шкала."""
+
+    elem: OverlayElement
+    x: int
+    y: int
+    frames: List[np.ndarray]                 # H×W×4 uint8, предумноженная альфа
+    timeline: Optional[GifTimeline] = None   # None — статичное изображение
+
+    @property
+    def width(self) -> int:
+        return self.frames[0].shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.frames[0].shape[0]
+
+    def frame_at(self, t: float) -> np.ndarray:
+        """Кадр оверлея в момент *t* (время видео, секунды)."""
+        if self.timeline is None or len(self.frames) == 1:
+            return self.frames[0]
+        idx = self.timeline.index_at(t - self.elem.start_time)
+        return self.frames[min(idx, len(self.frames) - 1)]
+
+
+def make_layer(elem: OverlayElement, x: int, y: int, rgba_frames: List[np.ndarray],
+               durations: Optional[List[float]] = None) -> OverlayLayer:
+    """
+    Создаёт слой из RGBA-кадров (обычная альфа).
+    durations — длительности кадров в секундах (для анимации).
+    """
+    frames = [premultiply_rgba(f) for f in rgba_frames]
+    timeline = None
+    if durations and len(frames) > 1:
+        timeline = GifTimeline([d * 1000.0 for d in durations])
+    return OverlayLayer(elem, x, y, frames, timeline)
+
+
+# ---------------------------------------------------------------------------
+# Компоновщик с повторно используемыми буферами
+# ---------------------------------------------------------------------------
+class FrameCompositor:
+    """
+    Накладывает слои на кадры видео размера width×height.
+
+    Прямоугольники слоёв обрезаются по кадру один раз при создании;
+    слои целиком за пределами кадра отбрасываются. Возвращаемый кадр —
+    внутренний буфер: он перезаписывается следующим вызовом composite().
+    """
+
+    def __init__(self, layers: List[OverlayLayer], width: int, height: int):
+        self._width = width
+        self._height = height
+        self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+        # (слой, срез в кадре, срез в слое, временные буферы) — в порядке наложения
+        self._entries = []
+        for layer in layers:
+            x0, y0 = max(layer.x, 0), max(layer.y, 0)
+            x1 = min(layer.x + layer.width, width)
+            y1 = min(layer.y + layer.height, height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            dst_sl = (slice(y0, y1), slice(x0, x1))
+            src_sl = (slice(y0 - layer.y, y1 - layer.y),
+                      slice(x0 - layer.x, x1 - layer.x))
+            h, w = y1 - y0, x1 - x0
+            scratch = (np.empty((h, w, 4), dtype=np.uint16),
+                       np.empty((h, w, 3), dtype=np.uint16))
+            self._entries.append((layer, dst_sl, src_sl, scratch))
+
+        # Индекс активности: номера слоёв, отсортированные по началу
+        self._by_start = sorted(range(len(self._entries)),
+                                key=lambda i: self._entries[i][0].elem.start_time)
+        self._starts = [self._entries[i][0].elem.start_time for i in self._by_start]
+
+    @property
+    def layer_count(self) -> int:
+        return len(self._entries)
+
+    def active_indices(self, t: float) -> List[int]:
+        """Номера слоёв, видимых в момент *t*, в порядке наложения."""
+        n = bisect_right(self._starts, t)
+        active = [i for i in self._by_start[:n]
+                  if self._entries[i][0].elem.is_visible_at(t)]
+        active.sort()
+        return active
+
+    def composite(self, background: np.ndarray, t: float) -> np.ndarray:
+        """Копирует фон в буфер и смешивает активные слои на месте."""
+        frame = self._buffer
+        np.copyto(frame, background[:self._height, :self._width, :3])
+
+        for i in self.active_indices(t):
+            layer, dst_sl, src_sl, scratch = self._entries[i]
+            opacity = layer.elem.opacity_at(t)
+            if opacity <= 0:
+                continue
+            blend_premultiplied(frame[dst_sl], layer.frame_at(t)[src_sl],
+                                opacity, scratch)
+
+        return frame
@@ -2,7 +2,7 @@
 dialogs.py — Диалоговые окна приложения.
 
   • RenderProgressDialog — прогресс рендеринга
-  • SettingsDialog       — настройки (GitHub-токен, путь к репо)
+  • SettingsDialog       — настройки (GPU, кеш превью, GitHub-токен, путь к репо)
   • AboutDialog          — информация о программе
   • GitHubUploadDialog   — прогресс выгрузки на GitHub
 """
@@ -14,12 +14,22 @@ from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QProgressBar, QFileDialog, QTextEdit,
-    QFormLayout, QGroupBox, QMessageBox, QCheckBox
+    QFormLayout, QGroupBox, QMessageBox, QCheckBox, QComboBox, QSpinBox
 )
 
 from app.github_upload import load_github_settings, save_github_settings
 from app.render_engine import (
-    check_nvenc_available, get_gpu_info, load_gpu_setting, save_gpu_setting
+    check_nvenc_available, get_gpu_info, BACKEND_MOVIEPY, BACKEND_FFMPEG,
+    MAX_BATCH_WORKERS
+)
+from app.render_workers import (
+    load_gpu_setting, save_gpu_setting, load_backend_setting, save_backend_setting,
+    load_batch_workers_setting, save_batch_workers_setting,
+    load_gpu_sessions_setting, save_gpu_sessions_setting
+)
+from app.video_preview import (
+    gif_cache, load_gif_cache_limit_setting, save_gif_cache_limit_setting,
+    GIF_CACHE_MIN_MB, GIF_CACHE_MAX_MB
 )
 
 
@@ -74,11 +84,16 @@ class RenderProgressDialog(QDialog):
         self.progress_bar.setValue(value)
         if value < 50:
             self.label.setText("Создание оверлейных клипов...")
-        elif value < 95:
+        elif value < 99:
             self.label.setText("Запись видеофайла...")
         else:
             self.label.setText("Завершение...")
 
+    def set_stats(self, stats):
+        """Ход кодирования (RenderStats): кадры, скорость, оставшееся время."""
+        self.label.setText("Запись видеофайла...")
+        self.status_label.setText(stats.describe())
+
     def set_finished(self, path: str):
         self.label.setText("✅ Рендеринг завершён!")
         self.status_label.setText(f"Сохранено: {path}")
@@ -96,12 +111,12 @@ class RenderProgressDialog(QDialog):
 # Диалог настроек
 # ---------------------------------------------------------------------------
 class SettingsDialog(QDialog):
-    """Настройки приложения: GPU-кодирование, GitHub-токен, путь к репозиторию."""
+    """Настройки приложения: GPU-кодирование, кеш превью, GitHub-токен, путь к репозиторию."""
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Настройки")
-        self.setFixedSize(560, 440)
+        self.setFixedSize(560, 660)
         self.setWindowFlags(
             self.windowFlags() & ~Qt.WindowType.WindowContextHelpButtonHint
         )
@@ -139,8 +154,74 @@ class SettingsDialog(QDialog):
         gpu_hint.setWordWrap(True)
         gpu_layout.addWidget(gpu_hint)
 
+        # Движок рендеринга
+        backend_row = QHBoxLayout()
+        backend_row.addWidget(QLabel("Движок:"))
+        self.combo_backend = QComboBox()
+        self.combo_backend.addItem("MoviePy (композиция кадров в Python)", BACKEND_MOVIEPY)
+        self.combo_backend.addItem("ffmpeg filter_complex (быстрее)", BACKEND_FFMPEG)
+        self.combo_backend.setToolTip(
+            "ffmpeg: весь проект рендерится одним процессом ffmpeg,\n"
+            "без передачи кадров через Python — заметно быстрее на 1080p/4K."
+        )
+        backend_row.addWidget(self.combo_backend, stretch=1)
+        gpu_layout.addLayout(backend_row)
+
+        # Параллельный пакетный рендер
+        batch_row = QHBoxLayout()
+        batch_row.addWidget(QLabel("Процессов (пакет):"))
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, MAX_BATCH_WORKERS)
+        self.spin_workers.setToolTip(
+            "Сколько видео рендерить одновременно в пакетном режиме.\n"
+            "1 — последовательно, как раньше."
+        )
+        batch_row.addWidget(self.spin_workers)
+        batch_row.addSpacing(16)
+        batch_row.addWidget(QLabel("NVENC-сессий:"))
+        self.spin_gpu_sessions = QSpinBox()
+        self.spin_gpu_sessions.setRange(1, MAX_BATCH_WORKERS)
+        self.spin_gpu_sessions.setToolTip(
+            "Максимум одновременных GPU-кодирований.\n"
+            "Драйвер GeForce ограничивает число сессий NVENC —\n"
+            "остальные процессы ждут освобождения слота."
+        )
+        batch_row.addWidget(self.spin_gpu_sessions)
+        batch_row.addStretch()
+        gpu_layout.addLayout(batch_row)
+
         layout.addWidget(grp_gpu)
 
+        # ================= Группа кеша превью =================
+        grp_cache = QGroupBox("Превью")
+        cache_layout = QVBoxLayout(grp_cache)
+
+        cache_row = QHBoxLayout()
+        cache_row.addWidget(QLabel("Память под кадры GIF:"))
+        self.spin_gif_cache = QSpinBox()
+        self.spin_gif_cache.setRange(GIF_CACHE_MIN_MB, GIF_CACHE_MAX_MB)
+        self.spin_gif_cache.setSingleStep(64)
+        self.spin_gif_cache.setSuffix(" МБ")
+        self.spin_gif_cache.setToolTip(
+            "Лимит памяти для декодированных GIF и готовых кадров превью.\n"
+            "При превышении давно не использованные кадры вытесняются."
+        )
+        cache_row.addWidget(self.spin_gif_cache)
+        cache_row.addStretch()
+        cache_layout.addLayout(cache_row)
+
+        stats = gif_cache.stats()
+        self.lbl_cache_stats = QLabel(
+            f"Сейчас: {stats['bytes'] / 2**20:.1f} МБ, файлов {stats['files']}, "
+            f"наборов кадров {stats['variants']} · попаданий {stats['hits']}, "
+            f"промахов {stats['misses']}, вытеснений {stats['evictions']}"
+        )
+        self.lbl_cache_stats.setStyleSheet("color: #6c7086; font-size: 11px;")
+        self.lbl_cache_stats.setWordWrap(True)
+        cache_layout.addWidget(self.lbl_cache_stats)
+
+        layout.addWidget(grp_cache)
+
         # ================= Группа GitHub =================
         grp = QGroupBox("GitHub")
         grp_layout = QFormLayout(grp)
@@ -196,11 +277,21 @@ class SettingsDialog(QDialog):
         self.edit_token.setText(settings.get("token", ""))
         self.edit_repo.setText(settings.get("repo_path", ""))
         self.chk_gpu.setChecked(load_gpu_setting())
+        idx = self.combo_backend.findData(load_backend_setting())
+        self.combo_backend.setCurrentIndex(max(0, idx))
+        self.spin_workers.setValue(load_batch_workers_setting())
+        self.spin_gpu_sessions.setValue(load_gpu_sessions_setting())
+        self.spin_gif_cache.setValue(load_gif_cache_limit_setting())
 
     def _save(self):
         save_github_settings(self.edit_token.text().strip(),
                              self.edit_repo.text().strip())
         save_gpu_setting(self.chk_gpu.isChecked())
+        save_backend_setting(self.combo_backend.currentData())
+        save_batch_workers_setting(self.spin_workers.value())
+        save_gpu_sessions_setting(self.spin_gpu_sessions.value())
+        save_gif_cache_limit_setting(self.spin_gif_cache.value())
+        gif_cache.set_max_bytes(self.spin_gif_cache.value() * 1024 * 1024)
         self.accept()
 
     def _browse_repo(self):
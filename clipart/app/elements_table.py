@@ -3,22 +3,290 @@ elements_table.py — Таблица всех наложенных элемен
 
 Показывает: #, Элемент, Начало (с), Длительность, Позиция, Действия (✎ ✕ ↑ ↓).
 Подсвечивает строки элементов, видимых в текущий момент времени.
+
+Таблица построена на модели (ElementsTableModel + QTableView):
+  • смена времени воспроизведения — dataChanged только для строк,
+    у которых изменилась видимость;
+  • добавление / удаление / перестановка элементов — вставка и удаление
+    строк (beginInsertRows / beginRemoveRows), без пересоздания таблицы;
+  • кнопки действий рисует делегат — ни одного виджета на строку.
 """
 
 from __future__ import annotations
 
-from typing import List, Optional
+from difflib import SequenceMatcher
+from typing import Any, List, Optional, Set, Tuple
 
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QColor, QBrush
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QAbstractTableModel, QModelIndex, QEvent, QRect
+)
+from PyQt6.QtGui import QColor, QBrush, QMouseEvent, QPalette
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
-    QPushButton, QHeaderView, QAbstractItemView, QFrame, QLabel
+    QVBoxLayout, QTableView, QHeaderView, QAbstractItemView, QFrame, QLabel,
+    QPushButton, QStyle, QStyleOptionButton, QStyledItemDelegate, QToolTip
 )
 
 from app.models import OverlayElement
 
+# Цвет фона строки: элемент видим / не видим в текущий момент
+_VISIBLE_BG = QBrush(QColor("#2a2d3a"))
+_HIDDEN_BG = QBrush(QColor("#1e1e2e"))
+
+
+# ---------------------------------------------------------------------------
+# Модель
+# ---------------------------------------------------------------------------
+class ElementsTableModel(QAbstractTableModel):
+    """
+    Модель таблицы элементов. Строки — элементы проекта в порядке
+    наложения; для каждой строки запоминается отображаемый снимок
+    (имя, время, позиция), чтобы сообщать только о реально изменённых строках.
+    """
+
+    COLUMNS = ["#", "Элемент", "Начало (с)", "Длительность", "Позиция", "Действия"]
+    ACTIONS_COLUMN = 5
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._elements: List[OverlayElement] = []
+        self._ids: List[str] = []
+        self._snapshots: List[Tuple] = []
+        self._visible: Set[str] = set()
+
+    # --- Доступ ---
+    def element_at(self, row: int) -> Optional[OverlayElement]:
+        if 0 <= row < len(self._elements):
+            return self._elements[row]
+        return None
+
+    def row_of(self, elem_id: Optional[str]) -> int:
+        """Номер строки элемента или -1."""
+        try:
+            return self._ids.index(elem_id)
+        except ValueError:
+            return -1
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._elements)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if (role == Qt.ItemDataRole.DisplayRole
+                and orientation == Qt.Orientation.Horizontal
+                and 0 <= section < len(self.COLUMNS)):
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= len(self._elements):
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return str(row + 1)
+            if col == self.ACTIONS_COLUMN:
+                return None
+            return self._snapshots[row][col - 1]
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return _VISIBLE_BG if self._ids[row] in self._visible else _HIDDEN_BG
+        if role == Qt.ItemDataRole.TextAlignmentRole and col != 1:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    # --- Обновление ---
+    @staticmethod
+    def _snapshot(elem: OverlayElement) -> Tuple:
+        """Отображаемые значения колонок 1‥4."""
+        return (elem.name, f"{elem.start_time:.1f}", f"{elem.duration:.1f}",
+                f"{elem.x_percent:.0f}%, {elem.y_percent:.0f}%")
+
+    def set_elements(self, elements: List[OverlayElement], visible: Set[str]) -> None:
+        """
+        Приводит модель к списку *elements*: новые / удалённые / переставленные
+        элементы — вставка и удаление строк, изменённые — dataChanged.
+        """
+        new_ids = [e.id for e in elements]
+        structure_changed = new_ids != self._ids
+        if structure_changed:
+            self._apply_structure(elements, new_ids)
+
+        # Элементы изменяются на месте — сравниваем отображаемые значения
+        self._elements = list(elements)
+        last = len(self._elements) - 1
+        for row, elem in enumerate(self._elements):
+            snap = self._snapshot(elem)
+            if snap != self._snapshots[row]:
+                self._snapshots[row] = snap
+                self.dataChanged.emit(self.index(row, 1), self.index(row, 4),
+                                      [Qt.ItemDataRole.DisplayRole])
+        self.set_visible(visible)
+        if structure_changed and last >= 0:
+            # Номера строк после вставок/удалений
+            self.dataChanged.emit(self.index(0, 0), self.index(last, 0),
+                                  [Qt.ItemDataRole.DisplayRole])
+
+    def _apply_structure(self, elements: List[OverlayElement], new_ids: List[str]) -> None:
+        """Вставка/удаление строк по разнице списков id (с конца к началу)."""
+        by_id = {e.id: e for e in elements}
+        opcodes = SequenceMatcher(a=self._ids, b=new_ids, autojunk=False).get_opcodes()
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag in ("delete", "replace"):
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                del self._elements[i1:i2]
+                del self._ids[i1:i2]
+                del self._snapshots[i1:i2]
+                self.endRemoveRows()
+            if tag in ("insert", "replace"):
+                added = [by_id[i] for i in new_ids[j1:j2]]
+                self.beginInsertRows(QModelIndex(), i1, i1 + len(added) - 1)
+                self._elements[i1:i1] = added
+                self._ids[i1:i1] = new_ids[j1:j2]
+                self._snapshots[i1:i1] = [self._snapshot(e) for e in added]
+                self.endInsertRows()
+
+    def set_visible(self, visible: Set[str]) -> None:
+        """Новый набор видимых элементов: dataChanged только для изменившихся строк."""
+        flipped = self._visible.symmetric_difference(visible)
+        self._visible = set(visible)
+        if not flipped:
+            return
+        last_col = len(self.COLUMNS) - 1
+        for row, elem_id in enumerate(self._ids):
+            if elem_id in flipped:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col),
+                                      [Qt.ItemDataRole.BackgroundRole])
+
+
+# ---------------------------------------------------------------------------
+# Делегат кнопок действий
+# ---------------------------------------------------------------------------
+class ElementActionsDelegate(QStyledItemDelegate):
+    """
+    Рисует кнопки ✎ ✕ ↑ ↓ в колонке «Действия» и обрабатывает нажатия.
+    Кнопки рисуются стилем QPushButton (с учётом QSS приложения)
+    через скрытые образцы-виджеты.
+    """
+
+    # (текст, подсказка, действие)
+    ACTIONS = [
+        ("✎", "Выбрать / Редактировать", "edit"),
+        ("✕", "Удалить", "delete"),
+        ("↑", "Переместить выше", "up"),
+        ("↓", "Переместить ниже", "down"),
+    ]
+    BUTTON_SIZE = 28
+    SPACING = 4
+    MARGIN = 2
 
+    action_triggered = pyqtSignal(int, str)      # строка, действие
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Образцы для QSS: обычная кнопка и кнопка удаления
+        self._sample = QPushButton()
+        self._sample_delete = QPushButton()
+        self._sample_delete.setStyleSheet("color: #f38ba8;")
+        self._sample.ensurePolished()
+        self._sample_delete.ensurePolished()
+        self._hover: Optional[Tuple[int, int]] = None     # (строка, кнопка)
+        self._pressed: Optional[Tuple[int, int]] = None
+
+    def _button_rects(self, cell: QRect) -> List[QRect]:
+        size = self.BUTTON_SIZE
+        top = cell.top() + max(self.MARGIN, (cell.height() - size) // 2)
+        left = cell.left() + self.MARGIN
+        return [QRect(left + i * (size + self.SPACING), top, size, size)
+                for i in range(len(self.ACTIONS))]
+
+    def _button_at(self, cell: QRect, pos) -> int:
+        for i, rect in enumerate(self._button_rects(cell)):
+            if rect.contains(pos):
+                return i
+        return -1
+
+    def sizeHint(self, option, index):
+        hint = super().sizeHint(option, index)
+        n = len(self.ACTIONS)
+        width = 2 * self.MARGIN + n * self.BUTTON_SIZE + (n - 1) * self.SPACING
+        hint.setWidth(max(hint.width(), width))
+        hint.setHeight(max(hint.height(), self.BUTTON_SIZE + 2 * self.MARGIN))
+        return hint
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        row = index.row()
+        for i, rect in enumerate(self._button_rects(option.rect)):
+            text, _, action = self.ACTIONS[i]
+            sample = self._sample_delete if action == "delete" else self._sample
+            opt = QStyleOptionButton()
+            opt.initFrom(sample)
+            opt.rect = rect
+            opt.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+            if self._hover == (row, i):
+                opt.state |= QStyle.StateFlag.State_MouseOver
+            if self._pressed == (row, i):
+                opt.state |= QStyle.StateFlag.State_Sunken
+            sample.style().drawControl(QStyle.ControlElement.CE_PushButtonBevel,
+                                       opt, painter, sample)
+            # Текст по центру сами: отступы QSS у кнопки 28×28 его обрезают
+            painter.save()
+            painter.setPen(opt.palette.color(QPalette.ColorRole.ButtonText))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+            painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        etype = event.type()
+        if etype not in (QEvent.Type.MouseMove, QEvent.Type.MouseButtonPress,
+                         QEvent.Type.MouseButtonRelease,
+                         QEvent.Type.MouseButtonDblClick):
+            return False
+        if not isinstance(event, QMouseEvent):
+            return False
+        button = self._button_at(option.rect, event.position().toPoint())
+        key = (index.row(), button) if button >= 0 else None
+        view = self.parent()
+
+        if etype == QEvent.Type.MouseMove:
+            if key != self._hover:
+                self._hover = key
+                if view is not None:
+                    view.viewport().update()
+            return False
+        if event.button() != Qt.MouseButton.LeftButton or key is None:
+            return False
+        if etype in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonDblClick):
+            self._pressed = key
+            if view is not None:
+                view.viewport().update()
+            return True
+        # Отпускание: действие, если нажатие было на той же кнопке
+        pressed, self._pressed = self._pressed, None
+        if view is not None:
+            view.viewport().update()
+        if pressed == key:
+            self.action_triggered.emit(index.row(), self.ACTIONS[button][2])
+        return True
+
+    def helpEvent(self, event, view, option, index):
+        if event.type() == QEvent.Type.ToolTip:
+            button = self._button_at(option.rect, event.pos())
+            if button >= 0:
+                QToolTip.showText(event.globalPos(), self.ACTIONS[button][1], view)
+                return True
+        return super().helpEvent(event, view, option, index)
+
+    def clear_hover(self) -> None:
+        self._hover = None
+        self._pressed = None
+
+
+# ---------------------------------------------------------------------------
+# Панель с таблицей
+# ---------------------------------------------------------------------------
 class ElementsTableWidget(QFrame):
     """
     Таблица со списком всех наложенных элементов.
@@ -30,7 +298,7 @@ class ElementsTableWidget(QFrame):
     element_move_up = pyqtSignal(str)            # id
     element_move_down = pyqtSignal(str)          # id
 
-    COLUMNS = ["#", "Элемент", "Начало (с)", "Длительность", "Позиция", "Действия"]
+    COLUMNS = ElementsTableModel.COLUMNS
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -47,8 +315,9 @@ class ElementsTableWidget(QFrame):
         layout.addWidget(title)
 
         # Таблица
-        self.table = QTableWidget(0, len(self.COLUMNS))
-        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.model = ElementsTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.ResizeToContents
@@ -60,98 +329,70 @@ class ElementsTableWidget(QFrame):
         self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.verticalHeader().setVisible(False)
-        self.table.cellClicked.connect(self._on_cell_clicked)
+        self.table.verticalHeader().setDefaultSectionSize(
+            ElementActionsDelegate.BUTTON_SIZE + 2 * ElementActionsDelegate.MARGIN
+        )
+        self.table.setMouseTracking(True)
+        self.table.clicked.connect(self._on_clicked)
 
-        layout.addWidget(self.table)
+        self._actions = ElementActionsDelegate(self.table)
+        self._actions.action_triggered.connect(self._on_action)
+        self.table.setItemDelegateForColumn(ElementsTableModel.ACTIONS_COLUMN,
+                                            self._actions)
 
-        self._elements: List[OverlayElement] = []
+        layout.addWidget(self.table)
 
-    def update_elements(self, elements: List[OverlayElement], current_time: float = 0.0):
-        """Полностью перестроить таблицу из списка элементов."""
-        self._elements = elements
-        self.table.setRowCount(len(elements))
-
-        for row, elem in enumerate(elements):
-            visible = elem.is_visible_at(current_time)
-            bg = QColor("#2a2d3a") if visible else QColor("#1e1e2e")
-
-            # #
-            item_num = QTableWidgetItem(str(row + 1))
-            item_num.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_num.setBackground(QBrush(bg))
-            self.table.setItem(row, 0, item_num)
-
-            # Элемент
-            item_name = QTableWidgetItem(elem.name)
-            item_name.setBackground(QBrush(bg))
-            self.table.setItem(row, 1, item_name)
-
-            # Начало
-            item_start = QTableWidgetItem(f"{elem.start_time:.1f}")
-            item_start.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_start.setBackground(QBrush(bg))
-            self.table.setItem(row, 2, item_start)
-
-            # Длительность
-            item_dur = QTableWidgetItem(f"{elem.duration:.1f}")
-            item_dur.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_dur.setBackground(QBrush(bg))
-            self.table.setItem(row, 3, item_dur)
-
-            # Позиция
-            item_pos = QTableWidgetItem(f"{elem.x_percent:.0f}%, {elem.y_percent:.0f}%")
-            item_pos.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_pos.setBackground(QBrush(bg))
-            self.table.setItem(row, 4, item_pos)
-
-            # Действия — виджет с кнопками
-            actions_widget = self._make_actions_widget(elem.id)
-            self.table.setCellWidget(row, 5, actions_widget)
-
-    def _make_actions_widget(self, elem_id: str) -> QWidget:
-        """Создаёт виджет с кнопками действий для строки таблицы."""
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.setContentsMargins(2, 2, 2, 2)
-        layout.setSpacing(4)
-
-        btn_edit = QPushButton("✎")
-        btn_edit.setFixedSize(28, 28)
-        btn_edit.setToolTip("Выбрать / Редактировать")
-        btn_edit.clicked.connect(lambda: self.element_edit.emit(elem_id))
-
-        btn_del = QPushButton("✕")
-        btn_del.setFixedSize(28, 28)
-        btn_del.setToolTip("Удалить")
-        btn_del.setStyleSheet("color: #f38ba8;")
-        btn_del.clicked.connect(lambda: self.element_delete.emit(elem_id))
-
-        btn_up = QPushButton("↑")
-        btn_up.setFixedSize(28, 28)
-        btn_up.setToolTip("Переместить выше")
-        btn_up.clicked.connect(lambda: self.element_move_up.emit(elem_id))
-
-        btn_down = QPushButton("↓")
-        btn_down.setFixedSize(28, 28)
-        btn_down.setToolTip("Переместить ниже")
-        btn_down.clicked.connect(lambda: self.element_move_down.emit(elem_id))
-
-        layout.addWidget(btn_edit)
-        layout.addWidget(btn_del)
-        layout.addWidget(btn_up)
-        layout.addWidget(btn_down)
-        layout.addStretch()
-
-        return widget
-
-    def _on_cell_clicked(self, row, col):
-        if 0 <= row < len(self._elements):
-            self.element_selected.emit(self._elements[row].id)
+    def update_elements(self, elements: List[OverlayElement], current_time: float = 0.0,
+                        visible_ids: Optional[Set[str]] = None):
+        """
+        Синхронизировать таблицу со списком элементов (только изменения).
+        visible_ids — id видимых в current_time элементов (из индекса проекта);
+        если не задано, видимость проверяется по каждому элементу.
+        """
+        self.model.set_elements(elements, self._visible(elements, current_time,
+                                                        visible_ids))
+
+    def set_time(self, current_time: float, visible_ids: Optional[Set[str]] = None):
+        """
+        Обновить подсветку видимых элементов для нового момента времени
+        (каждый тик воспроизведения) — перерисовываются только строки,
+        у которых видимость изменилась.
+        """
+        elements = [self.model.element_at(r) for r in range(self.model.rowCount())]
+        self.model.set_visible(self._visible(elements, current_time, visible_ids))
+
+    @staticmethod
+    def _visible(elements: List[OverlayElement], current_time: float,
+                 visible_ids: Optional[Set[str]]) -> Set[str]:
+        if visible_ids is not None:
+            return visible_ids
+        return {e.id for e in elements if e.is_visible_at(current_time)}
+
+    def _on_clicked(self, index: QModelIndex):
+        # Клик по кнопке обрабатывает делегат
+        if index.column() == ElementsTableModel.ACTIONS_COLUMN:
+            return
+        elem = self.model.element_at(index.row())
+        if elem is not None:
+            self.element_selected.emit(elem.id)
+
+    def _on_action(self, row: int, action: str):
+        elem = self.model.element_at(row)
+        if elem is None:
+            return
+        self._actions.clear_hover()
+        signal = {
+            "edit": self.element_edit,
+            "delete": self.element_delete,
+            "up": self.element_move_up,
+            "down": self.element_move_down,
+        }[action]
+        signal.emit(elem.id)
 
     def highlight_row(self, elem_id: Optional[str]):
         """Подсвечивает строку выбранного элемента."""
-        for row in range(self.table.rowCount()):
-            if row < len(self._elements) and self._elements[row].id == elem_id:
-                self.table.selectRow(row)
-                return
+        row = self.model.row_of(elem_id)
+        if row >= 0:
+            self.table.selectRow(row)
+            return
         self.table.clearSelection()
@@ -0,0 +1,356 @@
+"""
+ffmpeg_render.py — Рендеринг проекта одним графом фильтров ffmpeg.
+
+Альтернатива MoviePy-движку: вместо декодирования каждого кадра в NumPy
+и композиции в Python весь проект описывается одним -filter_complex
+и выполняется одним процессом ffmpeg:
+
+  • каждый OverlayElement — отдельный вход (PNG / GIF / APNG)
+  • scale (lanczos) → прозрачность → сдвиг по времени → fade с альфой
+  • overlay с enable='gte(t,start)*lt(t,end)' — та же логика видимости,
+    что и OverlayElement.is_visible_at; смешивание в RGB, как в MoviePy
+  • текст и ассеты с удалением фона заранее рендерятся в PNG/APNG теми же
+    функциями, что и в MoviePy-движке, поэтому результат совпадает
+    (с точностью до lanczos-масштабирования GIF/PNG внутри ffmpeg)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import tempfile
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+
+from app.asset_index import asset_index
+from app.models import OverlayElement, Project
+from app.render_engine import (
+    EncodeProgress, RenderStats, get_ffmpeg_exe, _get_encoding_params,
+    _overlay_target_h, _overlay_position,
+    _prepare_text_rgba, _prepare_gif_frames, _prepare_image_rgba,
+)
+
+
+# Прогресс файла на этапе кодирования (по кадрам из -progress)
+_PROGRESS_ENCODE = (20, 99)
+
+# Форматы, которые ffmpeg читает напрямую (без предварительной обработки)
+_RAW_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp'}
+_RAW_ANIMATED_EXTENSIONS = {'.gif'}
+
+
+# ---------------------------------------------------------------------------
+# Параметры исходного видео
+# ---------------------------------------------------------------------------
+@dataclass
+class VideoInfo:
+    """Параметры видео, прочитанные из вывода ffmpeg -i."""
+
+    width: int
+    height: int
+    fps: float
+    duration: float
+    has_audio: bool
+
+
+def probe_video(path: str) -> VideoInfo:
+    """Читает размер, fps, длительность и наличие аудио через ffmpeg -i."""
+    result = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-i", path],
+        capture_output=True, text=True, errors="replace", timeout=30,
+        creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+    )
+    info = result.stderr
+
+    video_line = next((ln for ln in info.splitlines()
+                       if "Stream #" in ln and "Video:" in ln), "")
+    size = re.search(r",\s*(\d{2,5})x(\d{2,5})[\s,]", video_line)
+    if not size:
+        raise RuntimeError(f"Не удалось определить параметры видео: {path}")
+
+    fps_match = (re.search(r"([\d.]+)\s+fps", video_line)
+                 or re.search(r"([\d.]+)\s+tbr", video_line))
+    fps = float(fps_match.group(1)) if fps_match else 25.0
+
+    dur = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", info)
+    duration = 0.0
+    if dur:
+        duration = int(dur.group(1)) * 3600 + int(dur.group(2)) * 60 + float(dur.group(3))
+
+    return VideoInfo(
+        width=int(size.group(1)),
+        height=int(size.group(2)),
+        fps=fps if fps > 0 else 25.0,
+        duration=duration,
+        has_audio=any("Stream #" in ln and "Audio:" in ln for ln in info.splitlines()),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Входы оверлеев
+# ---------------------------------------------------------------------------
+@dataclass
+class OverlayInput:
+    """Один вход ffmpeg для оверлейного элемента."""
+
+    elem: OverlayElement
+    path: str                       # файл, подаваемый на вход ffmpeg
+    width: int                      # итоговый размер на видео
+    height: int
+    animated: bool = False          # GIF / APNG — зацикливается через -stream_loop
+    scale: bool = False             # масштабировать в графе (scale=w:h)
+
+
+def _save_png(arr: np.ndarray, path: Path) -> str:
+    PILImage.fromarray(arr).save(str(path))
+    return str(path)
+
+
+def _save_apng(frames: List[np.ndarray], durations: List[float], path: Path) -> Optional[str]:
+    """Сохраняет кадры в APNG. Кадры нулевой длительности не показываются — пропускаем."""
+    shown = [(f, d) for f, d in zip(frames, durations) if d > 0]
+    if not shown:
+        return None
+    images = [PILImage.fromarray(f) for f, _ in shown]
+    images[0].save(
+        str(path), save_all=True, append_images=images[1:],
+        duration=[int(round(d * 1000)) for _, d in shown],
+        loop=0, disposal=0, blend=0,
+    )
+    return str(path)
+
+
+def prepare_overlay_input(elem: OverlayElement, vw: int, vh: int,
+                          work_dir: Path, index: int) -> Optional[OverlayInput]:
+    """
+    Готовит вход ffmpeg для элемента.
+
+    PNG/JPG/GIF без удаления фона подаются как есть и масштабируются в графе;
+    текст и ассеты с удалением фона рендерятся заранее (как в MoviePy-движке).
+    """
+    if elem.is_text and elem.text:
+        arr = _prepare_text_rgba(elem)
+        if arr is None:
+            return None
+        h, w = arr.shape[:2]
+        return OverlayInput(elem, _save_png(arr, work_dir / f"text_{index}.png"), w, h)
+
+    if not elem.file_path or not os.path.exists(elem.file_path):
+        return None
+
+    ext = Path(elem.file_path).suffix.lower()
+    target_h = _overlay_target_h(elem, vw, vh)
+
+    if ext in ('.gif', '.apng'):
+        if not elem.remove_bg and ext in _RAW_ANIMATED_EXTENSIONS:
+            size = _scaled_size(elem.file_path, target_h)
+            if size:
+                return OverlayInput(elem, elem.file_path, *size, animated=True, scale=True)
+
+        frames, durations = _prepare_gif_frames(elem, target_h)
+        if len(frames) > 1:
+            apng = _save_apng(frames, durations, work_dir / f"anim_{index}.apng")
+            if apng:
+                h, w = frames[0].shape[:2]
+                return OverlayInput(elem, apng, w, h, animated=True)
+        if frames:
+            h, w = frames[0].shape[:2]
+            return OverlayInput(elem, _save_png(frames[0], work_dir / f"image_{index}.png"), w, h)
+
+    if not elem.remove_bg and ext in _RAW_IMAGE_EXTENSIONS:
+        size = _scaled_size(elem.file_path, target_h)
+        if size:
+            return OverlayInput(elem, elem.file_path, *size, scale=True)
+
+    arr = _prepare_image_rgba(elem, target_h)
+    if arr is None:
+        return None
+    h, w = arr.shape[:2]
+    return OverlayInput(elem, _save_png(arr, work_dir / f"image_{index}.png"), w, h)
+
+
+def _scaled_size(path: str, target_h: int) -> Optional[Tuple[int, int]]:
+    """Размер ассета после масштабирования до target_h (как в _prepare_image_rgba)."""
+    # Размеры из индекса ассетов — файл не открывается повторно
+    info = asset_index.get(path)
+    if info is None or info.height <= 0:
+        return None
+    orig_w, orig_h = info.width, info.height
+    return max(1, int(orig_w * target_h / orig_h)), max(1, target_h)
+
+
+# ---------------------------------------------------------------------------
+# Граф фильтров
+# ---------------------------------------------------------------------------
+def _fmt(v: float) -> str:
+    """Число для выражений ffmpeg (без экспоненты и лишних нулей)."""
+    return f"{v:.6f}".rstrip("0").rstrip(".") or "0"
+
+
+def build_filter_graph(inputs: List[OverlayInput], vw: int, vh: int,
+                       fps: float) -> str:
+    """
+    Строит -filter_complex для видео [0:v] и оверлеев [1:v]…[N:v].
+    Выход графа — метка [vout].
+
+    Видимость задаётся только через enable=: после конца входа overlay
+    повторяет последний кадр (eof_action=repeat), а enable его скрывает.
+    """
+    chains = []
+    base = "0:v"
+
+    for i, inp in enumerate(inputs, start=1):
+        elem = inp.elem
+        start, end = elem.start_time, elem.end_time
+
+        filters = []
+        if inp.scale:
+            filters.append(f"scale={inp.width}:{inp.height}:flags=lanczos")
+        filters.append("format=rgba")
+        if elem.opacity < 100:
+            filters.append(f"colorchannelmixer=aa={_fmt(elem.opacity / 100.0)}")
+        # Время оверлея начинается с момента появления элемента
+        filters.append(f"setpts=PTS-STARTPTS+{_fmt(start)}/TB")
+        if inp.animated and (elem.fade_in > 0 or elem.fade_out > 0):
+            # Кадры GIF реже кадров видео — иначе fade шёл бы ступеньками
+            filters.append(f"fps={_fmt(fps)}")
+        if elem.fade_in > 0:
+            filters.append(f"fade=t=in:st={_fmt(start)}:d={_fmt(elem.fade_in)}:alpha=1")
+        if elem.fade_out > 0:
+            filters.append(
+                f"fade=t=out:st={_fmt(end - elem.fade_out)}:d={_fmt(elem.fade_out)}:alpha=1"
+            )
+        chains.append(f"[{i}:v]{','.join(filters)}[ov{i}]")
+
+        pos_x, pos_y = _overlay_position(elem, vw, vh, inp.width, inp.height)
+        out = f"v{i}"
+        chains.append(
+            f"[{base}][ov{i}]overlay=x={pos_x}:y={pos_y}:format=rgb"
+            f":enable='gte(t,{_fmt(start)})*lt(t,{_fmt(end)})'[{out}]"
+        )
+        base = out
+
+    chains.append(f"[{base}]format=yuv420p[vout]")
+    return ";".join(chains)
+
+
+def build_ffmpeg_command(video_path: str, inputs: List[OverlayInput],
+                         info: VideoInfo, output_path: str, enc: dict) -> List[str]:
+    """Полная командная строка ffmpeg для рендеринга проекта."""
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-y", "-loglevel", "error",
+           "-nostats", "-progress", "pipe:1", "-i", video_path]
+
+    for inp in inputs:
+        # GIF/APNG зацикливаем, PNG повторяем как кадр; -t ограничивает
+        # бесконечный вход длительностью элемента
+        dur = _fmt(max(inp.elem.duration, 1.0 / info.fps))
+        if inp.animated:
+            cmd += ["-stream_loop", "-1", "-t", dur, "-i", inp.path]
+        else:
+            cmd += ["-loop", "1", "-framerate", _fmt(info.fps), "-t", dur, "-i", inp.path]
+
+    cmd += ["-filter_complex", build_filter_graph(inputs, info.width, info.height, info.fps),
+            "-map", "[vout]"]
+    if info.has_audio:
+        cmd += ["-map", "0:a:0", "-c:a", "aac"]
+    cmd += ["-c:v", enc["codec"]] + list(enc.get("ffmpeg_params", []))
+    cmd += [output_path]
+    return cmd
+
+
+# ---------------------------------------------------------------------------
+# Рендеринг
+# ---------------------------------------------------------------------------
+def render_project_ffmpeg(project: Project, output_path: str, use_gpu: bool,
+                          log_fn: Optional[Callable[[str], None]] = None,
+                          progress_fn: Optional[Callable[[int], None]] = None,
+                          stats_fn: Optional[Callable[[RenderStats], None]] = None,
+                          encode_slot: Optional[AbstractContextManager] = None) -> str:
+    """
+    Рендерит проект одним процессом ffmpeg. Сигнатура совпадает с
+    render_engine.render_project — вызывается из него при backend="ffmpeg".
+    """
+    def log(msg: str):
+        if log_fn:
+            log_fn(msg)
+
+    def progress(val: int):
+        if progress_fn:
+            progress_fn(val)
+
+    video_path = project.video_path
+    if not video_path or not os.path.exists(video_path):
+        raise FileNotFoundError(f"Видео не найдено: {video_path}")
+
+    progress(5)
+    info = probe_video(video_path)
+    log(f"Видео: {info.width}x{info.height}, {info.fps:.1f} fps, {info.duration:.1f} сек")
+
+    # Пересчёт длительности «до конца видео» для каждого элемента
+    for elem in project.elements:
+        if elem.until_end:
+            elem.duration = max(0.1, info.duration - elem.start_time)
+
+    progress(10)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix="cta_ffmpeg_") as tmp:
+        work_dir = Path(tmp)
+
+        # Входы оверлеев
+        inputs: List[OverlayInput] = []
+        total_elems = len(project.elements)
+        for idx, elem in enumerate(project.elements):
+            try:
+                inp = prepare_overlay_input(elem, info.width, info.height, work_dir, idx)
+                if inp is not None:
+                    inputs.append(inp)
+                    log(f"  Оверлей: {elem.name}")
+            except Exception as e:
+                log(f"  Предупреждение: {elem.name}: {e}")
+            progress(10 + int(10 * (idx + 1) / max(total_elems, 1)))
+
+        enc = _get_encoding_params(use_gpu, log)
+        log(f"Кодек: {enc['codec']}")
+        log("Запись видеофайла (ffmpeg filter_complex)...")
+        progress(20)
+
+        cmd = build_ffmpeg_command(video_path, inputs, info, output_path, enc)
+        frames = EncodeProgress(int(info.duration * info.fps), _PROGRESS_ENCODE,
+                                progress, log, stats_fn)
+        with encode_slot or nullcontext():
+            _run_ffmpeg(cmd, work_dir / "ffmpeg.log", frames)
+        frames.finish()
+
+    progress(100)
+    log(f"Готово: {output_path}")
+    return output_path
+
+
+def _run_ffmpeg(cmd: List[str], log_path: Path, frames: EncodeProgress) -> None:
+    """Запускает ffmpeg, передавая счётчик кадров (frame=) из -progress в frames."""
+    with open(log_path, "w+", encoding="utf-8", errors="replace") as err:
+        frames.start()
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=err, text=True,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            if key == "frame":
+                try:
+                    frames.update(int(value))
+                except ValueError:
+                    continue
+        proc.wait()
+
+        if proc.returncode != 0:
+            err.seek(0)
+            tail = err.read()[-2000:].strip()
+            raise RuntimeError(f"ffmpeg завершился с кодом {proc.returncode}:\n{tail}")
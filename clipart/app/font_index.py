@@ -0,0 +1,341 @@
+"""
+font_index.py — Индекс системных шрифтов (семейство, начертание → файл).
+
+Папки шрифтов системы (Windows, macOS, Linux/XDG) сканируются один раз:
+из таблиц name и OS/2 каждого файла .ttf/.otf/.ttc читаются семейство,
+начертание, насыщенность (weight) и курсив — без FreeType, только
+заголовки. Результат хранится в cache/font_index.json вместе с mtime
+всех просмотренных папок: пока ни одна папка не изменилась (шрифты не
+ставились и не удалялись), индекс читается из файла без обхода диска.
+
+Поиск шрифта — словарь «семейство → начертания» и выбор ближайшего по
+насыщенности и курсиву (как fontconfig). Индекс общий для рендера текста
+(text_render) и списка шрифтов в панели свойств: в списке только
+семейства, которые найдёт рендер, поэтому результат не зависит от того,
+на какой машине собирается видео.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.cache_dir import CACHE_DIR
+
+FONT_EXTENSIONS = {".ttf", ".otf", ".ttc", ".otc"}
+
+# Семейства на случай, если запрошенного нет в системе (по порядку)
+FALLBACK_FAMILIES = ("Arial", "Liberation Sans", "DejaVu Sans", "Helvetica",
+                     "Segoe UI", "Noto Sans")
+
+_INDEX_VERSION = 1
+_WEIGHT_REGULAR = 400
+_WEIGHT_BOLD = 700
+
+
+# ---------------------------------------------------------------------------
+# Папки шрифтов
+# ---------------------------------------------------------------------------
+def font_dirs() -> List[Path]:
+    """Системные и пользовательские папки шрифтов текущей ОС."""
+    home = Path.home()
+    if sys.platform == "win32":
+        dirs = [Path(os.environ.get("WINDIR", r"C:\Windows")) / "Fonts"]
+        local = os.environ.get("LOCALAPPDATA")
+        if local:
+            dirs.append(Path(local) / "Microsoft" / "Windows" / "Fonts")
+    elif sys.platform == "darwin":
+        dirs = [Path("/System/Library/Fonts"), Path("/Library/Fonts"),
+                home / "Library" / "Fonts"]
+    else:
+        data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+        dirs = [Path(d) / "fonts" for d in data_dirs.split(":") if d]
+        data_home = os.environ.get("XDG_DATA_HOME") or str(home / ".local" / "share")
+        dirs += [Path(data_home) / "fonts", home / ".fonts"]
+    unique: List[Path] = []
+    for d in dirs:
+        if d not in unique:
+            unique.append(d)
+    return unique
+
+
+# ---------------------------------------------------------------------------
+# Чтение заголовков шрифта (sfnt: таблицы name и OS/2)
+# ---------------------------------------------------------------------------
+@dataclass
+class FontFace:
+    """Одно начертание: файл (и номер в коллекции .ttc) и его параметры."""
+    path: str
+    index: int                  # номер шрифта в .ttc/.otc (0 для .ttf/.otf)
+    family: str                 # типографское семейство (name ID 16, иначе 1)
+    legacy_family: str          # семейство name ID 1 («Arial Black», «Lato Light»)
+    style: str                  # начертание («Bold Italic»)
+    weight: int                 # 100–900
+    italic: bool
+
+    @property
+    def bold(self) -> bool:
+        return self.weight >= 600
+
+
+# Насыщенность по словам начертания, если в файле нет таблицы OS/2
+_STYLE_WEIGHTS = (
+    ("thin", 100), ("hairline", 100), ("extralight", 200), ("ultralight", 200),
+    ("semilight", 350), ("light", 300), ("semibold", 600), ("demibold", 600),
+    ("extrabold", 800), ("ultrabold", 800), ("bold", 700), ("medium", 500),
+    ("black", 900), ("heavy", 900),
+)
+
+
+def _style_weight(style: str) -> int:
+    s = style.lower().replace(" ", "").replace("-", "")
+    for word, weight in _STYLE_WEIGHTS:
+        if word in s:
+            return weight
+    return _WEIGHT_REGULAR
+
+
+def _decode_name(platform: int, raw: bytes) -> Optional[str]:
+    try:
+        if platform in (0, 3):
+            return raw.decode("utf-16-be")
+        if platform == 1:
+            return raw.decode("mac_roman")
+    except UnicodeDecodeError:
+        pass
+    return None
+
+
+def _parse_sfnt(data: bytes, offset: int) -> Optional[Tuple[Dict[int, str], int, bool]]:
+    """Шрифт по смещению offset → (имена {name ID: строка}, weight, italic)."""
+    num_tables = struct.unpack_from(">H", data, offset + 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, table_off, length = struct.unpack_from(">4sIII", data, offset + 12 + i * 16)
+        tables[tag] = (table_off, length)
+    if b"name" not in tables:
+        return None
+
+    names: Dict[int, str] = {}
+    ranks: Dict[int, int] = {}
+    base, _ = tables[b"name"]
+    _, count, string_off = struct.unpack_from(">HHH", data, base)
+    for i in range(count):
+        platform, _, lang, name_id, length, off = struct.unpack_from(
+            ">HHHHHH", data, base + 6 + i * 12)
+        if name_id not in (1, 2, 16, 17):
+            continue
+        # Предпочтение: Windows English (0x409) → Windows любой → Unicode → Mac
+        rank = {3: 1, 0: 2, 1: 3}.get(platform)
+        if rank is None:
+            continue
+        if platform == 3 and lang == 0x409:
+            rank = 0
+        if name_id in ranks and ranks[name_id] <= rank:
+            continue
+        start = base + string_off + off
+        value = _decode_name(platform, data[start:start + length])
+        if value:
+            names[name_id] = value.strip()
+            ranks[name_id] = rank
+
+    style = names.get(17) or names.get(2) or ""
+    weight, italic = _style_weight(style), "italic" in style.lower() or "oblique" in style.lower()
+    if b"OS/2" in tables:
+        os2, length = tables[b"OS/2"]
+        if length >= 64:
+            weight = struct.unpack_from(">H", data, os2 + 4)[0] or weight
+            italic = bool(struct.unpack_from(">H", data, os2 + 62)[0] & 0x01) or italic
+    return names, max(1, min(1000, weight)), italic
+
+
+def read_font_faces(path: str) -> List[FontFace]:
+    """Начертания в файле шрифта; пустой список — файл не читается."""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Читаются только заголовки: mmap не загружает глифы с диска
+            if data[:4] == b"ttcf":
+                count = struct.unpack_from(">I", data, 8)[0]
+                offsets = struct.unpack_from(f">{count}I", data, 12)
+            else:
+                offsets = (0,)
+            faces = []
+            for index, offset in enumerate(offsets):
+                parsed = _parse_sfnt(data, offset)
+                if parsed is None:
+                    continue
+                names, weight, italic = parsed
+                legacy = names.get(1, "")
+                family = names.get(16) or legacy
+                if not family:
+                    continue
+                faces.append(FontFace(path=path, index=index, family=family,
+                                      legacy_family=legacy or family,
+                                      style=names.get(17) or names.get(2) or "Regular",
+                                      weight=weight, italic=italic))
+            return faces
+    except (OSError, ValueError, struct.error, IndexError):
+        return []
+
+
+# ---------------------------------------------------------------------------
+# Индекс
+# ---------------------------------------------------------------------------
+class FontIndex:
+    """
+    Потокобезопасный индекс шрифтов с сохранением в JSON.
+    Строится при первом обращении (или заранее — index_workers.FontIndexWorker).
+    """
+
+    def __init__(self, index_path: Path, dirs: Optional[List[Path]] = None):
+        self._index_path = Path(index_path)
+        self._dirs = dirs
+        self._faces: List[FontFace] = []
+        self._by_family: Dict[str, List[FontFace]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(family: str) -> str:
+        return family.strip().casefold()
+
+    # --- Построение ---
+    def _scan(self, cached_files: Dict[str, dict]) -> Tuple[Dict[str, int], Dict[str, dict]]:
+        """Обход папок: mtime папок и начертания файлов (неизменённые — из кеша)."""
+        dir_mtimes: Dict[str, int] = {}
+        files: Dict[str, dict] = {}
+        for root in self._dirs if self._dirs is not None else font_dirs():
+            for dirpath, dirnames, filenames in os.walk(root):
+                try:
+                    dir_mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+                except OSError:
+                    continue
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if os.path.splitext(name)[1].lower() not in FONT_EXTENSIONS:
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entry = cached_files.get(path)
+                    if (entry is None or entry.get("size") != st.st_size
+                            or entry.get("mtime_ns") != st.st_mtime_ns):
+                        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                 "faces": [asdict(f) for f in read_font_faces(path)]}
+                    files[path] = entry
+        return dir_mtimes, files
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if data.get("version") == _INDEX_VERSION else {}
+
+    @staticmethod
+    def _dirs_unchanged(dir_mtimes: Dict[str, int], roots: List[Path]) -> bool:
+        """Не изменилась ни одна из папок (и не появилось новых корней)."""
+        if not dir_mtimes:
+            return False
+        for root in roots:
+            if os.path.isdir(root) and str(root) not in dir_mtimes:
+                return False
+        for path, mtime in dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        roots = self._dirs if self._dirs is not None else font_dirs()
+        data = self._read_disk()
+        files = data.get("files", {})
+        if not self._dirs_unchanged(data.get("dirs", {}), roots):
+            dir_mtimes, files = self._scan(files)
+            self._save({"version": _INDEX_VERSION, "dirs": dir_mtimes, "files": files})
+
+        faces: List[FontFace] = []
+        for entry in files.values():
+            for face in entry.get("faces", []):
+                try:
+                    faces.append(FontFace(**face))
+                except TypeError:
+                    continue
+        by_family: Dict[str, List[FontFace]] = {}
+        for face in faces:
+            for name in {face.family, face.legacy_family}:
+                by_family.setdefault(self._key(name), []).append(face)
+        self._faces, self._by_family = faces, by_family
+        self._loaded = True
+
+    def _save(self, data: dict) -> None:
+        tmp = self._index_path.with_name(f"{self._index_path.name}.{os.getpid()}.tmp")
+        try:
+            self._index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self._index_path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def ensure_loaded(self) -> None:
+        """Прочитать индекс с диска или построить заново (если папки изменились)."""
+        with self._lock:
+            self._ensure_loaded()
+
+    # --- Поиск ---
+    def families(self) -> List[str]:
+        """Типографские семейства всех найденных шрифтов (по алфавиту)."""
+        with self._lock:
+            self._ensure_loaded()
+            return sorted({f.family for f in self._faces}, key=str.casefold)
+
+    def has_family(self, family: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return self._key(family) in self._by_family
+
+    def find(self, family: str, bold: bool = False, italic: bool = False,
+             fallback: bool = True) -> Optional[FontFace]:
+        """
+        Ближайшее начертание семейства: сначала совпадение курсива, затем
+        насыщенность, ближайшая к 700 (bold) или 400. Семейства нет —
+        первое найденное из FALLBACK_FAMILIES (при fallback=True).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            faces = self._by_family.get(self._key(family))
+            if not faces and fallback:
+                for name in FALLBACK_FAMILIES:
+                    faces = self._by_family.get(self._key(name))
+                    if faces:
+                        break
+            if not faces:
+                return None
+        target = _WEIGHT_BOLD if bold else _WEIGHT_REGULAR
+        return min(faces, key=lambda f: (
+            f.italic != italic,
+            # Точное имя семейства лучше совпадения по name ID 1 («Lato Light»)
+            self._key(f.family) != self._key(family),
+            abs(f.weight - target),
+            f.weight < target if bold else f.weight > target,
+            f.path, f.index,
+        ))
+
+
+# Общий индекс процесса
+font_index = FontIndex(CACHE_DIR / "font_index.json")
@@ -0,0 +1,135 @@
+"""
+frame_decoder.py — Фоновое декодирование кадров для воспроизведения превью.
+
+FramePrefetcher читает видео последовательно в отдельном потоке и складывает
+уменьшенные RGB-кадры в ограниченный кольцевой буфер. Пропуск кадров
+(60 fps → 24 fps превью) делается через grab() — без перемотки
+CAP_PROP_POS_FRAMES, которая заставляет заново декодировать от ключевого
+кадра. Таймер превью только забирает готовые кадры из буфера.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+import numpy as np
+
+from app.lazy_import import lazy_module
+
+# OpenCV — при первом декодировании кадра
+cv2 = lazy_module("cv2")
+
+
+# ---------------------------------------------------------------------------
+# Подготовка кадра для превью
+# ---------------------------------------------------------------------------
+def prepare_preview_frame(frame_bgr: np.ndarray, max_width: int) -> np.ndarray:
+    """Уменьшает кадр до max_width (INTER_AREA) и переводит BGR → RGB."""
+    h, w = frame_bgr.shape[:2]
+    if w > max_width:
+        scale = max_width / w
+        frame_bgr = cv2.resize(frame_bgr, (max_width, int(h * scale)),
+                               interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+
+
+# ---------------------------------------------------------------------------
+# Поток предварительного чтения кадров
+# ---------------------------------------------------------------------------
+class FramePrefetcher:
+    """
+    Декодер превью в отдельном потоке.
+
+    Читает кадры start_frame, start_frame + step, ... (с зацикливанием в 0
+    после конца видео) и держит до *capacity* готовых кадров.
+    get() не блокирует: если кадр ещё не готов — возвращает None.
+    """
+
+    def __init__(self, path: str, start_frame: int, step: int,
+                 total_frames: int, max_width: int, capacity: int = 8,
+                 loop: bool = True):
+        self._path = path
+        self._start = max(0, start_frame)
+        self._step = max(1, step)
+        self._total = total_frames
+        self._max_width = max_width
+        self._capacity = max(1, capacity)
+        self._loop = loop
+
+        self._buffer: Deque[Tuple[int, np.ndarray]] = deque()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name="FramePrefetcher",
+                                        daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает поток и ждёт его завершения."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+
+    @property
+    def finished(self) -> bool:
+        """True — видео закончилось (без зацикливания) и буфер пуст."""
+        with self._cond:
+            return self._finished and not self._buffer
+
+    def get(self) -> Optional[Tuple[int, np.ndarray]]:
+        """Следующий готовый кадр (номер, RGB) или None."""
+        with self._cond:
+            if not self._buffer:
+                return None
+            item = self._buffer.popleft()
+            self._cond.notify_all()
+            return item
+
+    # --- Поток ---
+    def _run(self) -> None:
+        cap = cv2.VideoCapture(self._path)
+        try:
+            if not cap.isOpened():
+                return
+            index = self._start
+            if index >= self._total:
+                index = 0
+            if index > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+            while True:
+                # Ждём свободного места в буфере
+                with self._cond:
+                    while len(self._buffer) >= self._capacity and not self._stop:
+                        self._cond.wait()
+                    if self._stop:
+                        return
+
+                ret, frame = cap.read()
+                if not ret or index >= self._total:
+                    if not self._loop or index == 0:
+                        break
+                    # Конец видео — единственная перемотка: в начало
+                    index = 0
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+
+                rgb = prepare_preview_frame(frame, self._max_width)
+                with self._cond:
+                    self._buffer.append((index, rgb))
+
+                # Пропуск кадров без декодирования в RGB и без перемотки
+                for _ in range(self._step - 1):
+                    if not cap.grab():
+                        break
+                index += self._step
+        finally:
+            cap.release()
+            with self._cond:
+                self._finished = True
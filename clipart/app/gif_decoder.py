@@ -0,0 +1,258 @@
+"""
+gif_decoder.py — Декодирование GIF с сохранением палитры.
+
+Кадр GIF хранится как индексы палитры (uint8, H×W) + палитра (256×4 RGBA)
+вместо полного RGBA-массива — в 4 раза меньше памяти. Одинаковые кадры
+(частые в стикерах: паузы, повторы) хранятся один раз. RGBA получается
+только по запросу для конкретного кадра, а удаление фона для палитровых
+кадров работает по 256 цветам палитры (chroma_key).
+
+Кадры, которые Pillow отдаёт в RGB/RGBA (локальная палитра, прозрачность),
+переводятся обратно в индексы, если в кадре не больше 256 цветов;
+иначе GIF хранится как RGBA — тоже без дубликатов.
+
+Загрузчик общий для превью (GifCache) и рендера; последние декодированные
+файлы запоминаются по (путь, mtime, размер).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+from PIL import GifImagePlugin
+
+from app.chroma_key import chroma_key
+from app.gif_timeline import frame_duration_ms
+
+# Сколько последних декодированных файлов держать в памяти
+_RECENT_MAX = 8
+
+
+# ---------------------------------------------------------------------------
+# Декодированная анимация
+# ---------------------------------------------------------------------------
+class DecodedGif:
+    """
+    Кадры анимации без дубликатов.
+
+    frame_map[i] — номер уникального кадра для i-го кадра анимации;
+    durations_ms[i] — длительность i-го кадра.
+    """
+
+    def __init__(self, width: int, height: int, durations_ms: List[int],
+                 frame_map: List[int],
+                 indices: Optional[List[np.ndarray]] = None,
+                 palettes: Optional[List[np.ndarray]] = None,
+                 rgba: Optional[List[np.ndarray]] = None):
+        self.width = width
+        self.height = height
+        self.durations_ms = durations_ms
+        self.frame_map = frame_map
+        self._indices = indices
+        self._palettes = palettes
+        self._rgba = rgba
+
+    @classmethod
+    def from_rgba(cls, frames: List[np.ndarray], durations_ms: List[int]) -> "DecodedGif":
+        """Обёртка над готовыми RGBA-кадрами (статичные изображения)."""
+        h, w = frames[0].shape[:2]
+        return cls(w, h, durations_ms, list(range(len(frames))), rgba=frames)
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.frame_map)
+
+    @property
+    def unique_count(self) -> int:
+        return len(self._indices) if self._indices is not None else len(self._rgba)
+
+    @property
+    def indexed(self) -> bool:
+        return self._indices is not None
+
+    @property
+    def nbytes(self) -> int:
+        if self._indices is not None:
+            return (sum(a.nbytes for a in self._indices)
+                    + sum(p.nbytes for p in self._palettes))
+        return sum(a.nbytes for a in self._rgba)
+
+    def rgba(self, unique: int, tolerance: Optional[int] = None,
+             asset_key: Optional[Hashable] = None) -> np.ndarray:
+        """
+        RGBA уникального кадра *unique* (новый массив или общий из кеша —
+        только для чтения). tolerance — удалить фон с этим допуском;
+        asset_key — ключ кеша удаления фона (хеш файла).
+        """
+        if self._indices is None:
+            if tolerance is None:
+                return self._rgba[unique]
+            return chroma_key.key_frames(asset_key, self._rgba, tolerance)[unique]
+
+        if tolerance is None:
+            palette = self._palettes[unique]
+        else:
+            palette = chroma_key.key_palettes(asset_key, self._indices[0],
+                                              self._palettes, tolerance)[unique]
+        return expand_indexed(self._indices[unique], palette)
+
+
+def expand_indexed(indices: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """Индексы H×W + палитра N×4 → RGBA H×W×4 (выборка по uint32)."""
+    packed = np.ascontiguousarray(palette).view(np.uint32).reshape(-1)
+    return np.take(packed, indices).view(np.uint8).reshape(indices.shape + (4,))
+
+
+# ---------------------------------------------------------------------------
+# Декодирование
+# ---------------------------------------------------------------------------
+# LOADING_STRATEGY — глобальная настройка Pillow; меняем её только на время
+# декодирования (другие загрузчики всё равно делают convert())
+_strategy_lock = threading.Lock()
+
+
+def _palette_rgba(img: PILImage.Image) -> np.ndarray:
+    """Палитра кадра P/L как 256×4 RGBA с учётом info['transparency']."""
+    pal = np.zeros((256, 4), dtype=np.uint8)
+    pal[:, 3] = 255
+    if img.mode == "L":
+        pal[:, :3] = np.arange(256, dtype=np.uint8)[:, None]
+    else:
+        rgb = np.array(img.getpalette("RGB") or [], dtype=np.uint8).reshape(-1, 3)[:256]
+        pal[:len(rgb), :3] = rgb
+    trans = img.info.get("transparency")
+    if isinstance(trans, int) and 0 <= trans < 256:
+        pal[trans, 3] = 0
+    elif isinstance(trans, (bytes, bytearray)):
+        alpha = np.frombuffer(bytes(trans[:256]), dtype=np.uint8)
+        pal[:len(alpha), 3] = alpha
+    return pal
+
+
+def _reindex(arr: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    RGBA-кадр → (индексы, палитра 256×4), если в нём не больше 256 цветов.
+    Pillow отдаёт в RGB/RGBA кадры с локальной палитрой (даже совпадающей
+    с глобальной), но у GIF-кадра цветов всё равно не больше 256.
+    """
+    packed = np.ascontiguousarray(arr).view(np.uint32).reshape(arr.shape[:2])
+    colors, inverse = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    palette = np.zeros(256, dtype=np.uint32)
+    palette[:len(colors)] = colors
+    idx = inverse.reshape(arr.shape[:2]).astype(np.uint8)
+    return idx, palette.view(np.uint8).reshape(256, 4)
+
+
+def decode_gif(path: str) -> Optional[DecodedGif]:
+    """
+    Декодирует GIF/APNG в DecodedGif. None — файл не читается.
+    Длительности — в мс как в файле, нулевые и отсутствующие — по правилу
+    gif_timeline.frame_duration_ms (как в индексе ассетов).
+    """
+    try:
+        img = PILImage.open(path)
+    except Exception:
+        return None
+
+    durations: List[int] = []
+    frame_map: List[int] = []
+    seen: Dict[bytes, int] = {}
+    indices: List[np.ndarray] = []
+    palettes: List[np.ndarray] = []
+    rgba: List[np.ndarray] = []
+    indexed = True
+
+    with _strategy_lock:
+        old_strategy = GifImagePlugin.LOADING_STRATEGY
+        GifImagePlugin.LOADING_STRATEGY = (
+            GifImagePlugin.LoadingStrategy.RGB_AFTER_DIFFERENT_PALETTE_ONLY
+        )
+        try:
+            n = getattr(img, "n_frames", 1)
+            for i in range(n):
+                img.seek(i)
+                img.load()
+                durations.append(frame_duration_ms(img.info.get("duration")))
+
+                if indexed and img.mode in ("P", "L"):
+                    # Индексы как есть — без разворачивания в RGBA
+                    idx, pal = np.array(img, dtype=np.uint8), _palette_rgba(img)
+                    h = hashlib.blake2b(idx, digest_size=16)
+                    h.update(pal)
+                    digest = h.digest()
+                    arr = None
+                else:
+                    arr = np.array(img.convert("RGBA"))
+                    digest = hashlib.blake2b(arr, digest_size=16).digest()
+
+                if digest in seen:
+                    frame_map.append(seen[digest])
+                    continue
+
+                if indexed and arr is not None:
+                    reindexed = _reindex(arr)
+                    if reindexed is None:
+                        # Больше 256 цветов — дальше храним RGBA
+                        indexed = False
+                        rgba = [expand_indexed(a, p) for a, p in zip(indices, palettes)]
+                        indices, palettes = [], []
+                    else:
+                        idx, pal = reindexed
+
+                seen[digest] = len(indices) if indexed else len(rgba)
+                if indexed:
+                    indices.append(idx)
+                    palettes.append(pal)
+                else:
+                    rgba.append(arr)
+                frame_map.append(seen[digest])
+        except Exception:
+            if not frame_map:
+                return None
+            durations = durations[:len(frame_map)]
+        finally:
+            GifImagePlugin.LOADING_STRATEGY = old_strategy
+
+    w, h = img.size
+    if indexed:
+        return DecodedGif(w, h, durations, frame_map, indices=indices, palettes=palettes)
+    # Нумерация уникальных кадров при переходе на RGBA сохраняется
+    return DecodedGif(w, h, durations, frame_map, rgba=rgba)
+
+
+# ---------------------------------------------------------------------------
+# Общий кеш последних файлов
+# ---------------------------------------------------------------------------
+_recent: "OrderedDict[Tuple[str, int, int], DecodedGif]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def load_gif(path: str) -> Optional[DecodedGif]:
+    """decode_gif с запоминанием последних файлов (по пути, mtime, размеру)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _recent_lock:
+        decoded = _recent.get(key)
+        if decoded is not None:
+            _recent.move_to_end(key)
+            return decoded
+
+    decoded = decode_gif(path)
+    if decoded is None:
+        return None
+    with _recent_lock:
+        _recent[key] = decoded
+        while len(_recent) > _RECENT_MAX:
+            _recent.popitem(last=False)
+    return decoded
@@ -0,0 +1,135 @@
+"""
+gif_timeline.py — Временная шкала кадров GIF / APNG.
+
+Длительности кадров один раз сворачиваются в массив накопленных смещений,
+после чего поиск кадра по времени — это бинарный поиск (np.searchsorted),
+а для обычных GIF (целые миллисекунды) — просто индекс в таблице
+«миллисекунда цикла → кадр».
+
+Используется и превью (GifCache), и рендером (compositor.OverlayLayer).
+Здесь же — единое правило длительности кадра (frame_duration_ms) и разбор
+задержек GIF без декодирования: по ним считают и индекс ассетов, и
+загрузчик кадров (gif_decoder), поэтому длительность в библиотеке
+совпадает с воспроизведением.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+# Длительность кадра без задержки или с нулевой задержкой (мс) — как
+# в браузерах; иначе такой кадр никогда не показывался бы
+DEFAULT_FRAME_MS = 100
+
+# Максимальная длина цикла (мс), для которой строится таблица поиска
+# (int32 на каждую миллисекунду: 60 с → 240 КБ)
+MAX_LUT_MS = 60_000
+
+
+# ---------------------------------------------------------------------------
+# Длительности кадров
+# ---------------------------------------------------------------------------
+def frame_duration_ms(delay: Optional[float]) -> float:
+    """Длительность кадра (мс) по задержке из файла: нет или 0 — DEFAULT_FRAME_MS."""
+    return delay if delay and delay > 0 else DEFAULT_FRAME_MS
+
+
+def gif_frame_durations(path: str) -> Optional[List[int]]:
+    """
+    Длительности кадров GIF (мс) разбором блоков файла без декодирования
+    изображений; задержки — по правилу frame_duration_ms. None — не GIF
+    или файл повреждён.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:6] not in (b"GIF87a", b"GIF89a") or len(data) < 13:
+        return None
+    pos = 13
+    if data[10] & 0x80:                         # глобальная палитра
+        pos += 3 << ((data[10] & 0x07) + 1)
+
+    def skip_sub_blocks(p: int) -> int:
+        while p < len(data):
+            n = data[p]
+            p += 1 + n
+            if n == 0:
+                break
+        return p
+
+    durations: List[int] = []
+    delay = None
+    while pos < len(data):
+        block = data[pos]
+        if block == 0x3B:                       # конец файла
+            break
+        if block == 0x21 and pos + 1 < len(data):   # расширение
+            if data[pos + 1] == 0xF9 and pos + 5 < len(data):
+                delay = int.from_bytes(data[pos + 4:pos + 6], "little") * 10
+            pos = skip_sub_blocks(pos + 2)
+        elif block == 0x2C and pos + 10 < len(data):  # кадр
+            flags = data[pos + 9]
+            pos += 10
+            if flags & 0x80:                    # локальная палитра
+                pos += 3 << ((flags & 0x07) + 1)
+            pos = skip_sub_blocks(pos + 1)      # байт LZW + данные
+            durations.append(frame_duration_ms(delay))
+            delay = None
+        else:
+            break
+    return durations or None
+
+
+# ---------------------------------------------------------------------------
+# Временная шкала
+# ---------------------------------------------------------------------------
+class GifTimeline:
+    """
+    Отображение времени на индекс кадра для зацикленной анимации.
+
+    durations_ms — длительность каждого кадра в миллисекундах, уже
+    нормализованная frame_duration_ms (её применяет загрузчик кадров
+    gif_decoder): шкала берёт длительности как есть и сама нулевые
+    задержки не заменяет.
+    """
+
+    def __init__(self, durations_ms: Sequence[float]):
+        d = np.asarray(durations_ms, dtype=np.float64).reshape(-1)
+        d = np.maximum(d, 0.0)
+
+        # Длительности GIF — целые мс; убираем погрешность перевода из секунд
+        d_int = np.rint(d)
+        integral = bool(np.allclose(d, d_int, atol=1e-6))
+        if integral:
+            d = d_int
+
+        self.n_frames = len(d)
+        self._ends = np.cumsum(d)
+        self._ends_list = self._ends.tolist()
+        self.total_ms = float(self._ends[-1]) if self.n_frames else 0.0
+
+        # Таблица «мс цикла → кадр»
+        self._lut = None
+        if integral and self.n_frames > 1 and 0 < self.total_ms <= MAX_LUT_MS:
+            ms = np.arange(int(self.total_ms), dtype=np.float64)
+            lut = np.searchsorted(self._ends, ms, side="right")
+            self._lut = np.minimum(lut, self.n_frames - 1).astype(np.int32)
+
+    def index_at_ms(self, t_ms: float) -> int:
+        """Индекс кадра в момент *t_ms* (мс от начала анимации, с зацикливанием)."""
+        if self.n_frames <= 1 or self.total_ms <= 0:
+            return 0
+        t = t_ms % self.total_ms
+        if self._lut is not None:
+            return int(self._lut[int(t)])
+        return min(bisect_right(self._ends_list, t), self.n_frames - 1)
+
+    def index_at(self, t: float) -> int:
+        """Индекс кадра в момент *t* (секунды)."""
+        return self.index_at_ms(t * 1000.0)
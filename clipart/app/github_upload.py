@@ -17,13 +17,11 @@ from typing import Optional
 
 from PyQt6.QtCore import QThread, pyqtSignal, QSettings
 
-# GitPython
-try:
-    import git
-    from git import Repo, InvalidGitRepositoryError, GitCommandNotFound
-    GIT_AVAILABLE = True
-except ImportError:
-    GIT_AVAILABLE = False
+from app.lazy_import import lazy_module, module_available
+
+# GitPython — импортируется при первой выгрузке
+git = lazy_module("git")
+GIT_AVAILABLE = module_available("git")
 
 
 GITHUB_REPO_URL = "https://github.com/alexevil1979/clipart"
@@ -68,7 +66,7 @@ class GitHubUploadWorker(QThread):
             self.progress.emit("Клонирование репозитория...")
             clone_url = self._get_auth_url()
             try:
-                Repo.clone_from(clone_url, str(repo_path))
+                git.Repo.clone_from(clone_url, str(repo_path))
             except Exception as e:
                 self.error.emit(
                     f"Не удалось клонировать репозиторий:\n{e}\n\n"
@@ -78,7 +76,7 @@ class GitHubUploadWorker(QThread):
 
         self.progress.emit("Открытие репозитория...")
         try:
-            repo = Repo(str(repo_path))
+            repo = git.Repo(str(repo_path))
         except Exception as e:
             self.error.emit(f"Не удалось открыть репозиторий:\n{e}")
             return
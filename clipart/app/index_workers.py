@@ -0,0 +1,52 @@
+"""
+index_workers.py — Qt-потоки фонового построения индексов.
+
+Сами индексы (asset_index, font_index) не зависят от Qt: их читает и
+рендер без интерфейса (python -m app.render). Здесь — только обёртки
+QThread, которыми интерфейс строит индексы, не блокируя GUI-поток.
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from app.asset_index import asset_index
+from app.font_index import font_index
+
+
+# ---------------------------------------------------------------------------
+# Индекс ассетов
+# ---------------------------------------------------------------------------
+class AssetIndexWorker(QThread):
+    """Анализирует файлы без актуальной записи и сохраняет индекс одним разом."""
+
+    asset_indexed = pyqtSignal(str)     # путь
+
+    def __init__(self, paths: List[str], parent=None):
+        super().__init__(parent)
+        self._paths = paths
+
+    def run(self):
+        try:
+            for path in self._paths:
+                if self.isInterruptionRequested():
+                    break
+                if asset_index.get(path, save=False) is not None:
+                    self.asset_indexed.emit(path)
+        finally:
+            asset_index.save()
+
+
+# ---------------------------------------------------------------------------
+# Индекс шрифтов
+# ---------------------------------------------------------------------------
+class FontIndexWorker(QThread):
+    """Строит (или читает с диска) индекс шрифтов вне GUI-потока."""
+
+    index_ready = pyqtSignal()
+
+    def run(self):
+        font_index.ensure_loaded()
+        self.index_ready.emit()
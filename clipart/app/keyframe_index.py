@@ -0,0 +1,171 @@
+"""
+keyframe_index.py — Индекс ключевых кадров видео для быстрой перемотки.
+
+Индекс строится один раз лёгким проходом демультиплексора ffmpeg
+(-c copy -f framecrc: пакеты без декодирования) и кешируется в JSON
+рядом с видео (.<имя>.kf.json), а если папка недоступна на запись —
+в cache/keyframes/. Кеш сбрасывается при изменении размера/mtime файла.
+
+Перемотка с индексом: переход на ближайший предшествующий ключевой кадр
+и декодирование вперёд до нужного кадра (grab()). При перетаскивании
+слайдера показывается сам ключевой кадр — быстрое приближение.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+from bisect import bisect_right
+from fractions import Fraction
+from pathlib import Path
+from typing import List, Optional
+
+from app.cache_dir import cache_subdir, path_key
+
+_INDEX_VERSION = 1
+_TB_RE = re.compile(r"^#tb 0:\s*(\d+)/(\d+)")
+_FLAGS_RE = re.compile(r"F=0x([0-9A-Fa-f]+)")
+
+
+# ---------------------------------------------------------------------------
+# Индекс
+# ---------------------------------------------------------------------------
+class KeyframeIndex:
+    """Отсортированный список номеров ключевых кадров."""
+
+    def __init__(self, keyframes: List[int]):
+        self.keyframes = sorted(set(keyframes)) or [0]
+
+    def __len__(self) -> int:
+        return len(self.keyframes)
+
+    def preceding(self, frame: int) -> int:
+        """Ближайший ключевой кадр не позже *frame*."""
+        i = bisect_right(self.keyframes, frame) - 1
+        return self.keyframes[max(i, 0)]
+
+
+# ---------------------------------------------------------------------------
+# Построение через ffmpeg
+# ---------------------------------------------------------------------------
+def _ffmpeg_exe() -> str:
+    from app.render_engine import get_ffmpeg_exe
+    return get_ffmpeg_exe()
+
+
+def build_keyframe_index(path: str, fps: float) -> Optional[KeyframeIndex]:
+    """
+    Проходит пакеты первого видеопотока без декодирования и
+    возвращает номера ключевых кадров (по pts и fps). None — ошибка.
+    """
+    if fps <= 0:
+        return None
+    try:
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        result = subprocess.run(
+            [_ffmpeg_exe(), "-hide_banner", "-v", "error", "-i", path,
+             "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+            capture_output=True, text=True, timeout=300, **kwargs
+        )
+    except Exception:
+        return None
+    if result.returncode != 0:
+        return None
+
+    tb = None
+    key_pts: List[int] = []
+    min_pts: Optional[int] = None
+    for line in result.stdout.splitlines():
+        if line.startswith("#"):
+            m = _TB_RE.match(line)
+            if m:
+                tb = Fraction(int(m.group(1)), int(m.group(2)))
+            continue
+        parts = line.split(",")
+        if len(parts) < 6:
+            continue
+        try:
+            pts = int(parts[2])
+        except ValueError:
+            continue
+        min_pts = pts if min_pts is None else min(min_pts, pts)
+        # framecrc пишет F=... только если флаги отличаются от «ключевой кадр»
+        m = _FLAGS_RE.search(line)
+        flags = int(m.group(1), 16) if m else 1
+        if flags & 1:
+            key_pts.append(pts)
+
+    if tb is None or min_pts is None:
+        return None
+    frames = [int(round(float((pts - min_pts) * tb) * fps)) for pts in key_pts]
+    return KeyframeIndex(frames)
+
+
+# ---------------------------------------------------------------------------
+# Кеш на диске
+# ---------------------------------------------------------------------------
+def _cache_paths(path: str) -> List[Path]:
+    """Кандидаты для файла кеша: рядом с видео, затем cache/keyframes/."""
+    p = Path(path)
+    return [
+        p.with_name(f".{p.name}.kf.json"),
+        cache_subdir("keyframes") / f"{path_key(path)}.json",
+    ]
+
+
+def _signature(path: str) -> Optional[dict]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_keyframe_index(path: str, fps: float) -> Optional[KeyframeIndex]:
+    """Загружает индекс из кеша, если он актуален для файла и fps."""
+    sig = _signature(path)
+    if sig is None:
+        return None
+    for cache_path in _cache_paths(path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if (data.get("version") == _INDEX_VERSION
+                and data.get("size") == sig["size"]
+                and data.get("mtime_ns") == sig["mtime_ns"]
+                and abs(data.get("fps", 0) - fps) < 1e-6):
+            return KeyframeIndex(data.get("keyframes", []))
+    return None
+
+
+def save_keyframe_index(path: str, fps: float, index: KeyframeIndex) -> None:
+    """Сохраняет индекс рядом с видео (или в cache/keyframes/)."""
+    sig = _signature(path)
+    if sig is None:
+        return
+    data = {"version": _INDEX_VERSION, "fps": fps, **sig,
+            "keyframes": index.keyframes}
+    for cache_path in _cache_paths(path):
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            return
+        except OSError:
+            continue
+
+
+def get_keyframe_index(path: str, fps: float) -> Optional[KeyframeIndex]:
+    """Индекс из кеша или новый (с сохранением в кеш)."""
+    index = load_keyframe_index(path, fps)
+    if index is not None:
+        return index
+    index = build_keyframe_index(path, fps)
+    if index is not None:
+        save_keyframe_index(path, fps, index)
+    return index
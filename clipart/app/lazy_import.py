@@ -0,0 +1,109 @@
+"""
+lazy_import.py — Отложенный импорт тяжёлых зависимостей.
+
+MoviePy (вместе с IPython, который он тянет за собой), OpenCV и GitPython
+вместе занимают большую часть времени запуска, хотя до открытия видео,
+рендера или выгрузки не нужны. Модули, которые ими пользуются, берут
+вместо модуля заместитель lazy_module(): настоящий импорт выполняется
+при первом обращении к атрибуту (cv2.VideoCapture, moviepy.VideoClip…).
+
+Интерфейс после показа окна догружает эти модули в фоновом потоке
+(preload_modules), так что к первому действию пользователя они, как
+правило, уже загружены. Модуль не зависит от Qt — его использует и
+рендер без интерфейса (python -m app.render).
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Время фонового импорта модулей (имя → секунды) — для отчёта о запуске
+preload_times: Dict[str, float] = {}
+
+
+# ---------------------------------------------------------------------------
+# Заместитель модуля
+# ---------------------------------------------------------------------------
+class LazyModule:
+    """
+    Заместитель модуля: импортирует его при первом обращении к атрибуту.
+    Полученные атрибуты запоминаются в самом заместителе — повторные
+    обращения (в том числе в покадровых циклах) идут мимо __getattr__.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _lazy_load(self):
+        # Импорт потокобезопасен сам по себе (блокировки модулей importlib):
+        # параллельный фоновый импорт того же модуля просто дождётся первого
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_lazy_name"])
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._lazy_load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    @property
+    def loaded(self) -> bool:
+        """Импортирован ли модуль (этим заместителем или кем-то ещё)."""
+        return self.__dict__["_lazy_name"] in sys.modules
+
+    def __repr__(self) -> str:
+        state = "загружен" if self.loaded else "не загружен"
+        return f"<LazyModule {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Заместитель модуля name; уже импортированный модуль тоже оборачивается."""
+    return LazyModule(name)
+
+
+def module_available(name: str) -> bool:
+    """Установлен ли модуль — по поиску спецификации, без его импорта."""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Фоновая догрузка
+# ---------------------------------------------------------------------------
+def preload_modules(names: Iterable[str],
+                    on_done: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """
+    Импортирует модули по очереди в фоновом потоке (daemon): отсутствующие
+    и сломанные пропускаются — ошибка проявится при первом настоящем
+    использовании. Время каждого импорта записывается в preload_times.
+    """
+    names = list(names)
+
+    def run():
+        for name in names:
+            if name in sys.modules:
+                continue
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception:
+                continue
+            preload_times[name] = time.perf_counter() - start
+        if on_done is not None:
+            on_done()
+
+    thread = threading.Thread(target=run, name="preload-modules", daemon=True)
+    thread.start()
+    return thread
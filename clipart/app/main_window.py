@@ -35,12 +35,18 @@ from app.models import (
     Project, OverlayElement, UndoRedoManager,
     save_last_preset, load_last_preset
 )
-from app.video_preview import VideoPreviewWidget, PlaybackControlBar
+from app.video_preview import (
+    VideoPreviewWidget, PlaybackControlBar, gif_cache, load_gif_cache_limit_setting
+)
 from app.sidebar import ElementLibrary, ElementProperties
 from app.elements_table import ElementsTableWidget
-from app.render_engine import (
-    RenderWorker, BatchRenderWorker, load_gpu_setting,
-    find_video_files, load_output_settings, save_output_settings
+from app.font_index import font_index
+from app.index_workers import FontIndexWorker
+from app.render_engine import find_video_files
+from app.render_workers import (
+    RenderWorker, BatchRenderWorker, load_gpu_setting, load_backend_setting,
+    load_batch_workers_setting, load_gpu_sessions_setting,
+    load_output_settings, save_output_settings
 )
 from app.github_upload import (
     GitHubUploadWorker, load_github_settings, GITHUB_REPO_URL
@@ -62,7 +68,7 @@ class MainWindow(QMainWindow):
 
         # Данные
         self._project = Project()
-        self._undo = UndoRedoManager(max_steps=30)
+        self._undo = UndoRedoManager()
         self._selected_element_id: Optional[str] = None
         self._placing_asset_name: Optional[str] = None
         self._placing_asset_path: Optional[str] = None
@@ -92,6 +98,17 @@ class MainWindow(QMainWindow):
         self._chk_batch.setChecked(out_settings.get("batch", False))
         self._edit_out_dir.setText(out_settings.get("out_dir", ""))
 
+        # Лимит памяти кеша кадров GIF в превью
+        gif_cache.set_max_bytes(load_gif_cache_limit_setting() * 1024 * 1024)
+
+        # Индекс шрифтов: чтение с диска (или обход папок шрифтов) в фоне,
+        # затем список шрифтов панели свойств сужается до найденных
+        self._font_index_worker = FontIndexWorker(self)
+        self._font_index_worker.index_ready.connect(
+            lambda: self._properties.set_font_families(font_index.families())
+        )
+        self._font_index_worker.start()
+
         # Загрузка последнего пресета наложений
         self._load_last_preset()
 
@@ -411,6 +428,8 @@ class MainWindow(QMainWindow):
             )
         )
         self._playback_bar.seek_requested.connect(self._preview.seek)
+        self._playback_bar.scrub_requested.connect(self._preview.scrub)
+        self._playback_bar.set_thumbnail_provider(self._preview.thumbnail_pixmap)
 
         # Обновление кнопки play/pause при изменении состояния
         self._preview.time_changed.connect(self._on_time_tick)
@@ -591,40 +610,29 @@ class MainWindow(QMainWindow):
 
     # --- Undo / Redo ---
     def _do_undo(self):
-        restored = self._undo.undo()
-        if restored:
-            # Сохраняем путь к видео, если он не изменился
-            old_video = self._project.video_path
-            self._project = restored
-            if not self._project.video_path and old_video:
-                self._project.video_path = old_video
-            self._preview.set_project(self._project)
-            self._selected_element_id = None
-            self._properties.set_element(None)
-            self._update_all()
+        if self._undo.undo(self._project):
+            self._after_history_step()
             self._statusbar.showMessage("Отменено.")
 
     def _do_redo(self):
-        restored = self._undo.redo()
-        if restored:
-            self._project = restored
-            self._preview.set_project(self._project)
-            self._selected_element_id = None
-            self._properties.set_element(None)
-            self._update_all()
+        if self._undo.redo(self._project):
+            self._after_history_step()
             self._statusbar.showMessage("Повторено.")
 
+    def _after_history_step(self):
+        """Обновление интерфейса после undo/redo (проект изменён на месте)."""
+        self._selected_element_id = None
+        self._properties.set_element(None)
+        self._preview.set_selected(None)
+        self._update_all()
+
     # --- Таймлайн ---
     def _on_time_changed(self, t: float):
         self._playback_bar.update_time(
             t, self._preview.duration, self._preview._current_frame
         )
-        # Обновляем подсветку в таблице
-        self._elements_table.update_elements(
-            self._project.elements, t
-        )
-        if self._selected_element_id:
-            self._elements_table.highlight_row(self._selected_element_id)
+        # Обновляем подсветку в таблице (только строки, сменившие видимость)
+        self._elements_table.set_time(t, self._visible_ids(t))
 
     def _on_time_tick(self, t: float):
         self._playback_bar.set_playing(self._preview.is_playing)
@@ -702,6 +710,7 @@ class MainWindow(QMainWindow):
         prefix = self._edit_prefix.text().strip() or "cta_"
         batch = self._chk_batch.isChecked()
         use_gpu = load_gpu_setting()
+        backend = load_backend_setting()
 
         # Папка вывода: из поля, или {папка_видео}/out/ по умолчанию
         video_dir = str(Path(self._project.video_path).parent)
@@ -712,11 +721,12 @@ class MainWindow(QMainWindow):
         self._preview.pause()
 
         if batch:
-            self._render_batch(video_dir, out_dir, prefix, use_gpu)
+            self._render_batch(video_dir, out_dir, prefix, use_gpu, backend)
         else:
-            self._render_single(out_dir, prefix, use_gpu)
+            self._render_single(out_dir, prefix, use_gpu, backend)
 
-    def _render_single(self, out_dir: str, prefix: str, use_gpu: bool):
+    def _render_single(self, out_dir: str, prefix: str, use_gpu: bool,
+                       backend: str):
         """Рендеринг одного файла → {out_dir}/{prefix}{name}.mp4"""
         out_name = f"{prefix}{Path(self._project.video_path).stem}.mp4"
         out_path = str(Path(out_dir) / out_name)
@@ -725,9 +735,10 @@ class MainWindow(QMainWindow):
         dlg.add_log(f"Вывод: {out_path}")
 
         self._render_worker = RenderWorker(
-            self._project, out_path, use_gpu=use_gpu
+            self._project, out_path, use_gpu=use_gpu, backend=backend
         )
         self._render_worker.progress.connect(dlg.set_progress)
+        self._render_worker.stats.connect(dlg.set_stats)
         self._render_worker.log.connect(dlg.add_log)
         self._render_worker.finished_ok.connect(
             lambda p: self._on_render_finished(p, dlg)
@@ -741,7 +752,7 @@ class MainWindow(QMainWindow):
         dlg.exec()
 
     def _render_batch(self, video_dir: str, out_dir: str,
-                      prefix: str, use_gpu: bool):
+                      prefix: str, use_gpu: bool, backend: str):
         """Пакетный рендеринг всех видео в папке → {out_dir}/{prefix}{name}.mp4"""
         video_files = find_video_files(video_dir)
         if not video_files:
@@ -770,7 +781,9 @@ class MainWindow(QMainWindow):
         dlg.label.setText(f"Пакетная обработка: {len(video_files)} файл(ов)")
 
         self._render_worker = BatchRenderWorker(
-            elements_data, video_files, out_dir, prefix, use_gpu
+            elements_data, video_files, out_dir, prefix, use_gpu, backend,
+            workers=load_batch_workers_setting(),
+            gpu_sessions=load_gpu_sessions_setting(),
         )
         self._render_worker.progress.connect(dlg.set_progress)
         self._render_worker.log.connect(dlg.add_log)
@@ -869,12 +882,17 @@ class MainWindow(QMainWindow):
 
     def _update_table(self):
         """Обновить таблицу элементов."""
+        t = self._preview.current_time
         self._elements_table.update_elements(
-            self._project.elements, self._preview.current_time
+            self._project.elements, t, self._visible_ids(t)
         )
         if self._selected_element_id:
             self._elements_table.highlight_row(self._selected_element_id)
 
+    def _visible_ids(self, t: float) -> set:
+        """id элементов, видимых в момент t (через индекс проекта по времени)."""
+        return {e.id for e in self._project.visible_elements_at(t)}
+
     # --- Закрытие ---
     def closeEvent(self, event):
         # Сохраняем настройки вывода
@@ -898,4 +916,7 @@ class MainWindow(QMainWindow):
             if answer != QMessageBox.StandardButton.Yes:
                 event.ignore()
                 return
+        self._preview.shutdown()
+        self._library.shutdown()
+        self._font_index_worker.wait()
         event.accept()
@@ -3,18 +3,28 @@ models.py — Модели данных приложения Video CTA Overlay E
 
 Содержит:
   - OverlayElement: данные одного наложенного элемента (позиция, время, масштаб и т.д.)
-  - Project: набор элементов + путь к видео, сериализация в JSON
-  - UndoRedoManager: простая система отмены/повтора (до 30 шагов)
+  - Project: набор элементов + путь к видео, сериализация в JSON,
+    индекс по времени для запросов «какие элементы видны в момент t»
+  - UndoRedoManager: отмена/повтор на основе патчей (только изменённые поля,
+    склейка быстрых правок, лимит истории в байтах)
 """
 
 from __future__ import annotations
 
-import copy
 import json
+import sys
+import time
 import uuid
-from dataclasses import dataclass, field, asdict
+import weakref
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, asdict, fields
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+
+# Поля, при изменении которых элемент переиндексируется в Project
+_TIME_FIELDS = frozenset(("start_time", "duration"))
 
 
 # ---------------------------------------------------------------------------
@@ -63,6 +73,24 @@ class OverlayElement:
     text_outline: bool = True           # обводка вокруг текста
     text_outline_color: str = "#000000" # цвет обводки (hex)
 
+    # --- Уведомление проекта об изменении времени / id ---
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _TIME_FIELDS or name == "id":
+            owner = self.__dict__.get("_owner")
+            project = owner() if owner is not None else None
+            if project is not None:
+                if name == "id":
+                    project._rebuild_id_index()
+                else:
+                    project._on_element_timing_changed(self)
+
+    def __getstate__(self):
+        # Слабая ссылка на проект не сериализуется (pickle для пула процессов)
+        state = self.__dict__.copy()
+        state.pop("_owner", None)
+        return state
+
     # --- Вспомогательные свойства ---
     @property
     def end_time(self) -> float:
@@ -102,52 +130,203 @@ class OverlayElement:
         return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
 
 
+# ---------------------------------------------------------------------------
+# Индекс элементов по времени
+# ---------------------------------------------------------------------------
+class _TimeIndex:
+    """
+    Индекс «какие элементы активны в момент t» за O(log n + k).
+
+    Короткие элементы лежат в списке, отсортированном по start_time:
+    активный в момент t элемент начался не раньше t − LONG_DURATION,
+    поэтому достаточно бинарного поиска окна [t − LONG_DURATION, t].
+    Длинные элементы (в т.ч. «до конца видео») хранятся отдельно —
+    их обычно единицы, они проверяются перебором.
+    """
+
+    LONG_DURATION = 30.0  # сек
+
+    def __init__(self):
+        self._starts: List[float] = []
+        self._items: List[OverlayElement] = []
+        self._long: List[OverlayElement] = []
+        # id(elem) → start_time, под которым элемент лежит в _starts (None — длинный)
+        self._keys: Dict[int, Optional[float]] = {}
+
+    def add(self, elem: OverlayElement) -> None:
+        if elem.duration > self.LONG_DURATION:
+            self._long.append(elem)
+            self._keys[id(elem)] = None
+            return
+        start = elem.start_time
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._items.insert(i, elem)
+        self._keys[id(elem)] = start
+
+    def remove(self, elem: OverlayElement) -> None:
+        if id(elem) not in self._keys:
+            return
+        start = self._keys.pop(id(elem))
+        if start is None:
+            self._long = [e for e in self._long if e is not elem]
+            return
+        i = bisect_left(self._starts, start)
+        while i < len(self._items) and self._starts[i] == start:
+            if self._items[i] is elem:
+                del self._starts[i]
+                del self._items[i]
+                return
+            i += 1
+
+    def update(self, elem: OverlayElement) -> None:
+        self.remove(elem)
+        self.add(elem)
+
+    def active_at(self, t: float) -> List[OverlayElement]:
+        """Активные в момент *t* элементы (порядок не определён)."""
+        lo = bisect_left(self._starts, t - self.LONG_DURATION)
+        hi = bisect_right(self._starts, t)
+        result = [e for e in self._items[lo:hi] if e.is_visible_at(t)]
+        result.extend(e for e in self._long if e.is_visible_at(t))
+        return result
+
+
 # ---------------------------------------------------------------------------
 # Проект: видео + все наложенные элементы
 # ---------------------------------------------------------------------------
 @dataclass
 class Project:
-    """Набор данных проекта."""
+    """
+    Набор данных проекта.
+
+    Элементы изменяются через методы add/remove/move_*; правка времени
+    элемента (start_time/duration) сама обновляет индекс по времени.
+    """
 
     video_path: str = ""
     elements: List[OverlayElement] = field(default_factory=list)
     name: str = "Новый проект"
 
+    def __post_init__(self):
+        self._time_index = _TimeIndex()
+        self._id_index: Dict[str, int] = {}   # id элемента → позиция в списке
+        for elem in self.elements:
+            self._attach(elem)
+        self._rebuild_id_index()
+
+    def __getstate__(self):
+        # Индексы не копируются — пересобираются в __setstate__ (deepcopy/pickle)
+        return {"video_path": self.video_path, "elements": self.elements,
+                "name": self.name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    # --- Индексы ---
+    def _attach(self, elem: OverlayElement) -> None:
+        object.__setattr__(elem, "_owner", weakref.ref(self))
+        self._time_index.add(elem)
+
+    def _detach(self, elem: OverlayElement) -> None:
+        self._time_index.remove(elem)
+        elem.__dict__.pop("_owner", None)
+
+    def _on_element_timing_changed(self, elem: OverlayElement) -> None:
+        """Вызывается элементом при изменении start_time/duration."""
+        self._time_index.update(elem)
+
+    def _rebuild_id_index(self, start: int = 0) -> None:
+        """Пересчитывает позиции элементов начиная с *start*."""
+        if start == 0:
+            self._id_index = {}
+        for i in range(start, len(self.elements)):
+            self._id_index[self.elements[i].id] = i
+
+    def _index_of(self, elem_id: str) -> Optional[int]:
+        """
+        Позиция элемента по id за O(1).
+        Если список elements изменили в обход методов Project,
+        индекс пересобирается (защита от рассинхронизации).
+        """
+        i = self._id_index.get(elem_id)
+        if i is not None and i < len(self.elements) and self.elements[i].id == elem_id:
+            return i
+        if i is None and len(self._id_index) == len(self.elements):
+            return None
+        self._rebuild_id_index()
+        return self._id_index.get(elem_id)
+
+    def position_of(self, elem: OverlayElement) -> int:
+        """Позиция элемента в списке (порядок наложения)."""
+        i = self._index_of(elem.id)
+        return len(self.elements) if i is None else i
+
     # --- Управление элементами ---
     def add_element(self, elem: OverlayElement) -> None:
         self.elements.append(elem)
+        self._attach(elem)
+        self._id_index[elem.id] = len(self.elements) - 1
+
+    def insert_element(self, index: int, elem: OverlayElement) -> None:
+        """Вставляет элемент в позицию *index* (порядок наложения)."""
+        index = max(0, min(index, len(self.elements)))
+        self.elements.insert(index, elem)
+        self._attach(elem)
+        self._rebuild_id_index(index)
 
     def remove_element(self, elem_id: str) -> Optional[OverlayElement]:
-        for i, e in enumerate(self.elements):
-            if e.id == elem_id:
-                return self.elements.pop(i)
-        return None
+        i = self._index_of(elem_id)
+        if i is None:
+            return None
+        elem = self.elements.pop(i)
+        self._detach(elem)
+        del self._id_index[elem_id]
+        self._rebuild_id_index(i)
+        return elem
 
     def get_element(self, elem_id: str) -> Optional[OverlayElement]:
-        for e in self.elements:
-            if e.id == elem_id:
-                return e
-        return None
+        i = self._index_of(elem_id)
+        return None if i is None else self.elements[i]
+
+    def _swap(self, i: int, j: int) -> None:
+        els = self.elements
+        els[i], els[j] = els[j], els[i]
+        self._id_index[els[i].id] = i
+        self._id_index[els[j].id] = j
 
     def move_element_up(self, elem_id: str) -> bool:
         """Сдвигает элемент на одну позицию вверх в списке."""
-        for i, e in enumerate(self.elements):
-            if e.id == elem_id and i > 0:
-                self.elements[i], self.elements[i - 1] = self.elements[i - 1], self.elements[i]
-                return True
-        return False
+        i = self._index_of(elem_id)
+        if i is None or i == 0:
+            return False
+        self._swap(i, i - 1)
+        return True
 
     def move_element_down(self, elem_id: str) -> bool:
         """Сдвигает элемент на одну позицию вниз в списке."""
-        for i, e in enumerate(self.elements):
-            if e.id == elem_id and i < len(self.elements) - 1:
-                self.elements[i], self.elements[i + 1] = self.elements[i + 1], self.elements[i]
-                return True
-        return False
+        i = self._index_of(elem_id)
+        if i is None or i >= len(self.elements) - 1:
+            return False
+        self._swap(i, i + 1)
+        return True
+
+    def reorder_elements(self, order: List[str]) -> None:
+        """Расставляет элементы в порядке списка id (неизвестные id пропускаются)."""
+        by_id = {e.id: e for e in self.elements}
+        self.elements[:] = [by_id[i] for i in order if i in by_id]
+        self._rebuild_id_index()
 
     def visible_elements_at(self, t: float) -> List[OverlayElement]:
-        """Возвращает элементы, видимые в момент времени *t*."""
-        return [e for e in self.elements if e.is_visible_at(t)]
+        """
+        Возвращает элементы, видимые в момент времени *t*,
+        в порядке списка (порядке наложения). O(log n + k).
+        """
+        active = self._time_index.active_at(t)
+        if len(active) > 1:
+            active.sort(key=self.position_of)
+        return active
 
     # --- Сериализация ---
     def to_dict(self) -> dict:
@@ -183,56 +362,248 @@ class Project:
 # ---------------------------------------------------------------------------
 # Система Undo / Redo
 # ---------------------------------------------------------------------------
-class UndoRedoManager:
+# Поля элемента в фиксированном порядке: состояние элемента — кортеж значений
+_ELEM_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(OverlayElement))
+_elem_values = attrgetter(*_ELEM_FIELDS)
+
+# Метаданные проекта, участвующие в истории (путь к видео — нет:
+# отмена не должна «отсоединять» открытое видео)
+_PROJECT_META = ("name",)
+
+
+@dataclass
+class _Patch:
     """
-    Простой менеджер отмены/повтора на основе снимков состояния.
-    Хранит до *max_steps* снимков проекта.
+    Одно действие в истории — разница между двумя состояниями проекта.
+      sets    — (id, номер поля, старое, новое)
+      added   — (позиция в новом списке, значения элемента)
+      removed — (позиция в старом списке, значения элемента)
+      order   — (старый порядок id, новый порядок id), если элементы переставлены
+      meta    — (поле проекта, старое, новое)
     """
 
-    def __init__(self, max_steps: int = 30):
-        self._history: List[dict] = []
-        self._index: int = -1
-        self._max_steps = max_steps
+    sets: List[Tuple[str, int, object, object]] = field(default_factory=list)
+    added: List[Tuple[int, tuple]] = field(default_factory=list)
+    removed: List[Tuple[int, tuple]] = field(default_factory=list)
+    order: Optional[Tuple[List[str], List[str]]] = None
+    meta: List[Tuple[str, object, object]] = field(default_factory=list)
+    stamp: float = 0.0
+    nbytes: int = 0
+
+    def is_empty(self) -> bool:
+        return not (self.sets or self.added or self.removed or self.order or self.meta)
+
+    def only_sets(self) -> bool:
+        return bool(self.sets) and not (self.added or self.removed or self.order or self.meta)
+
+    def set_keys(self) -> set:
+        return {(eid, fi) for eid, fi, _, _ in self.sets}
+
+    def estimate_bytes(self) -> int:
+        """Приблизительный объём памяти патча."""
+        size = 200
+        for _, _, old, new in self.sets:
+            size += 100 + sys.getsizeof(old) + sys.getsizeof(new)
+        for _, values in self.added + self.removed:
+            size += 100 + sum(sys.getsizeof(v) for v in values)
+        if self.order:
+            size += 16 * (len(self.order[0]) + len(self.order[1]))
+        for _, old, new in self.meta:
+            size += 100 + sys.getsizeof(old) + sys.getsizeof(new)
+        return size
 
-    def save_state(self, project: Project) -> None:
-        """Сохранить текущее состояние проекта в историю."""
-        snapshot = copy.deepcopy(project.to_dict())
 
-        # Обрезаем «будущие» состояния, если были отмены
-        self._history = self._history[: self._index + 1]
-        self._history.append(snapshot)
+class UndoRedoManager:
+    """
+    Менеджер отмены/повтора на основе патчей.
+
+    Хранится только текущее состояние (кортежи значений элементов) и
+    список патчей: save_state() сравнивает проект с текущим состоянием и
+    записывает лишь изменённые поля / добавленные / удалённые элементы.
+    Быстрые правки одних и тех же полей (слайдер, спинбокс) в пределах
+    *coalesce_sec* склеиваются в один шаг. Объём истории ограничен
+    *max_bytes*: при превышении отбрасываются самые старые шаги.
+    undo/redo применяют патч к проекту на месте — O(изменений).
+    """
 
-        # Ограничиваем длину истории
-        if len(self._history) > self._max_steps:
-            self._history = self._history[-self._max_steps:]
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024, coalesce_sec: float = 0.6):
+        self._max_bytes = max_bytes
+        self._coalesce_sec = coalesce_sec
+        self._patches: List[_Patch] = []
+        self._index: int = 0                       # число применённых патчей
+        self._bytes: int = 0
+        self._values: Optional[Dict[str, tuple]] = None   # id → значения полей
+        self._order: List[str] = []
+        self._meta: Dict[str, object] = {}
+
+    # --- Запись ---
+    def save_state(self, project: Project) -> None:
+        """Зафиксировать изменения проекта с момента прошлого сохранения."""
+        values = {e.id: _elem_values(e) for e in project.elements}
+        order = [e.id for e in project.elements]
+        meta = {k: getattr(project, k) for k in _PROJECT_META}
 
-        self._index = len(self._history) - 1
+        if self._values is None:
+            # Первое сохранение — базовое состояние, без патча
+            self._values, self._order, self._meta = values, order, meta
+            return
 
-    def undo(self) -> Optional[Project]:
-        """Вернуть предыдущее состояние проекта (или None)."""
-        if self._index > 0:
-            self._index -= 1
-            return Project.from_dict(copy.deepcopy(self._history[self._index]))
-        return None
+        patch = self._diff(values, order, meta)
+        self._values, self._order, self._meta = values, order, meta
+        if patch.is_empty():
+            return
 
-    def redo(self) -> Optional[Project]:
-        """Повторить отменённое действие (или None)."""
-        if self._index < len(self._history) - 1:
-            self._index += 1
-            return Project.from_dict(copy.deepcopy(self._history[self._index]))
-        return None
+        patch.stamp = time.monotonic()
 
+        # Обрезаем «будущие» состояния, если были отмены
+        if self._index < len(self._patches):
+            for dropped in self._patches[self._index:]:
+                self._bytes -= dropped.nbytes
+            del self._patches[self._index:]
+
+        if self._coalesce(patch):
+            return
+
+        patch.nbytes = patch.estimate_bytes()
+        self._patches.append(patch)
+        self._bytes += patch.nbytes
+        self._index = len(self._patches)
+        self._trim()
+
+    def _diff(self, values: Dict[str, tuple], order: List[str],
+              meta: Dict[str, object]) -> _Patch:
+        old_values, old_order = self._values, self._order
+        patch = _Patch()
+
+        for i, eid in enumerate(old_order):
+            if eid not in values:
+                patch.removed.append((i, old_values[eid]))
+        for i, eid in enumerate(order):
+            old = old_values.get(eid)
+            if old is None:
+                patch.added.append((i, values[eid]))
+            elif old != values[eid]:
+                new = values[eid]
+                for fi, (a, b) in enumerate(zip(old, new)):
+                    if a != b:
+                        patch.sets.append((eid, fi, a, b))
+
+        common_old = [eid for eid in old_order if eid in values]
+        common_new = [eid for eid in order if eid in old_values]
+        if common_old != common_new:
+            patch.order = (list(old_order), list(order))
+
+        for k, v in meta.items():
+            if self._meta.get(k) != v:
+                patch.meta.append((k, self._meta.get(k), v))
+        return patch
+
+    def _coalesce(self, patch: _Patch) -> bool:
+        """Склеивает патч с последним, если это продолжение той же правки."""
+        if not self._patches or self._index != len(self._patches):
+            return False
+        top = self._patches[-1]
+        if not (patch.only_sets() and top.only_sets()):
+            return False
+        if patch.stamp - top.stamp > self._coalesce_sec:
+            return False
+        if patch.set_keys() != top.set_keys():
+            return False
+
+        newest = {(eid, fi): b for eid, fi, _, b in patch.sets}
+        top.sets = [(eid, fi, a, newest[(eid, fi)]) for eid, fi, a, _ in top.sets]
+        top.sets = [op for op in top.sets if op[2] != op[3]]
+        top.stamp = patch.stamp
+        self._bytes -= top.nbytes
+        if not top.sets:
+            # Значение вернулось к исходному — шаг не нужен
+            self._patches.pop()
+            self._index = len(self._patches)
+            return True
+        top.nbytes = top.estimate_bytes()
+        self._bytes += top.nbytes
+        return True
+
+    def _trim(self) -> None:
+        """Отбрасывает самые старые шаги, пока история не уложится в лимит."""
+        drop = 0
+        while self._bytes > self._max_bytes and drop < len(self._patches) - 1:
+            self._bytes -= self._patches[drop].nbytes
+            drop += 1
+        if drop:
+            del self._patches[:drop]
+            self._index -= drop
+
+    # --- Применение ---
+    def undo(self, project: Project) -> bool:
+        """Отменить последнее действие (на месте). False — отменять нечего."""
+        if not self.can_undo:
+            return False
+        self._index -= 1
+        self._apply(project, self._patches[self._index], forward=False)
+        return True
+
+    def redo(self, project: Project) -> bool:
+        """Повторить отменённое действие (на месте). False — повторять нечего."""
+        if not self.can_redo:
+            return False
+        self._apply(project, self._patches[self._index], forward=True)
+        self._index += 1
+        return True
+
+    def _apply(self, project: Project, patch: _Patch, forward: bool) -> None:
+        id_pos = _ELEM_FIELDS.index("id")
+        to_remove = patch.removed if forward else patch.added
+        to_insert = patch.added if forward else patch.removed
+
+        for _, values in to_remove:
+            eid = values[id_pos]
+            project.remove_element(eid)
+            self._values.pop(eid, None)
+
+        for eid, fi, old, new in patch.sets:
+            value = new if forward else old
+            elem = project.get_element(eid)
+            if elem is not None:
+                setattr(elem, _ELEM_FIELDS[fi], value)
+            vals = list(self._values[eid])
+            vals[fi] = value
+            self._values[eid] = tuple(vals)
+
+        for pos, values in sorted(to_insert, key=lambda x: x[0]):
+            project.insert_element(pos, OverlayElement(**dict(zip(_ELEM_FIELDS, values))))
+            self._values[values[id_pos]] = values
+
+        if patch.order:
+            project.reorder_elements(patch.order[1] if forward else patch.order[0])
+
+        for k, old, new in patch.meta:
+            value = new if forward else old
+            setattr(project, k, value)
+            self._meta[k] = value
+
+        self._order = [e.id for e in project.elements]
+
+    # --- Состояние ---
     @property
     def can_undo(self) -> bool:
         return self._index > 0
 
     @property
     def can_redo(self) -> bool:
-        return self._index < len(self._history) - 1
+        return self._index < len(self._patches)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
 
     def clear(self) -> None:
-        self._history.clear()
-        self._index = -1
+        self._patches.clear()
+        self._index = 0
+        self._bytes = 0
+        self._values = None
+        self._order = []
+        self._meta = {}
 
 
 # ---------------------------------------------------------------------------
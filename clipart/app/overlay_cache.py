@@ -0,0 +1,219 @@
+"""
+overlay_cache.py — Кеш подготовленных оверлеев для рендеринга.
+
+Подготовка оверлея (загрузка GIF, LANCZOS-масштабирование, удаление фона,
+отрисовка текста) зависит только от параметров элемента и высоты
+целевого видео. Поэтому результат кешируется по ключу из содержимого:
+  • для файлов — хеш содержимого + target_h + remove_bg + допуск
+  • для текста — текст, шрифт, цвета, обводка, масштаб + высота видео
+
+Кеш живёт в памяти (LRU с лимитом по байтам) и, опционально,
+сбрасывается на диск (.npz) — так процессы пакетного рендера
+делят уже подготовленные ассеты между собой.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.asset_index import asset_index
+from app.models import OverlayElement
+
+
+# ---------------------------------------------------------------------------
+# Хеш содержимого файла (из постоянного индекса ассетов)
+# ---------------------------------------------------------------------------
+def file_digest(path: str) -> Optional[str]:
+    """
+    Хеш содержимого файла (blake2b, 128 бит).
+    Берётся из asset_index: файл хешируется один раз, пока не изменятся
+    его mtime или размер, — в том числе между запусками и процессами.
+    """
+    return asset_index.digest(path)
+
+
+# ---------------------------------------------------------------------------
+# Ключи кеша
+# ---------------------------------------------------------------------------
+def text_asset_key(elem: OverlayElement) -> Tuple:
+    """
+    Ключ для текстового CTA: все параметры, влияющие на картинку.
+    Размер кадра не входит — текст рисуется по font_size и scale.
+    """
+    return (
+        "text", elem.text, elem.font_family, elem.font_size, elem.font_color,
+        elem.text_bold, elem.text_italic, elem.text_bg_color,
+        elem.text_outline, elem.text_outline_color, elem.scale,
+    )
+
+
+def file_asset_key(kind: str, elem: OverlayElement, target_h: int) -> Optional[Tuple]:
+    """
+    Ключ для файлового ассета (gif/image).
+    None — файл не читается, кешировать нечего.
+    """
+    digest = file_digest(elem.file_path)
+    if digest is None:
+        return None
+    tolerance = elem.bg_tolerance if elem.remove_bg else 0
+    return (kind, digest, target_h, elem.remove_bg, tolerance)
+
+
+def _key_name(key: Tuple) -> str:
+    """Имя файла для ключа при сбросе на диск."""
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Размер значения в байтах
+# ---------------------------------------------------------------------------
+def _value_nbytes(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_value_nbytes(v) for v in value)
+    if isinstance(value, list):
+        return sum(_value_nbytes(v) for v in value)
+    return 0
+
+
+def _freeze(value: Any) -> Any:
+    """Делает массивы только для чтения — кешированные данные общие."""
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Кеш подготовленных оверлеев
+# ---------------------------------------------------------------------------
+class OverlayAssetCache:
+    """
+    Потокобезопасный LRU-кеш подготовленных оверлеев.
+
+    Значения: RGBA-массив (np.ndarray) или кадры GIF (list[np.ndarray], list[float]).
+    Если задан spill_dir, промахи сначала ищутся на диске, а новые
+    значения туда записываются (общий кеш для процессов пакета).
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self._max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._spill_dir: Optional[Path] = None
+        self.hits = 0
+        self.misses = 0
+
+    # --- Настройка ---
+    def set_spill_dir(self, path: Optional[str]) -> None:
+        """Включает (путь) или выключает (None) сброс кеша на диск."""
+        self._spill_dir = Path(path) if path else None
+        if self._spill_dir:
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    # --- Основной метод ---
+    def get_or_build(self, key: Optional[Tuple], builder: Callable[[], Any]) -> Any:
+        """
+        Возвращает значение по ключу; при промахе вызывает builder().
+        key=None — кеширование отключено для этого вызова.
+        """
+        if key is None:
+            return builder()
+
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+
+        value = self._load_spilled(key)
+        if value is None:
+            value = builder()
+            if value is None:
+                return None
+            self._spill(key, value)
+
+        self.misses += 1
+        self._put(key, _freeze(value))
+        return value
+
+    def _put(self, key: Tuple, value: Any) -> None:
+        nbytes = _value_nbytes(value)
+        if nbytes > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = value
+            self._sizes[key] = nbytes
+            self._bytes += nbytes
+            while self._bytes > self._max_bytes and self._items:
+                old_key, _ = self._items.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key, 0)
+
+    # --- Сброс на диск ---
+    def _spill_path(self, key: Tuple) -> Optional[Path]:
+        if self._spill_dir is None:
+            return None
+        return self._spill_dir / f"{_key_name(key)}.npz"
+
+    def _spill(self, key: Tuple, value: Any) -> None:
+        path = self._spill_path(key)
+        if path is None or path.exists():
+            return
+        try:
+            if isinstance(value, np.ndarray):
+                payload = {"image": value}
+            else:
+                frames, durations = value
+                payload = {f"frame_{i}": f for i, f in enumerate(frames)}
+                payload["durations"] = np.asarray(durations, dtype=np.float64)
+            # Пишем во временный файл и переименовываем — другой процесс
+            # не увидит недописанный архив
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(tmp, **payload)
+            os.replace(tmp, path)
+        except Exception:
+            pass
+
+    def _load_spilled(self, key: Tuple) -> Any:
+        path = self._spill_path(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                if "image" in data.files:
+                    return data["image"]
+                durations = data["durations"].tolist()
+                frames: List[np.ndarray] = [
+                    data[f"frame_{i}"] for i in range(len(durations))
+                ]
+                return frames, durations
+        except Exception:
+            return None
+
+
+# Глобальный кеш процесса — общий для всех рендеров (единичных и пакетных)
+overlay_cache = OverlayAssetCache()
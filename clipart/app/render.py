@@ -0,0 +1,165 @@
+"""
+render.py — Пакетный рендер из командной строки (без интерфейса и PyQt6).
+
+Накладывает элементы проекта (или пресета) на список видео — для
+серверов рендера без дисплея. Использует те же render_project /
+render_batch, что и интерфейс; PyQt6 не импортируется.
+
+Запуск (из папки clipart/):
+    python -m app.render projects/promo.json videos/*.mp4 -o outputs/ -j 4
+    python -m app.render last_overlay.json D:/videos --codec x264
+
+Проект — JSON проекта (video_path + elements) или пресета (список
+элементов, как last_overlay.json). Видео — файлы, папки (все видео
+внутри, без рекурсии) или шаблоны glob; без видео рендерится video_path
+проекта. Код выхода: 0 — все файлы готовы, 1 — были ошибки, 2 — ошибка
+параметров.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+from typing import List, Optional, Tuple
+
+from app.models import OverlayElement
+from app.render_engine import (
+    BACKEND_MOVIEPY, DEFAULT_GPU_SESSIONS, MAX_BATCH_WORKERS, MOVIEPY_AVAILABLE,
+    RENDER_BACKENDS, VIDEO_EXTENSIONS, check_nvenc_available,
+    batch_summary, default_batch_workers, find_video_files, render_batch,
+)
+
+# Кодеки: auto — NVENC, если доступен, иначе libx264
+CODEC_AUTO = "auto"
+CODEC_NVENC = "nvenc"
+CODEC_X264 = "x264"
+CODECS = (CODEC_AUTO, CODEC_NVENC, CODEC_X264)
+
+
+# ---------------------------------------------------------------------------
+# Входные данные
+# ---------------------------------------------------------------------------
+def load_elements(path: str) -> Tuple[List[dict], str]:
+    """
+    Элементы из файла проекта или пресета.
+    Возвращает (сериализованные элементы, video_path проекта или "").
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        items, video_path = data, ""
+    elif isinstance(data, dict):
+        items, video_path = data.get("elements", []), data.get("video_path", "")
+    else:
+        raise ValueError("ожидается JSON проекта или пресета")
+    # Через OverlayElement — значения по умолчанию для недостающих полей
+    return [OverlayElement.from_dict(d).to_dict() for d in items], video_path or ""
+
+
+def expand_videos(specs: List[str]) -> List[str]:
+    """Файлы, папки и шаблоны glob → список видео без повторов (в порядке указания)."""
+    result: List[str] = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            paths = find_video_files(spec)
+        elif glob.has_magic(spec):
+            paths = sorted(p for p in glob.glob(spec, recursive=True)
+                           if os.path.isfile(p)
+                           and os.path.splitext(p)[1].lower() in VIDEO_EXTENSIONS)
+        else:
+            paths = [spec]
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in result:
+                result.append(path)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Командная строка
+# ---------------------------------------------------------------------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.render",
+        description="Пакетный рендер CTA-наложений без интерфейса.",
+    )
+    parser.add_argument("project", help="JSON проекта или пресета наложений")
+    parser.add_argument("videos", nargs="*",
+                        help="видео, папки или шаблоны glob (по умолчанию — video_path проекта)")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="папка результатов (по умолчанию out/ рядом с каждым видео)")
+    parser.add_argument("-p", "--prefix", default="cta_",
+                        help="префикс имени выходного файла (по умолчанию cta_)")
+    parser.add_argument("-j", "--workers", type=int, default=default_batch_workers(),
+                        help=f"число процессов рендера, 1–{MAX_BATCH_WORKERS} "
+                             f"(по умолчанию {default_batch_workers()})")
+    parser.add_argument("--codec", choices=CODECS, default=CODEC_AUTO,
+                        help="кодировщик: auto — NVENC при наличии, иначе libx264")
+    parser.add_argument("--gpu-sessions", type=int, default=DEFAULT_GPU_SESSIONS,
+                        help="лимит одновременных NVENC-кодирований")
+    parser.add_argument("--backend", choices=RENDER_BACKENDS, default=BACKEND_MOVIEPY,
+                        help="движок: moviepy — композиция в Python, ffmpeg — filter_complex")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="только ошибки и итог")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        elements_data, project_video = load_elements(args.project)
+    except (OSError, ValueError) as e:
+        parser.error(f"не удалось прочитать {args.project}: {e}")
+    if not elements_data:
+        parser.error(f"в {args.project} нет элементов")
+
+    videos = expand_videos(args.videos) if args.videos else (
+        [os.path.abspath(project_video)] if project_video else [])
+    if not videos:
+        parser.error("не найдено ни одного видео")
+    missing = [v for v in videos if not os.path.isfile(v)]
+    if missing:
+        parser.error("видео не найдено: " + ", ".join(missing))
+
+    if args.codec == CODEC_NVENC and not check_nvenc_available():
+        parser.error("NVENC недоступен (нет NVIDIA GPU или ffmpeg без h264_nvenc)")
+    if args.backend == BACKEND_MOVIEPY and not MOVIEPY_AVAILABLE:
+        parser.error("MoviePy не установлен (pip install moviepy) — используйте --backend ffmpeg")
+    use_gpu = args.codec != CODEC_X264
+
+    last_progress = -1
+
+    def log(msg: str):
+        if not args.quiet or "ОШИБКА" in msg:
+            print(msg, flush=True)
+
+    def progress(val: int):
+        nonlocal last_progress
+        # Каждые 5% — не засоряем лог фермы
+        if args.quiet or val == last_progress or (val < 100 and val - last_progress < 5):
+            return
+        last_progress = val
+        print(f"Прогресс: {val}%", file=sys.stderr, flush=True)
+
+    success, errors = render_batch(
+        elements_data, videos, args.output_dir, args.prefix, use_gpu,
+        backend=args.backend,
+        workers=max(1, min(MAX_BATCH_WORKERS, args.workers)),
+        gpu_sessions=args.gpu_sessions,
+        log_fn=log, progress_fn=progress,
+    )
+    if args.quiet:
+        print(batch_summary(success, errors, len(videos)).strip())
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    # Нужно для пула процессов пакетного рендера в собранном exe (PyInstaller)
+    multiprocessing.freeze_support()
+    sys.exit(main())
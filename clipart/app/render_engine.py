@@ -1,40 +1,55 @@
 """
 render_engine.py — Рендеринг итогового видео с наложением CTA-элементов.
 
-Использует MoviePy v2 для композиции видео + оверлеи.
+Использует MoviePy v2 для чтения/записи видео, оверлеи накладываются
+собственным компоновщиком (compositor.py, предумноженная альфа).
 Поддерживает:
   • GPU-кодирование через NVIDIA NVENC (h264_nvenc) — снимает нагрузку с CPU
   • Автоматическое определение доступности GPU
   • Фоллбэк на libx264 (CPU) если GPU недоступен
   • GIF-анимации, PNG, fade in/out
-  • Пакетную обработку нескольких видео (BatchRenderWorker)
+  • Пакетную обработку нескольких видео (render_batch),
+    в том числе параллельно в пуле процессов (ProcessPoolExecutor)
   • Автосохранение в папку out/ рядом с исходным видео
+  • Альтернативный движок: один граф фильтров ffmpeg (ffmpeg_render.py)
+  • Прогресс кодирования по числу закодированных кадров: скорость (fps)
+    и оставшееся время (RenderStats, EncodeProgress)
+
+Модуль не импортирует PyQt6: его использует и рендер из командной строки
+(render.py) на машинах без дисплея. Qt-потоки и настройки интерфейса —
+в render_workers.py.
 """
 
 from __future__ import annotations
 
 import copy
+import multiprocessing
 import os
+import queue
 import subprocess
-import traceback
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 from PIL import Image as PILImage
 
-from PyQt6.QtCore import QThread, pyqtSignal, QSettings
+from app.lazy_import import lazy_module, module_available
 
-# MoviePy v2 импорты
-try:
-    from moviepy import (
-        VideoFileClip, ImageClip, CompositeVideoClip, VideoClip, vfx
-    )
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
+# MoviePy v2 (вместе с IPython ~0.5 с) импортируется при первом рендере
+moviepy = lazy_module("moviepy")
+MOVIEPY_AVAILABLE = module_available("moviepy")
 
+from app.chroma_key import chroma_key, remove_background
+from app.gif_decoder import load_gif
 from app.models import OverlayElement, Project
+from app.compositor import OverlayLayer, FrameCompositor, make_layer
+from app.overlay_cache import overlay_cache, text_asset_key, file_asset_key, file_digest
+from app.text_render import render_text_element
 
 
 # ---------------------------------------------------------------------------
@@ -42,6 +57,28 @@ from app.models import OverlayElement, Project
 # ---------------------------------------------------------------------------
 VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.webm', '.flv', '.m4v'}
 
+# Движки рендеринга
+BACKEND_MOVIEPY = "moviepy"   # покадровая композиция в Python (MoviePy)
+BACKEND_FFMPEG = "ffmpeg"     # один процесс ffmpeg с -filter_complex
+RENDER_BACKENDS = (BACKEND_MOVIEPY, BACKEND_FFMPEG)
+
+# Параллельный пакетный рендер
+DEFAULT_GPU_SESSIONS = 2      # лимит одновременных NVENC-сессий (GeForce: 2‑3+)
+MAX_BATCH_WORKERS = 16
+
+# Прогресс файла (MoviePy) на этапе записи: звук, затем кадры
+_PROGRESS_AUDIO = (55, 60)
+_PROGRESS_FRAMES = (60, 99)
+# Строка о ходе кодирования в лог — каждые N % кадров
+_STATS_LOG_STEP = 10
+# Интервал обновления RenderStats (сек)
+_STATS_INTERVAL = 0.5
+
+
+def default_batch_workers() -> int:
+    """Число процессов пакетного рендера по умолчанию (половина ядер, до 4)."""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
 
 # ---------------------------------------------------------------------------
 # Удаление фона (chroma key) — для рендеринга
@@ -49,31 +86,9 @@ VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.webm', '.flv', '.m
 def _remove_bg_numpy(arr: np.ndarray, tolerance: int = 40) -> np.ndarray:
     """
     Удаляет фон из RGBA numpy-массива по цвету угловых пикселей.
-    Аналогичный алгоритм используется в превью (video_preview.py).
+    Общий движок с превью — app.chroma_key.
     """
-    if arr.ndim != 3 or arr.shape[2] < 3:
-        return arr
-    h, w = arr.shape[:2]
-    result = arr.copy()
-    if result.shape[2] == 3:
-        alpha_ch = np.full((h, w, 1), 255, dtype=np.uint8)
-        result = np.concatenate([result, alpha_ch], axis=2)
-
-    corner_size = max(1, min(4, h // 10, w // 10))
-    corners = []
-    for cy, cx in [(0, 0), (0, w - corner_size), (h - corner_size, 0),
-                   (h - corner_size, w - corner_size)]:
-        patch = result[cy:cy + corner_size, cx:cx + corner_size, :3]
-        corners.append(patch.reshape(-1, 3))
-    bg_color = np.median(np.concatenate(corners, axis=0), axis=0).astype(np.float32)
-
-    rgb = result[:, :, :3].astype(np.float32)
-    diff = np.sqrt(np.sum((rgb - bg_color) ** 2, axis=2))
-
-    edge_zone = tolerance * 0.3
-    soft_mask = np.clip((diff - tolerance + edge_zone) / max(edge_zone, 1), 0, 1)
-    result[:, :, 3] = (result[:, :, 3].astype(np.float32) * soft_mask).astype(np.uint8)
-    return result
+    return remove_background(arr, tolerance)
 
 
 # ---------------------------------------------------------------------------
@@ -82,6 +97,18 @@ def _remove_bg_numpy(arr: np.ndarray, tolerance: int = 40) -> np.ndarray:
 _nvenc_available: Optional[bool] = None  # кеш результата
 
 
+def get_ffmpeg_exe() -> str:
+    """
+    Путь к ffmpeg: берём бинарник из imageio-ffmpeg (тот же, что использует
+    MoviePy), иначе — ffmpeg из PATH.
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
 def check_nvenc_available() -> bool:
     """
     Проверяет, доступен ли кодировщик h264_nvenc в ffmpeg.
@@ -92,12 +119,7 @@ def check_nvenc_available() -> bool:
         return _nvenc_available
 
     try:
-        # Находим ffmpeg из imageio-ffmpeg (тот же, что использует MoviePy)
-        try:
-            import imageio_ffmpeg
-            ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-        except Exception:
-            ffmpeg_path = "ffmpeg"
+        ffmpeg_path = get_ffmpeg_exe()
 
         # Проверяем наличие h264_nvenc в списке кодировщиков
         result = subprocess.run(
@@ -119,27 +141,6 @@ def get_gpu_info() -> str:
     return "NVENC недоступен — будет использован CPU (libx264)"
 
 
-# ---------------------------------------------------------------------------
-# Загрузка GIF-кадров
-# ---------------------------------------------------------------------------
-def _load_gif_frames(path: str):
-    """Загружает кадры GIF и возвращает список numpy-массивов + длительности."""
-    frames = []
-    durations = []
-    try:
-        img = PILImage.open(path)
-        n = getattr(img, 'n_frames', 1)
-        for i in range(n):
-            img.seek(i)
-            frame = img.convert("RGBA")
-            frames.append(np.array(frame))
-            dur = img.info.get('duration', 100)
-            durations.append(dur / 1000.0)  # мс → сек
-    except Exception:
-        pass
-    return frames, durations
-
-
 # ---------------------------------------------------------------------------
 # Поиск видеофайлов в папке
 # ---------------------------------------------------------------------------
@@ -192,243 +193,80 @@ def _get_encoding_params(use_gpu: bool,
 
 
 # ---------------------------------------------------------------------------
-# Генерация текстового изображения через Pillow
-# ---------------------------------------------------------------------------
-def _render_text_image(elem: OverlayElement, target_h: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
-    """
-    Рисует текст CTA с помощью Pillow и возвращает (rgb_array, alpha_array).
-    target_h используется для масштабирования шрифта.
-    """
-    from PIL import ImageDraw, ImageFont
-
-    font_size = max(8, elem.font_size)
-
-    # Пробуем загрузить системный шрифт
-    font = None
-    try:
-        # Windows: пробуем несколько вариантов
-        for suffix in ("", ".ttf", ".TTF"):
-            for base in (elem.font_family, elem.font_family.replace(" ", "")):
-                try:
-                    font = ImageFont.truetype(base + suffix, font_size)
-                    break
-                except (OSError, IOError):
-                    continue
-            if font:
-                break
-
-        if not font:
-            # Пробуем стандартные пути Windows
-            win_fonts = Path(os.environ.get("WINDIR", r"C:\Windows")) / "Fonts"
-            for candidate in [
-                f"{elem.font_family}.ttf",
-                f"{elem.font_family.lower()}.ttf",
-                "arial.ttf", "arialbd.ttf"
-            ]:
-                font_path = win_fonts / candidate
-                if font_path.exists():
-                    font = ImageFont.truetype(str(font_path), font_size)
-                    break
-
-        if not font:
-            font = ImageFont.load_default()
-    except Exception:
-        font = ImageFont.load_default()
-
-    # Добавляем жирность через размер если нужно (Pillow не поддерживает bold напрямую)
-    # Для bold пробуем найти Bold-вариант шрифта
-    if elem.text_bold and font:
-        try:
-            win_fonts = Path(os.environ.get("WINDIR", r"C:\Windows")) / "Fonts"
-            for bold_name in [
-                f"{elem.font_family} Bold.ttf",
-                f"{elem.font_family.lower()}bd.ttf",
-                f"{elem.font_family.replace(' ', '')}bd.ttf",
-                "arialbd.ttf"
-            ]:
-                bold_path = win_fonts / bold_name
-                if bold_path.exists():
-                    font = ImageFont.truetype(str(bold_path), font_size)
-                    break
-        except Exception:
-            pass
-
-    # Определяем размер текста
-    dummy = PILImage.new("RGBA", (1, 1))
-    draw = PILImage.new("RGBA", (1, 1))
-    d = ImageDraw.Draw(dummy)
-    bbox = d.textbbox((0, 0), elem.text, font=font)
-    text_w = bbox[2] - bbox[0]
-    text_h = bbox[3] - bbox[1]
-
-    padding = int(font_size * 0.4)
-    outline_w = max(1, font_size // 12) if elem.text_outline else 0
-    img_w = text_w + padding * 2 + outline_w * 2
-    img_h = text_h + padding * 2 + outline_w * 2
-
-    # Создаём изображение
-    img = PILImage.new("RGBA", (img_w, img_h), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-
-    # Фон текста
-    if elem.text_bg_color:
-        bg = _hex_to_rgba(elem.text_bg_color, 200)
-        draw.rounded_rectangle([(0, 0), (img_w - 1, img_h - 1)], radius=8, fill=bg)
-
-    # Позиция текста
-    tx = padding + outline_w - bbox[0]
-    ty = padding + outline_w - bbox[1]
-
-    # Обводка
-    if elem.text_outline and outline_w > 0:
-        outline_rgba = _hex_to_rgba(elem.text_outline_color, 255)
-        for dx in range(-outline_w, outline_w + 1):
-            for dy in range(-outline_w, outline_w + 1):
-                if dx == 0 and dy == 0:
-                    continue
-                draw.text((tx + dx, ty + dy), elem.text, font=font, fill=outline_rgba)
-
-    # Основной текст
-    text_rgba = _hex_to_rgba(elem.font_color, 255)
-    draw.text((tx, ty), elem.text, font=font, fill=text_rgba)
-
-    arr = np.array(img)
-    rgb = arr[:, :, :3]
-    alpha = arr[:, :, 3] / 255.0
-    return rgb, alpha
-
-
-def _hex_to_rgba(hex_color: str, alpha: int = 255) -> Tuple[int, int, int, int]:
-    """Конвертирует hex-цвет (#RRGGBB) в кортеж (R, G, B, A)."""
-    hex_color = hex_color.lstrip("#")
-    if len(hex_color) == 6:
-        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-        return (r, g, b, alpha)
-    return (255, 255, 255, alpha)
-
-
-# ---------------------------------------------------------------------------
-# Создание оверлейных клипов (module-level функции)
+# Подготовка оверлеев (общая для MoviePy и ffmpeg-движка)
+# Результаты _prepare_* кешируются в overlay_cache: в пакете каждый ассет
+# готовится один раз на высоту видео, а не заново для каждого файла.
 # ---------------------------------------------------------------------------
-def _make_text_clip(elem: OverlayElement, vw: int, vh: int):
-    """Создаёт MoviePy-клип для текстового CTA-элемента."""
-    result = _render_text_image(elem, vh)
-    if result is None:
-        return None
-
-    rgb, alpha = result
-
-    # Масштаб: применяем elem.scale
-    h_orig, w_orig = rgb.shape[:2]
-    scale_factor = elem.scale / 100.0
-    new_w = max(1, int(w_orig * scale_factor))
-    new_h = max(1, int(h_orig * scale_factor))
-
-    if (new_w, new_h) != (w_orig, h_orig):
-        pil_rgb = PILImage.fromarray(rgb).resize((new_w, new_h), PILImage.LANCZOS)
-        rgb = np.array(pil_rgb)
-        # Для маски: конвертим в 0-255, resize, потом обратно в 0-1
-        pil_alpha = PILImage.fromarray((alpha * 255).astype(np.uint8)).resize(
-            (new_w, new_h), PILImage.LANCZOS
-        )
-        alpha = np.array(pil_alpha) / 255.0
+def _overlay_target_h(elem: OverlayElement, vw: int, vh: int) -> int:
+    """Высота оверлея в пикселях: базовый размер = 15% от min(vw, vh)."""
+    base_size = min(vw, vh) * 0.15
+    return int(base_size * elem.scale / 100.0)
 
-    clip = ImageClip(rgb).with_duration(elem.duration)
-    mask = ImageClip(alpha, is_mask=True).with_duration(elem.duration)
-    clip = clip.with_mask(mask)
 
-    # Позиция (в пикселях от процентов)
+def _overlay_position(elem: OverlayElement, vw: int, vh: int,
+                      ow: int, oh: int) -> Tuple[int, int]:
+    """Левый верхний угол оверлея (w×h) с центром в точке элемента."""
     x_px = int(vw * elem.x_percent / 100.0)
     y_px = int(vh * elem.y_percent / 100.0)
-    pos_x = max(0, x_px - new_w // 2)
-    pos_y = max(0, y_px - new_h // 2)
-
-    clip = clip.with_position((pos_x, pos_y))
-    clip = clip.with_start(elem.start_time)
+    return max(0, x_px - ow // 2), max(0, y_px - oh // 2)
 
-    # Прозрачность
-    if elem.opacity < 100:
-        clip = clip.with_opacity(elem.opacity / 100.0)
 
-    # Fade in / out
-    effects = []
-    if elem.fade_in > 0:
-        effects.append(vfx.CrossFadeIn(elem.fade_in))
-    if elem.fade_out > 0:
-        effects.append(vfx.CrossFadeOut(elem.fade_out))
-    if effects:
-        clip = clip.with_effects(effects)
-
-    return clip
-
-
-def _make_overlay_clip(elem: OverlayElement, vw: int, vh: int, fps: float):
-    """Создаёт MoviePy-клип для одного оверлейного элемента."""
-    # Текстовый элемент — специальная обработка
-    if elem.is_text and elem.text:
-        return _make_text_clip(elem, vw, vh)
+def _prepare_text_rgba(elem: OverlayElement) -> Optional[np.ndarray]:
+    """Текст CTA как RGBA-массив с учётом elem.scale (через кеш оверлеев)."""
+    return overlay_cache.get_or_build(
+        text_asset_key(elem), lambda: _build_text_rgba(elem)
+    )
 
-    if not elem.file_path or not os.path.exists(elem.file_path):
-        return None
 
-    ext = Path(elem.file_path).suffix.lower()
+def _prepare_gif_frames(elem: OverlayElement,
+                        target_h: int) -> Tuple[List[np.ndarray], List[float]]:
+    """
+    Кадры GIF в RGBA, отмасштабированные до target_h (+ удаление фона).
+    Возвращает (кадры, длительности в секундах). Результат кешируется.
+    """
+    return overlay_cache.get_or_build(
+        file_asset_key("gif", elem, target_h),
+        lambda: _build_gif_frames(elem, target_h),
+    )
 
-    # Позиция в пикселях
-    x_px = int(vw * elem.x_percent / 100.0)
-    y_px = int(vh * elem.y_percent / 100.0)
 
-    # Масштаб: базовый размер = 15% от min(vw, vh)
-    base_size = min(vw, vh) * 0.15
-    target_h = int(base_size * elem.scale / 100.0)
+def _prepare_image_rgba(elem: OverlayElement, target_h: int) -> Optional[np.ndarray]:
+    """Статичное изображение в RGBA до target_h (+ удаление фона). Результат кешируется."""
+    return overlay_cache.get_or_build(
+        file_asset_key("image", elem, target_h),
+        lambda: _build_image_rgba(elem, target_h),
+    )
 
-    if ext in ('.gif', '.apng'):
-        overlay = _make_gif_clip(elem, target_h)
-    else:
-        overlay = _make_image_clip(elem, target_h)
 
-    if overlay is None:
+def _build_text_rgba(elem: OverlayElement) -> Optional[np.ndarray]:
+    """
+    Рисует текст CTA как RGBA-массив с учётом elem.scale: шрифт сразу
+    нужного размера (text_render), без масштабирования готовой картинки.
+    """
+    if not elem.text:
         return None
+    return render_text_element(elem, elem.scale / 100.0)
 
-    # Позиция (центрирование) — MoviePy v2 API: with_position
-    ow, oh = overlay.size
-    pos_x = max(0, x_px - ow // 2)
-    pos_y = max(0, y_px - oh // 2)
-
-    overlay = overlay.with_position((pos_x, pos_y))
-    overlay = overlay.with_start(elem.start_time)
-    overlay = overlay.with_duration(elem.duration)
-
-    # Прозрачность — MoviePy v2: with_opacity
-    if elem.opacity < 100:
-        overlay = overlay.with_opacity(elem.opacity / 100.0)
-
-    # Fade in / out — MoviePy v2: with_effects
-    effects = []
-    if elem.fade_in > 0:
-        effects.append(vfx.CrossFadeIn(elem.fade_in))
-    if elem.fade_out > 0:
-        effects.append(vfx.CrossFadeOut(elem.fade_out))
-    if effects:
-        overlay = overlay.with_effects(effects)
-
-    return overlay
-
-
-def _make_gif_clip(elem: OverlayElement, target_h: int):
-    """Создаёт анимированный клип из GIF."""
-    frames, durations = _load_gif_frames(elem.file_path)
-    if not frames:
-        return _make_image_clip(elem, target_h)
-
-    # Масштабируем кадры + удаление фона если включено
-    scaled_frames_rgb = []
-    scaled_frames_alpha = []
-
-    for frame_arr in frames:
-        # Удаление фона по цвету углов
-        if elem.remove_bg:
-            frame_arr = _remove_bg_numpy(frame_arr, elem.bg_tolerance)
 
+def _build_gif_frames(elem: OverlayElement,
+                      target_h: int) -> Tuple[List[np.ndarray], List[float]]:
+    """
+    Загружает кадры GIF, удаляет фон и масштабирует до target_h.
+    Каждый уникальный кадр разворачивается в RGBA и масштабируется один раз,
+    повторы ссылаются на тот же массив.
+    """
+    decoded = load_gif(elem.file_path)
+    if decoded is None:
+        return [], []
+
+    # Удаление фона по цвету углов (фон — один раз на файл, кеш по tolerance)
+    tolerance = elem.bg_tolerance if elem.remove_bg else None
+    digest = file_digest(elem.file_path) if elem.remove_bg else None
+    asset_key = ("file", digest) if digest else None
+
+    scaled = []
+    for unique in range(decoded.unique_count):
+        frame_arr = decoded.rgba(unique, tolerance, asset_key)
         pil_frame = PILImage.fromarray(frame_arr)
         orig_w, orig_h = pil_frame.size
         if orig_h > 0:
@@ -437,51 +275,15 @@ def _make_gif_clip(elem: OverlayElement, target_h: int):
             new_h = max(1, target_h)
             pil_frame = pil_frame.resize((new_w, new_h), PILImage.LANCZOS)
 
-        arr = np.array(pil_frame)
-        if arr.shape[2] >= 4:
-            scaled_frames_rgb.append(arr[:, :, :3])
-            scaled_frames_alpha.append(arr[:, :, 3] / 255.0)
-        else:
-            scaled_frames_rgb.append(arr[:, :, :3])
-            scaled_frames_alpha.append(np.ones((arr.shape[0], arr.shape[1])))
-
-    if not scaled_frames_rgb:
-        return None
-
-    # Длительность GIF-цикла
-    total_gif_dur = sum(durations) if durations else 1.0
-
-    def _get_frame_index(t):
-        """Определяет индекс кадра GIF для момента времени t."""
-        gif_t = t % total_gif_dur if total_gif_dur > 0 else 0
-        accum = 0
-        for i, dur in enumerate(durations):
-            accum += dur
-            if gif_t < accum:
-                return i
-        return len(durations) - 1
+        scaled.append(np.array(pil_frame.convert("RGBA")))
 
-    def make_frame_rgb(t):
-        idx = _get_frame_index(t)
-        return scaled_frames_rgb[idx]
-
-    clip = VideoClip(make_frame_rgb, duration=elem.duration)
-    clip = clip.with_fps(25)
-
-    # Маска (альфа-канал) — всегда создаём
-    def make_mask(t):
-        idx = _get_frame_index(t)
-        return scaled_frames_alpha[idx]
-
-    mask_clip = VideoClip(make_mask, duration=elem.duration, is_mask=True)
-    mask_clip = mask_clip.with_fps(25)
-    clip = clip.with_mask(mask_clip)
-
-    return clip
+    frames = [scaled[unique] for unique in decoded.frame_map]
+    durations = [d / 1000.0 for d in decoded.durations_ms]  # мс → сек
+    return frames, durations
 
 
-def _make_image_clip(elem: OverlayElement, target_h: int):
-    """Создаёт статичный клип из изображения."""
+def _build_image_rgba(elem: OverlayElement, target_h: int) -> Optional[np.ndarray]:
+    """Загружает изображение, масштабирует до target_h и удаляет фон."""
     try:
         pil_img = PILImage.open(elem.file_path).convert("RGBA")
     except Exception:
@@ -496,19 +298,174 @@ def _make_image_clip(elem: OverlayElement, target_h: int):
 
     arr = np.array(pil_img)
 
-    # Удаление фона если включено
+    # Удаление фона если включено (кеш по хешу файла, высоте и tolerance)
     if elem.remove_bg:
-        arr = _remove_bg_numpy(arr, elem.bg_tolerance)
+        digest = file_digest(elem.file_path)
+        arr = chroma_key.key_frames(("image", digest, target_h) if digest else None,
+                                    [arr], elem.bg_tolerance)[0]
+
+    return arr
+
+
+# ---------------------------------------------------------------------------
+# Создание слоёв оверлеев (module-level функции)
+# ---------------------------------------------------------------------------
+def _make_overlay_layer(elem: OverlayElement, vw: int, vh: int) -> Optional[OverlayLayer]:
+    """
+    Создаёт слой компоновщика для одного элемента:
+    предумноженный RGBA (один массив на кадр) + позиция + временная шкала GIF.
+    """
+    # Текстовый элемент
+    if elem.is_text and elem.text:
+        arr = _prepare_text_rgba(elem)
+        if arr is None:
+            return None
+        frames, durations = [arr], None
+    else:
+        if not elem.file_path or not os.path.exists(elem.file_path):
+            return None
+
+        ext = Path(elem.file_path).suffix.lower()
+        target_h = _overlay_target_h(elem, vw, vh)
+
+        frames, durations = [], None
+        if ext in ('.gif', '.apng'):
+            frames, durations = _prepare_gif_frames(elem, target_h)
+        if not frames:
+            arr = _prepare_image_rgba(elem, target_h)
+            if arr is None:
+                return None
+            frames, durations = [arr], None
+
+    oh, ow = frames[0].shape[:2]
+    pos_x, pos_y = _overlay_position(elem, vw, vh, ow, oh)
+    return make_layer(elem, pos_x, pos_y, frames, durations)
+
 
-    rgb = arr[:, :, :3]
-    alpha = arr[:, :, 3] / 255.0 if arr.shape[2] >= 4 else np.ones(rgb.shape[:2])
+# ---------------------------------------------------------------------------
+# Прогресс кодирования по кадрам
+# ---------------------------------------------------------------------------
+def _format_duration(seconds: float) -> str:
+    """Секунды → «м:сс» или «ч:мм:сс»."""
+    minutes, sec = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{sec:02d}" if hours else f"{minutes}:{sec:02d}"
+
+
+@dataclass
+class RenderStats:
+    """Ход кодирования файла: закодированные кадры, скорость, остаток."""
+    frames_done: int
+    total_frames: int           # 0 — неизвестно
+    elapsed: float              # секунд с начала кодирования кадров
+
+    @property
+    def fps(self) -> float:
+        """Скорость кодирования, кадров в секунду."""
+        return self.frames_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Оставшееся время (сек) при текущей скорости; None — неизвестно."""
+        fps = self.fps
+        if fps <= 0 or self.total_frames <= 0:
+            return None
+        return max(0, self.total_frames - self.frames_done) / fps
+
+    def describe(self) -> str:
+        """«кадр 1200/4500 · 58.3 fps · осталось 0:57»."""
+        parts = [f"кадр {self.frames_done}/{self.total_frames}" if self.total_frames
+                 else f"кадр {self.frames_done}"]
+        if self.fps > 0:
+            parts.append(f"{self.fps:.1f} fps")
+        eta = self.eta
+        if eta is not None:
+            parts.append(f"осталось {_format_duration(eta)}")
+        return " · ".join(parts)
+
+
+class EncodeProgress:
+    """
+    Счётчик закодированных кадров → прогресс файла в диапазоне span,
+    RenderStats в stats_fn (не чаще _STATS_INTERVAL) и строка в лог
+    каждые _STATS_LOG_STEP % кадров. Время отсчитывается от start()
+    или от первого update.
+    """
 
-    clip = ImageClip(rgb).with_duration(elem.duration)
+    def __init__(self, total_frames: int, span: Tuple[int, int],
+                 progress: Callable[[int], None], log: Callable[[str], None],
+                 stats_fn: Optional[Callable[[RenderStats], None]] = None):
+        self.total_frames = max(0, int(total_frames))
+        self._span = span
+        self._progress = progress
+        self._log = log
+        self._stats_fn = stats_fn
+        self._start: Optional[float] = None
+        self._last_stats = 0.0
+        self._last_pct = -1
+        self._last_log_step = 0
+        self.stats = RenderStats(0, self.total_frames, 0.0)
+
+    def start(self) -> None:
+        """Начало отсчёта времени (иначе — с первого update)."""
+        self._start = time.perf_counter()
+
+    def update(self, frames_done: int, total_frames: Optional[int] = None) -> None:
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        if total_frames:
+            self.total_frames = int(total_frames)
+        # Оценка числа кадров (длительность × fps) может быть чуть меньше
+        total = max(self.total_frames, frames_done)
+        self.stats = stats = RenderStats(frames_done, total, now - self._start)
+
+        if total > 0:
+            frac = frames_done / total
+            lo, hi = self._span
+            pct = lo + int((hi - lo) * frac)
+            if pct != self._last_pct:
+                self._last_pct = pct
+                self._progress(pct)
+            step = int(frac * 100) // _STATS_LOG_STEP
+            if step > self._last_log_step and frames_done < total:
+                self._last_log_step = step
+                self._log(f"  Кодирование: {stats.describe()}")
+
+        if self._stats_fn and (now - self._last_stats >= _STATS_INTERVAL
+                               or frames_done >= total > 0):
+            self._last_stats = now
+            self._stats_fn(stats)
+
+    def finish(self) -> None:
+        """Итог в лог: число кадров, время и средняя скорость."""
+        stats = self.stats
+        if stats.frames_done:
+            self._log(f"  Закодировано кадров: {stats.frames_done} за "
+                      f"{_format_duration(stats.elapsed)} ({stats.fps:.1f} fps)")
+
+
+def _moviepy_logger(frames: EncodeProgress, progress: Callable[[int], None]):
+    """
+    Логгер proglog для write_videofile: полоса «chunk» (запись звука) →
+    прогресс _PROGRESS_AUDIO, полоса «frame_index» (кадры) → frames.
+    """
+    import proglog      # зависимость MoviePy — уже загружена вместе с ним
 
-    mask = ImageClip(alpha, is_mask=True).with_duration(elem.duration)
-    clip = clip.with_mask(mask)
+    class _EncodeLogger(proglog.ProgressBarLogger):
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if attr != "index":
+                return
+            total = self.bars[bar].get("total") or 0
+            if bar == "frame_index":
+                frames.update(value, total)
+            elif bar == "chunk" and total:
+                lo, hi = _PROGRESS_AUDIO
+                progress(lo + int((hi - lo) * min(1.0, value / total)))
 
-    return clip
+    # Не чаще 10 раз в секунду — иначе proglog вызывается на каждый кадр;
+    # logged_bars=None — не копить текстовый лог полос в памяти
+    return _EncodeLogger(logged_bars=None, min_time_interval=0.1)
 
 
 # ---------------------------------------------------------------------------
@@ -516,12 +473,29 @@ def _make_image_clip(elem: OverlayElement, target_h: int):
 # ---------------------------------------------------------------------------
 def render_project(project: Project, output_path: str, use_gpu: bool,
                    log_fn: Optional[Callable[[str], None]] = None,
-                   progress_fn: Optional[Callable[[int], None]] = None) -> str:
+                   progress_fn: Optional[Callable[[int], None]] = None,
+                   backend: str = BACKEND_MOVIEPY,
+                   stats_fn: Optional[Callable[[RenderStats], None]] = None,
+                   encode_slot: Optional[AbstractContextManager] = None) -> str:
     """
     Рендерит один проект (видео + наложения) в выходной файл.
     Возвращает путь к готовому файлу.
     Вызывается из RenderWorker и BatchRenderWorker.
+
+    backend: BACKEND_MOVIEPY — композиция кадров в Python,
+             BACKEND_FFMPEG  — один граф фильтров ffmpeg (без MoviePy).
+    stats_fn получает RenderStats по ходу кодирования (кадры, fps, остаток);
+    прогресс на этапе записи тоже считается по закодированным кадрам.
+    encode_slot — контекст, который удерживается только на время
+    кодирования (слот NVENC пакетного рендера); подготовка оверлеев идёт
+    без него.
     """
+    if backend == BACKEND_FFMPEG:
+        from app.ffmpeg_render import render_project_ffmpeg
+        return render_project_ffmpeg(project, output_path, use_gpu,
+                                     log_fn=log_fn, progress_fn=progress_fn,
+                                     stats_fn=stats_fn, encode_slot=encode_slot)
+
     def log(msg: str):
         if log_fn:
             log_fn(msg)
@@ -540,7 +514,7 @@ def render_project(project: Project, output_path: str, use_gpu: bool,
     progress(5)
 
     # Открываем исходное видео
-    clip = VideoFileClip(video_path)
+    clip = moviepy.VideoFileClip(video_path)
     video_w, video_h = clip.size
     fps = clip.fps
     duration = clip.duration
@@ -554,15 +528,15 @@ def render_project(project: Project, output_path: str, use_gpu: bool,
 
     progress(10)
 
-    # Создаём оверлейные клипы
-    overlay_clips = []
+    # Создаём слои оверлеев
+    layers: List[OverlayLayer] = []
     total_elems = len(project.elements)
 
     for idx, elem in enumerate(project.elements):
         try:
-            overlay = _make_overlay_clip(elem, video_w, video_h, fps)
-            if overlay is not None:
-                overlay_clips.append(overlay)
+            layer = _make_overlay_layer(elem, video_w, video_h)
+            if layer is not None:
+                layers.append(layer)
                 log(f"  Оверлей: {elem.name}")
         except Exception as e:
             log(f"  Предупреждение: {elem.name}: {e}")
@@ -572,8 +546,14 @@ def render_project(project: Project, output_path: str, use_gpu: bool,
 
     progress(50)
 
-    # Композиция
-    final = CompositeVideoClip([clip] + overlay_clips, size=(video_w, video_h))
+    # Композиция: один кадр-функция вместо CompositeVideoClip —
+    # каждый слой смешивается на месте только в своём прямоугольнике
+    compositor = FrameCompositor(layers, video_w, video_h)
+
+    def make_frame(t):
+        return compositor.composite(clip.get_frame(t), t)
+
+    final = moviepy.VideoClip(make_frame, duration=duration).with_audio(clip.audio)
 
     # Обеспечим директорию
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
@@ -584,15 +564,18 @@ def render_project(project: Project, output_path: str, use_gpu: bool,
     log(f"Кодек: {enc['codec']}")
     log("Запись видеофайла...")
 
-    # Рендер
-    final.write_videofile(
-        output_path,
-        codec=enc["codec"],
-        audio_codec="aac",
-        fps=fps,
-        logger=None,
-        ffmpeg_params=enc.get("ffmpeg_params", []),
-    )
+    # Рендер: прогресс и скорость — по кадрам, которые отдаёт кодировщику MoviePy
+    frames = EncodeProgress(int(duration * fps), _PROGRESS_FRAMES, progress, log, stats_fn)
+    with encode_slot or nullcontext():
+        final.write_videofile(
+            output_path,
+            codec=enc["codec"],
+            audio_codec="aac",
+            fps=fps,
+            logger=_moviepy_logger(frames, progress),
+            ffmpeg_params=enc.get("ffmpeg_params", []),
+        )
+    frames.finish()
 
     progress(100)
     log(f"Готово: {output_path}")
@@ -605,150 +588,251 @@ def render_project(project: Project, output_path: str, use_gpu: bool,
 
 
 # ---------------------------------------------------------------------------
-# Поток рендеринга одного файла
+# Пакетный рендеринг — задание для процесса из пула
+# ---------------------------------------------------------------------------
+@contextmanager
+def _gpu_slot(gpu_semaphore, log_fn: Callable[[str], None]):
+    """Слот NVENC на время кодирования одного файла."""
+    log_fn("  Ожидание свободной NVENC-сессии...")
+    with gpu_semaphore:
+        yield
+
+def _batch_output_path(video_path: str, output_dir: Optional[str], prefix: str) -> str:
+    """
+    Путь к выходному файлу пакетного рендера для исходного видео.
+    output_dir не задан — папка out/ рядом с видео (как в интерфейсе).
+    """
+    out_name = f"{prefix}{Path(video_path).stem}.mp4"
+    if not output_dir:
+        output_dir = str(Path(video_path).parent / "out")
+    return str(Path(output_dir) / out_name)
+
+
+def _render_batch_job(idx: int, elements_data: List[dict], video_path: str,
+                      out_path: str, use_gpu: bool, backend: str,
+                      msg_queue, gpu_semaphore,
+                      spill_dir: Optional[str] = None) -> str:
+    """
+    Рендерит один файл пакета в отдельном процессе.
+    Функция верхнего уровня — должна сериализоваться pickle для пула процессов.
+
+    Лог и прогресс отправляются в *msg_queue* кортежами
+    ("log", idx, str) / ("progress", idx, int) и пересылаются в log_fn /
+    progress_fn render_batch в родительском процессе.
+    При GPU-кодировании слот NVENC (*gpu_semaphore*) занимается только
+    на время кодирования — оверлеи готовятся параллельно без ограничения.
+    gpu_semaphore=None — NVENC нет, кодирование на CPU без ограничения.
+    *spill_dir* — общий для процессов пакета дисковый кеш подготовленных оверлеев.
+    """
+    overlay_cache.set_spill_dir(spill_dir)
+
+    def log_fn(msg: str):
+        msg_queue.put(("log", idx, msg))
+
+    def progress_fn(val: int):
+        msg_queue.put(("progress", idx, val))
+
+    # Создаём копию элементов для каждого файла
+    elements = [OverlayElement.from_dict(d) for d in elements_data]
+    project = Project(video_path=video_path, elements=elements)
+
+    slot = _gpu_slot(gpu_semaphore, log_fn) if use_gpu and gpu_semaphore is not None else None
+    return render_project(project, out_path, use_gpu,
+                          log_fn=log_fn, progress_fn=progress_fn,
+                          backend=backend, encode_slot=slot)
+
+
+# ---------------------------------------------------------------------------
+# Пакетный рендеринг — обработка списка видео
 # ---------------------------------------------------------------------------
-class RenderWorker(QThread):
+def batch_summary(success: int, errors: int, total: int) -> str:
+    """Итоговая строка пакетного рендера."""
+    summary = f"\nОбработано: {success} из {total} файлов"
+    if errors:
+        summary += f" ({errors} с ошибками)"
+    return summary
+
+
+def render_batch(elements_data: List[dict], video_files: List[str],
+                 output_dir: Optional[str], prefix: str, use_gpu: bool,
+                 backend: str = BACKEND_MOVIEPY, workers: int = 1,
+                 gpu_sessions: int = DEFAULT_GPU_SESSIONS,
+                 log_fn: Optional[Callable[[str], None]] = None,
+                 progress_fn: Optional[Callable[[int], None]] = None) -> Tuple[int, int]:
     """
-    Поток рендеринга одного видео.
-    Сигналы:
-      progress(int)    — 0..100
-      finished_ok(str) — путь к готовому файлу
-      error(str)       — текст ошибки
-      log(str)         — информационные сообщения
+    Пакетный рендеринг: одинаковые наложения (сериализованные элементы)
+    на каждое видео из списка, результат — output_dir/<prefix><имя>.mp4
+    (без output_dir — в папку out/ рядом с каждым видео).
+    При workers > 1 файлы рендерятся параллельно в пуле процессов,
+    число одновременных GPU-кодирований ограничено gpu_sessions.
+    Возвращает (успешно, с ошибками). Вызывается из BatchRenderWorker
+    и командной строки (app/render.py).
     """
+    def log(msg: str):
+        if log_fn:
+            log_fn(msg)
+
+    def progress(val: int):
+        if progress_fn:
+            progress_fn(val)
+
+    total = len(video_files)
+    workers = max(1, min(workers, total or 1))
+    gpu_sessions = max(1, gpu_sessions)
+    log(f"Пакетная обработка: {total} файл(ов)\n")
+
+    # NVENC проверяется один раз здесь: без него процессы кодируют на CPU
+    # без семафора сессий и не теряют параллельность
+    if use_gpu and not check_nvenc_available():
+        log("NVENC недоступен — кодирование на CPU (libx264)")
+        use_gpu = False
+
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    if workers > 1:
+        success, errors = _render_batch_parallel(
+            elements_data, video_files, output_dir, prefix, use_gpu, backend,
+            workers, gpu_sessions, log, progress)
+    else:
+        success, errors = _render_batch_sequential(
+            elements_data, video_files, output_dir, prefix, use_gpu, backend,
+            log, progress)
+
+    log(batch_summary(success, errors, total))
+    return success, errors
 
-    progress = pyqtSignal(int)
-    finished_ok = pyqtSignal(str)
-    error = pyqtSignal(str)
-    log = pyqtSignal(str)
 
-    def __init__(self, project: Project, output_path: str,
-                 use_gpu: bool = True, parent=None):
-        super().__init__(parent)
-        self._project = project
-        self._output_path = output_path
-        self._use_gpu = use_gpu
+def _render_batch_sequential(elements_data: List[dict], video_files: List[str],
+                             output_dir: Optional[str], prefix: str, use_gpu: bool,
+                             backend: str, log: Callable[[str], None],
+                             progress: Callable[[int], None]) -> Tuple[int, int]:
+    """Последовательный рендер в текущем потоке (workers == 1)."""
+    total = len(video_files)
+    success = 0
+    errors = 0
+
+    for i, video_path in enumerate(video_files):
+        fname = Path(video_path).name
+        log(f"\n{'='*50}")
+        log(f"[{i+1}/{total}] {fname}")
+        log(f"{'='*50}")
 
-    def run(self):
         try:
+            # Создаём копию элементов с новыми ID для каждого файла
+            elements = [OverlayElement.from_dict(d) for d in elements_data]
+            project = Project(video_path=video_path, elements=elements)
+
+            out_path = _batch_output_path(video_path, output_dir, prefix)
+
+            # Прогресс-колбэк: маппим прогресс файла на общий прогресс
+            def file_progress(val, idx=i):
+                overall = int((idx * 100 + val) / total)
+                progress(overall)
+
             render_project(
-                self._project, self._output_path, self._use_gpu,
-                log_fn=self.log.emit,
-                progress_fn=self.progress.emit,
+                project, out_path, use_gpu,
+                log_fn=log,
+                progress_fn=file_progress,
+                backend=backend,
             )
-            self.finished_ok.emit(self._output_path)
+            success += 1
+
         except Exception as e:
-            self.error.emit(f"Ошибка рендеринга:\n{traceback.format_exc()}")
+            log(f"  ОШИБКА: {e}")
+            errors += 1
 
+        # Обновляем общий прогресс после каждого файла
+        overall = int(100 * (i + 1) / total)
+        progress(overall)
 
-# ---------------------------------------------------------------------------
-# Пакетный рендеринг — обработка всех видео в папке
-# ---------------------------------------------------------------------------
-class BatchRenderWorker(QThread):
+    return success, errors
+
+
+def _render_batch_parallel(elements_data: List[dict], video_files: List[str],
+                           output_dir: Optional[str], prefix: str, use_gpu: bool,
+                           backend: str, workers: int, gpu_sessions: int,
+                           log: Callable[[str], None],
+                           progress: Callable[[int], None]) -> Tuple[int, int]:
     """
-    Пакетный рендеринг: применяет одинаковые наложения ко всем видео в папке.
-    Сигналы:
-      progress(int)    — 0..100 (общий прогресс)
-      log(str)         — сообщения о ходе работы
-      finished_ok(str) — итоговое сообщение
-      error(str)       — ошибка
+    Параллельный рендер в ProcessPoolExecutor.
+    Сообщения процессов приходят через очередь Manager и
+    пересылаются в log/progress вызывающего потока.
     """
-
-    progress = pyqtSignal(int)
-    log = pyqtSignal(str)
-    finished_ok = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-    def __init__(self, elements_data: List[dict], video_files: List[str],
-                 output_dir: str, prefix: str, use_gpu: bool, parent=None):
-        super().__init__(parent)
-        self._elements_data = elements_data  # сериализованные элементы
-        self._video_files = video_files
-        self._output_dir = output_dir
-        self._prefix = prefix
-        self._use_gpu = use_gpu
-
-    def run(self):
-        if not MOVIEPY_AVAILABLE:
-            self.error.emit("MoviePy не установлен. pip install moviepy")
-            return
-
-        total = len(self._video_files)
-        self.log.emit(f"Пакетная обработка: {total} файл(ов)\n")
-
-        Path(self._output_dir).mkdir(parents=True, exist_ok=True)
-        success = 0
-        errors = 0
-
-        for i, video_path in enumerate(self._video_files):
-            fname = Path(video_path).name
-            self.log.emit(f"\n{'='*50}")
-            self.log.emit(f"[{i+1}/{total}] {fname}")
-            self.log.emit(f"{'='*50}")
-
-            try:
-                # Создаём копию элементов с новыми ID для каждого файла
-                elements = [OverlayElement.from_dict(d) for d in self._elements_data]
-                project = Project(video_path=video_path, elements=elements)
-
-                out_name = f"{self._prefix}{Path(video_path).stem}.mp4"
-                out_path = str(Path(self._output_dir) / out_name)
-
-                # Прогресс-колбэк: маппим прогресс файла на общий прогресс
-                def file_progress(val, idx=i):
-                    overall = int((idx * 100 + val) / total)
-                    self.progress.emit(overall)
-
-                render_project(
-                    project, out_path, self._use_gpu,
-                    log_fn=self.log.emit,
-                    progress_fn=file_progress,
+    log(f"Процессов: {workers}"
+        + (f", NVENC-сессий: {gpu_sessions}" if use_gpu else ""))
+
+    total = len(video_files)
+    file_progress = [0] * total
+    success = 0
+    errors = 0
+
+    # spawn — безопасно при работающем Qt (fork копирует состояние потоков)
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager, \
+            tempfile.TemporaryDirectory(prefix="cta_overlays_") as spill_dir:
+        msg_queue = manager.Queue()
+        gpu_semaphore = manager.Semaphore(gpu_sessions) if use_gpu else None
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {}
+            for i, video_path in enumerate(video_files):
+                out_path = _batch_output_path(video_path, output_dir, prefix)
+                fut = pool.submit(
+                    _render_batch_job, i, elements_data, video_path,
+                    out_path, use_gpu, backend,
+                    msg_queue, gpu_semaphore, spill_dir,
                 )
-                success += 1
-
-            except Exception as e:
-                self.log.emit(f"  ОШИБКА: {e}")
-                errors += 1
+                futures[fut] = i
 
-            # Обновляем общий прогресс после каждого файла
-            overall = int(100 * (i + 1) / total)
-            self.progress.emit(overall)
+            pending = set(futures)
+            finished = set()
+            last_overall = -1
 
-        summary = f"\nОбработано: {success} из {total} файлов"
-        if errors:
-            summary += f" ({errors} с ошибками)"
-        self.log.emit(summary)
-        self.finished_ok.emit(summary)
+            def handle(kind: str, idx: int, val) -> None:
+                if kind == "log":
+                    log(f"[{idx+1}/{total}] {val}")
+                elif kind == "progress" and idx not in finished:
+                    # Прогресс файла только растёт
+                    file_progress[idx] = max(file_progress[idx], val)
 
+            def drain(timeout: Optional[float] = None) -> None:
+                """Забирает из очереди все сообщения (первое — с ожиданием)."""
+                try:
+                    if timeout is not None:
+                        handle(*msg_queue.get(timeout=timeout))
+                    while True:
+                        handle(*msg_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                except Exception as e:
+                    log(f"Ошибка очереди сообщений: {e}")
+
+            while pending:
+                # Снимок завершённых — до чтения очереди: всё, что процесс
+                # отправил до возврата, уже в очереди и выводится до «✔»
+                done = [f for f in pending if f.done()]
+                drain(timeout=None if done else 0.2)
+
+                # Завершённые файлы
+                for fut in done:
+                    pending.discard(fut)
+                    idx = futures[fut]
+                    fname = Path(video_files[idx]).name
+                    finished.add(idx)
+                    file_progress[idx] = 100
+                    try:
+                        fut.result()
+                        success += 1
+                        log(f"[{idx+1}/{total}] ✔ {fname}")
+                    except Exception as e:
+                        errors += 1
+                        log(f"[{idx+1}/{total}] ОШИБКА: {fname}: {e}")
+
+                overall = int(sum(file_progress) / total)
+                if overall != last_overall:
+                    last_overall = overall
+                    progress(overall)
 
-# ---------------------------------------------------------------------------
-# Утилиты: сохранение/загрузка настроек
-# ---------------------------------------------------------------------------
-def load_gpu_setting() -> bool:
-    """Загружает настройку 'использовать GPU' из QSettings."""
-    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
-    return s.value("render/use_gpu", True, type=bool)
-
-
-def save_gpu_setting(use_gpu: bool) -> None:
-    """Сохраняет настройку 'использовать GPU' в QSettings."""
-    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
-    s.setValue("render/use_gpu", use_gpu)
-
-
-def load_output_settings() -> dict:
-    """Загружает настройки вывода (префикс, пакетная обработка, папка) из QSettings."""
-    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
-    return {
-        "prefix": s.value("output/prefix", "cta_", type=str),
-        "batch": s.value("output/batch", False, type=bool),
-        "out_dir": s.value("output/out_dir", "", type=str),
-    }
-
-
-def save_output_settings(prefix: str, batch: bool, out_dir: str = "") -> None:
-    """Сохраняет настройки вывода в QSettings."""
-    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
-    s.setValue("output/prefix", prefix)
-    s.setValue("output/batch", batch)
-    s.setValue("output/out_dir", out_dir)
+    progress(100)
+    return success, errors
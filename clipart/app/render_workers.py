@@ -0,0 +1,185 @@
+"""
+render_workers.py — Qt-потоки рендеринга и настройки рендера в QSettings.
+
+Рендер (render_engine.render_project / render_batch) от Qt не зависит;
+здесь — обёртки QThread, которые пересылают лог и прогресс в сигналы
+интерфейса, и загрузка/сохранение настроек рендера.
+"""
+
+from __future__ import annotations
+
+import traceback
+from typing import List
+
+from PyQt6.QtCore import QThread, pyqtSignal, QSettings
+
+from app.models import Project
+from app.render_engine import (
+    BACKEND_MOVIEPY, DEFAULT_GPU_SESSIONS, MAX_BATCH_WORKERS, MOVIEPY_AVAILABLE,
+    RENDER_BACKENDS, batch_summary, default_batch_workers, render_batch,
+    render_project,
+)
+
+
+# ---------------------------------------------------------------------------
+# Поток рендеринга одного файла
+# ---------------------------------------------------------------------------
+class RenderWorker(QThread):
+    """
+    Поток рендеринга одного видео.
+    Сигналы:
+      progress(int)    — 0..100 (при записи — по закодированным кадрам)
+      stats(object)    — RenderStats: кадры, fps, оставшееся время
+      finished_ok(str) — путь к готовому файлу
+      error(str)       — текст ошибки
+      log(str)         — информационные сообщения
+    """
+
+    progress = pyqtSignal(int)
+    stats = pyqtSignal(object)
+    finished_ok = pyqtSignal(str)
+    error = pyqtSignal(str)
+    log = pyqtSignal(str)
+
+    def __init__(self, project: Project, output_path: str,
+                 use_gpu: bool = True, backend: str = BACKEND_MOVIEPY,
+                 parent=None):
+        super().__init__(parent)
+        # Рендер работает со снимком проекта: поток не трогает
+        # элементы (и их индекс по времени), которые редактирует интерфейс
+        self._project = Project.from_dict(project.to_dict())
+        self._output_path = output_path
+        self._use_gpu = use_gpu
+        self._backend = backend
+
+    def run(self):
+        try:
+            render_project(
+                self._project, self._output_path, self._use_gpu,
+                log_fn=self.log.emit,
+                progress_fn=self.progress.emit,
+                backend=self._backend,
+                stats_fn=self.stats.emit,
+            )
+            self.finished_ok.emit(self._output_path)
+        except Exception as e:
+            self.error.emit(f"Ошибка рендеринга:\n{traceback.format_exc()}")
+
+
+# ---------------------------------------------------------------------------
+# Пакетный рендеринг — поток интерфейса
+# ---------------------------------------------------------------------------
+class BatchRenderWorker(QThread):
+    """
+    Пакетный рендеринг: применяет одинаковые наложения ко всем видео в папке.
+    При workers > 1 файлы рендерятся параллельно в пуле процессов,
+    число одновременных GPU-кодирований ограничено gpu_sessions.
+    Сигналы:
+      progress(int)    — 0..100 (общий прогресс)
+      log(str)         — сообщения о ходе работы
+      finished_ok(str) — итоговое сообщение
+      error(str)       — ошибка
+    """
+
+    progress = pyqtSignal(int)
+    log = pyqtSignal(str)
+    finished_ok = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, elements_data: List[dict], video_files: List[str],
+                 output_dir: str, prefix: str, use_gpu: bool,
+                 backend: str = BACKEND_MOVIEPY, workers: int = 1,
+                 gpu_sessions: int = DEFAULT_GPU_SESSIONS, parent=None):
+        super().__init__(parent)
+        self._elements_data = elements_data  # сериализованные элементы
+        self._video_files = video_files
+        self._output_dir = output_dir
+        self._prefix = prefix
+        self._use_gpu = use_gpu
+        self._backend = backend
+        self._workers = workers
+        self._gpu_sessions = gpu_sessions
+
+    def run(self):
+        if self._backend == BACKEND_MOVIEPY and not MOVIEPY_AVAILABLE:
+            self.error.emit("MoviePy не установлен. pip install moviepy")
+            return
+
+        success, errors = render_batch(
+            self._elements_data, self._video_files, self._output_dir,
+            self._prefix, self._use_gpu, backend=self._backend,
+            workers=self._workers, gpu_sessions=self._gpu_sessions,
+            log_fn=self.log.emit, progress_fn=self.progress.emit,
+        )
+        self.finished_ok.emit(batch_summary(success, errors, len(self._video_files)))
+
+
+# ---------------------------------------------------------------------------
+# Утилиты: сохранение/загрузка настроек
+# ---------------------------------------------------------------------------
+def load_gpu_setting() -> bool:
+    """Загружает настройку 'использовать GPU' из QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    return s.value("render/use_gpu", True, type=bool)
+
+
+def save_gpu_setting(use_gpu: bool) -> None:
+    """Сохраняет настройку 'использовать GPU' в QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    s.setValue("render/use_gpu", use_gpu)
+
+
+def load_backend_setting() -> str:
+    """Загружает выбранный движок рендеринга из QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    backend = s.value("render/backend", BACKEND_MOVIEPY, type=str)
+    return backend if backend in RENDER_BACKENDS else BACKEND_MOVIEPY
+
+
+def save_backend_setting(backend: str) -> None:
+    """Сохраняет выбранный движок рендеринга в QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    s.setValue("render/backend", backend)
+
+
+def load_batch_workers_setting() -> int:
+    """Загружает число процессов пакетного рендера из QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    value = s.value("render/workers", default_batch_workers(), type=int)
+    return max(1, min(MAX_BATCH_WORKERS, value))
+
+
+def save_batch_workers_setting(workers: int) -> None:
+    """Сохраняет число процессов пакетного рендера в QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    s.setValue("render/workers", workers)
+
+
+def load_gpu_sessions_setting() -> int:
+    """Загружает лимит одновременных NVENC-кодирований из QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    return max(1, s.value("render/gpu_sessions", DEFAULT_GPU_SESSIONS, type=int))
+
+
+def save_gpu_sessions_setting(sessions: int) -> None:
+    """Сохраняет лимит одновременных NVENC-кодирований в QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    s.setValue("render/gpu_sessions", sessions)
+
+
+def load_output_settings() -> dict:
+    """Загружает настройки вывода (префикс, пакетная обработка, папка) из QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    return {
+        "prefix": s.value("output/prefix", "cta_", type=str),
+        "batch": s.value("output/batch", False, type=bool),
+        "out_dir": s.value("output/out_dir", "", type=str),
+    }
+
+
+def save_output_settings(prefix: str, batch: bool, out_dir: str = "") -> None:
+    """Сохраняет настройки вывода в QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    s.setValue("output/prefix", prefix)
+    s.setValue("output/batch", batch)
+    s.setValue("output/out_dir", out_dir)
@@ -0,0 +1,217 @@
+"""
+scrub_thumbnails.py — Миниатюры для перемотки слайдером (спрайт-лист).
+
+При открытии видео в фоне извлекается до THUMB_COUNT уменьшенных кадров,
+равномерно по длительности. Для длинных видео декодируются только
+ключевые кадры (ffmpeg -skip_frame nokey) — это в десятки раз быстрее
+полного декодирования; короткие видео с редкими ключевыми кадрами
+декодируются целиком через фильтр fps.
+
+Миниатюры складываются в один массив N×H×W×3 (uint8) — спрайт-лист в .npy,
+который открывается через memory map (np.load(mmap_mode="r")): повторное
+открытие того же видео не декодирует ничего. Кеш лежит в cache/thumbs/,
+ключ — путь, размер и mtime файла и параметры миниатюр.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+from bisect import bisect_right
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.cache_dir import cache_subdir
+
+THUMB_COUNT = 120
+THUMB_WIDTH = 160
+# Видео короче этого (сек) при нехватке ключевых кадров декодируются целиком
+DENSE_MAX_SEC = 120.0
+
+_SPRITE_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Спрайт-лист
+# ---------------------------------------------------------------------------
+class ThumbnailSprite:
+    """Миниатюры (N×H×W×3 RGB) и номера кадров, которым они соответствуют."""
+
+    def __init__(self, frames: List[int], sprite: np.ndarray):
+        self.frames = list(frames)
+        self.sprite = sprite
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def thumb_size(self) -> tuple:
+        """(ширина, высота) одной миниатюры."""
+        return (self.sprite.shape[2], self.sprite.shape[1])
+
+    def thumbnail_at(self, frame: int) -> Optional[np.ndarray]:
+        """Миниатюра ближайшего кадра не позже *frame* (C-contiguous RGB)."""
+        if not self.frames:
+            return None
+        i = max(bisect_right(self.frames, frame) - 1, 0)
+        return np.ascontiguousarray(self.sprite[i])
+
+
+# ---------------------------------------------------------------------------
+# Кеш на диске
+# ---------------------------------------------------------------------------
+def _cache_base(path: str, count: int, width: int) -> Optional[Path]:
+    """Путь к файлам кеша без расширения; None — файл недоступен."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    ident = (str(Path(path).resolve()), st.st_size, st.st_mtime_ns,
+             count, width, _SPRITE_VERSION)
+    name = hashlib.blake2b(repr(ident).encode("utf-8"), digest_size=16).hexdigest()
+    return cache_subdir("thumbs") / name
+
+
+def load_thumbnail_sprite(path: str, count: int = THUMB_COUNT,
+                          width: int = THUMB_WIDTH) -> Optional[ThumbnailSprite]:
+    """Открывает спрайт из кеша через memory map; None — кеша нет."""
+    base = _cache_base(path, count, width)
+    if base is None:
+        return None
+    try:
+        with open(base.with_suffix(".json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        sprite = np.load(base.with_suffix(".npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    frames = meta.get("frames", [])
+    if not frames or len(frames) > len(sprite):
+        return None
+    return ThumbnailSprite(frames, sprite[:len(frames)])
+
+
+# ---------------------------------------------------------------------------
+# Построение через ffmpeg
+# ---------------------------------------------------------------------------
+def _ffmpeg_exe() -> str:
+    from app.render_engine import get_ffmpeg_exe
+    return get_ffmpeg_exe()
+
+
+def build_thumbnail_sprite(path: str, fps: float, total_frames: int,
+                           video_size: tuple,
+                           keyframes: Optional[List[int]] = None,
+                           count: int = THUMB_COUNT, width: int = THUMB_WIDTH,
+                           should_stop: Optional[Callable[[], bool]] = None
+                           ) -> Optional[ThumbnailSprite]:
+    """
+    Извлекает миниатюры и сохраняет спрайт в кеш.
+
+    keyframes — номера ключевых кадров (KeyframeIndex.keyframes); если их
+    достаточно или видео длинное, декодируются только ключевые кадры.
+    should_stop — проверяется между кадрами; True прерывает построение.
+    """
+    vw, vh = video_size
+    base = _cache_base(path, count, width)
+    if base is None or fps <= 0 or total_frames <= 0 or vw <= 0 or vh <= 0:
+        return None
+    tw = min(width, vw) // 2 * 2
+    th = max(2, int(round(tw * vh / vw / 2)) * 2)
+    duration = total_frames / fps
+
+    cmd = [_ffmpeg_exe(), "-hide_banner", "-v", "error"]
+    use_keyframes = bool(keyframes) and (len(keyframes) >= count
+                                         or duration > DENSE_MAX_SEC)
+    if use_keyframes:
+        # Только ключевые кадры; выбираем из них count равномерно
+        n_src = len(keyframes)
+        wanted = np.unique(np.linspace(0, n_src - 1, min(count, n_src))
+                           .round().astype(int)).tolist()
+        positions = [keyframes[i] for i in wanted]
+        cmd += ["-skip_frame", "nokey", "-i", path, "-map", "0:v:0",
+                "-fps_mode", "passthrough", "-vf", f"scale={tw}:{th}"]
+    else:
+        # Всё видео с прореживанием до count кадров
+        n_src = min(count, total_frames)
+        wanted = list(range(n_src))
+        rate = n_src / duration
+        positions = [min(int(round(i / rate * fps)), total_frames - 1)
+                     for i in range(n_src)]
+        cmd += ["-i", path, "-map", "0:v:0",
+                "-vf", f"fps={rate:.6f},scale={tw}:{th}"]
+    cmd += ["-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+
+    tmp_npy = base.with_name(f"{base.name}.{os.getpid()}.tmp.npy")
+    sprite = np.lib.format.open_memmap(
+        tmp_npy, mode="w+", dtype=np.uint8, shape=(len(wanted), th, tw, 3)
+    )
+    frame_bytes = th * tw * 3
+    wanted_set = {src: dst for dst, src in enumerate(wanted)}
+
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+    n_read = 0
+    stopped = False
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, **kwargs)
+    except Exception:
+        del sprite
+        tmp_npy.unlink(missing_ok=True)
+        return None
+    try:
+        while n_read < n_src:
+            if should_stop is not None and should_stop():
+                stopped = True
+                break
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            dst = wanted_set.get(n_read)
+            if dst is not None:
+                sprite[dst] = np.frombuffer(buf, np.uint8).reshape(th, tw, 3)
+            n_read += 1
+    finally:
+        proc.kill()
+        proc.wait()
+        sprite.flush()
+        del sprite
+
+    n_done = sum(1 for src in wanted if src < n_read)
+    if stopped or n_done == 0:
+        tmp_npy.unlink(missing_ok=True)
+        return None
+    if use_keyframes and n_read != n_src:
+        # Декодер считает ключевыми не те кадры, что демультиплексор —
+        # распределяем миниатюры равномерно по видео
+        positions = (np.linspace(0, total_frames - 1, len(wanted))
+                     .round().astype(int).tolist())
+
+    try:
+        os.replace(tmp_npy, base.with_suffix(".npy"))
+        with open(base.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump({"frames": positions[:n_done]}, f)
+    except OSError:
+        tmp_npy.unlink(missing_ok=True)
+        return None
+
+    sprite = np.load(base.with_suffix(".npy"), mmap_mode="r")
+    return ThumbnailSprite(positions[:n_done], sprite[:n_done])
+
+
+def get_thumbnail_sprite(path: str, fps: float, total_frames: int,
+                         video_size: tuple,
+                         keyframes: Optional[List[int]] = None,
+                         should_stop: Optional[Callable[[], bool]] = None
+                         ) -> Optional[ThumbnailSprite]:
+    """Спрайт из кеша или новый (с сохранением в кеш)."""
+    sprite = load_thumbnail_sprite(path)
+    if sprite is not None:
+        return sprite
+    return build_thumbnail_sprite(path, fps, total_frames, video_size,
+                                  keyframes, should_stop=should_stop)
@@ -11,27 +11,155 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Optional
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Tuple
 
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
-from PyQt6.QtGui import QIcon, QPixmap, QImage, QColor, QPainter, QFont
+from PyQt6.QtCore import (
+    Qt, pyqtSignal, QSize, QAbstractListModel, QModelIndex, QTimer, QFileSystemWatcher
+)
+from PyQt6.QtGui import QIcon, QPixmap, QImage, QColor, QPainter, QFont, QFontDatabase
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QListWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListView,
     QPushButton, QDoubleSpinBox, QSlider, QGroupBox, QFormLayout,
     QFileDialog, QScrollArea, QFrame, QCheckBox, QSizePolicy, QSpinBox,
-    QLineEdit, QComboBox, QFontComboBox, QColorDialog
+    QLineEdit, QComboBox, QColorDialog
 )
 
+from app.asset_index import asset_index
+from app.asset_thumbnails import ICON_SIZE, ThumbnailLoader
+from app.index_workers import AssetIndexWorker
 from app.models import OverlayElement
 
 
 # ---------------------------------------------------------------------------
 # Библиотека элементов
 # ---------------------------------------------------------------------------
+# Служебный путь строки «Текстовый CTA»
+TEXT_ASSET = "__TEXT__"
+
+# Поддерживаемые форматы файлов элементов
+SUPPORTED_ASSETS = {'.gif', '.png', '.jpg', '.jpeg', '.bmp', '.webp', '.apng', '.svg'}
+
+# Иконка строки запрошена, но ещё не готова
+_PENDING = object()
+
+
+def _sort_key(path: str) -> str:
+    """Порядок файлов в библиотеке (без учёта регистра там, где его нет у ФС)."""
+    return os.path.normcase(path)
+
+
+class AssetListModel(QAbstractListModel):
+    """
+    Список файлов assets/ + строка «Текст (CTA)».
+
+    Иконка запрашивается у ThumbnailLoader только когда представление
+    спрашивает DecorationRole, т.е. при отрисовке видимой строки:
+    библиотека из тысяч файлов не декодирует ничего за пределами экрана.
+    """
+
+    def __init__(self, loader: ThumbnailLoader, parent=None):
+        super().__init__(parent)
+        self._loader = loader
+        self._loader.thumbnail_ready.connect(self._on_thumbnail)
+        self._rows: List[Tuple[str, str]] = []        # (имя, путь)
+        self._row_of: Dict[str, int] = {}
+        # path → QIcon; None — файл не читается; _PENDING — в очереди
+        self._icons: Dict[str, object] = {}
+        placeholder = QPixmap(loader.icon_size)
+        placeholder.fill(Qt.GlobalColor.transparent)
+        self._placeholder = QIcon(placeholder)
+
+    def set_files(self, paths: List[str]) -> None:
+        """Новый список файлов (иконки перезапрашиваются по мере показа)."""
+        self._loader.cancel()
+        self.beginResetModel()
+        self._rows = [(Path(p).name, p) for p in sorted(paths, key=_sort_key)]
+        self._rows.append(("📝 Текст (CTA)", TEXT_ASSET))
+        self._reindex_rows()
+        self._icons.clear()
+        self.endResetModel()
+
+    def apply_changes(self, added: List[str], removed: List[str],
+                      changed: List[str]) -> None:
+        """
+        Изменения папки без сброса модели: удалённые файлы — removeRows,
+        новые — insertRows на своё место по сортировке, изменённые —
+        новая иконка и подсказка.
+        """
+        for path in removed:
+            row = self._row_of.get(path)
+            if row is None:
+                continue
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self._icons.pop(path, None)
+            self._reindex_rows()
+            self.endRemoveRows()
+
+        for path in sorted(added, key=_sort_key):
+            if path in self._row_of:
+                continue
+            keys = [_sort_key(p) for _, p in self._rows[:-1]]
+            row = bisect_left(keys, _sort_key(path))
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.insert(row, (Path(path).name, path))
+            self._reindex_rows()
+            self.endInsertRows()
+
+        for path in changed:
+            row = self._row_of.get(path)
+            if row is None:
+                continue
+            self._icons.pop(path, None)
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole,
+                                                 Qt.ItemDataRole.ToolTipRole])
+
+    def _reindex_rows(self) -> None:
+        self._row_of = {p: i for i, (_, p) in enumerate(self._rows)}
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        name, path = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return name
+        if role == Qt.ItemDataRole.UserRole:
+            return path
+        if role == Qt.ItemDataRole.ToolTipRole:
+            if path == TEXT_ASSET:
+                return "Текстовый призыв к действию"
+            tip = f"Двойной клик — разместить\n{name}"
+            # Метаданные — только если файл уже в индексе (без анализа здесь)
+            if asset_index.is_fresh(path):
+                tip += f"\n{asset_index.peek(path).describe()}"
+            return tip
+        if role == Qt.ItemDataRole.DecorationRole and path != TEXT_ASSET:
+            if path not in self._icons:
+                self._icons[path] = _PENDING
+                self._loader.request(path)
+            icon = self._icons[path]
+            return self._placeholder if icon is _PENDING else icon
+        return None
+
+    def _on_thumbnail(self, path: str, img) -> None:
+        row = self._row_of.get(path)
+        if row is None:
+            return
+        self._icons[path] = QIcon(QPixmap.fromImage(img)) if img is not None else None
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
 class ElementLibrary(QGroupBox):
     """
     Показывает все файлы из папки assets/.
     По клику активируется режим размещения.
+    Иконки загружаются в фоне (asset_thumbnails) только для видимых строк.
     """
 
     element_activated = pyqtSignal(str, str)  # (name, file_path)
@@ -41,13 +169,21 @@ class ElementLibrary(QGroupBox):
         super().__init__("БИБЛИОТЕКА ЭЛЕМЕНТОВ", parent)
         self._assets_dir = assets_dir
         self.setObjectName("sectionTitle")
+        # Состояние папки: путь → (размер, mtime) — для вычисления изменений
+        self._files: Dict[str, Tuple[int, int]] = {}
+        self._index_workers: Set[AssetIndexWorker] = set()
 
         layout = QVBoxLayout(self)
         layout.setSpacing(4)
 
-        self._list = QListWidget()
-        self._list.setIconSize(QSize(48, 48))
-        self._list.itemDoubleClicked.connect(self._on_item_activated)
+        self._loader = ThumbnailLoader(ICON_SIZE, self)
+        self._model = AssetListModel(self._loader, self)
+        self._list = QListView()
+        self._list.setModel(self._model)
+        self._list.setIconSize(QSize(ICON_SIZE, ICON_SIZE))
+        self._list.setUniformItemSizes(True)
+        self._list.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self._list.doubleClicked.connect(self._on_item_activated)
         layout.addWidget(self._list)
 
         # Кнопка загрузки пользовательского файла
@@ -57,43 +193,67 @@ class ElementLibrary(QGroupBox):
 
         self._refresh()
 
-    def _refresh(self):
-        """Перечитывает файлы из assets/."""
-        self._list.clear()
+        # Слежение за папкой: изменения применяются разницей, пачкой
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.setInterval(200)
+        self._sync_timer.timeout.connect(self._sync)
+        self._watcher = QFileSystemWatcher([self._assets_dir], self)
+        self._watcher.directoryChanged.connect(lambda _: self._sync_timer.start())
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Файлы assets/ поддерживаемых форматов: путь → (размер, mtime)."""
         assets = Path(self._assets_dir)
         if not assets.exists():
             assets.mkdir(parents=True, exist_ok=True)
+        files = {}
+        with os.scandir(assets) as it:
+            for entry in it:
+                if Path(entry.name).suffix.lower() not in SUPPORTED_ASSETS:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files[entry.path] = (st.st_size, st.st_mtime_ns)
+        return files
 
-        supported = {'.gif', '.png', '.jpg', '.jpeg', '.bmp', '.webp', '.apng', '.svg'}
-        files = sorted(assets.iterdir())
-        for f in files:
-            if f.suffix.lower() in supported:
-                item = QListWidgetItem(f.name)
-                item.setData(Qt.ItemDataRole.UserRole, str(f))
-                # Превью
-                icon = self._make_icon(str(f))
-                if icon:
-                    item.setIcon(icon)
-                item.setToolTip(f"Двойной клик — разместить\n{f.name}")
-                self._list.addItem(item)
-
-        # Заглушка «Текстовый CTA»
-        item = QListWidgetItem("📝 Текст (CTA)")
-        item.setData(Qt.ItemDataRole.UserRole, "__TEXT__")
-        item.setToolTip("Текстовый призыв к действию")
-        self._list.addItem(item)
-
-    def _make_icon(self, path: str) -> Optional[QIcon]:
-        """Создаёт иконку из файла."""
-        pm = QPixmap(path)
-        if pm.isNull():
-            return None
-        return QIcon(pm.scaled(48, 48, Qt.AspectRatioMode.KeepAspectRatio,
-                               Qt.TransformationMode.SmoothTransformation))
-
-    def _on_item_activated(self, item: QListWidgetItem):
-        fp = item.data(Qt.ItemDataRole.UserRole)
-        name = item.text()
+    def _refresh(self):
+        """Полностью перечитывает список файлов assets/ (без декодирования картинок)."""
+        self._files = self._scan()
+        self._model.set_files(list(self._files))
+        self._index_files([p for p in self._files if not asset_index.is_fresh(p)])
+
+    def _sync(self):
+        """Применяет к списку только изменения папки с прошлого просмотра."""
+        files = self._scan()
+        added = [p for p in files if p not in self._files]
+        removed = [p for p in self._files if p not in files]
+        changed = [p for p in files if p in self._files and files[p] != self._files[p]]
+        self._files = files
+        if not (added or removed or changed):
+            return
+        self._model.apply_changes(added, removed, changed)
+        if removed:
+            asset_index.forget(removed)
+        self._index_files(added + changed)
+
+    def _index_files(self, paths: List[str]):
+        """Фоновый анализ файлов без актуальной записи в индексе ассетов."""
+        if not paths:
+            if asset_index.dirty:
+                asset_index.save()
+            return
+        worker = AssetIndexWorker(paths, self)
+        self._index_workers.add(worker)
+        worker.finished.connect(lambda w=worker: self._index_workers.discard(w))
+        worker.start()
+
+    def _on_item_activated(self, index: QModelIndex):
+        fp = index.data(Qt.ItemDataRole.UserRole)
+        name = index.data(Qt.ItemDataRole.DisplayRole)
         self.element_activated.emit(name, fp)
 
     def _load_custom(self):
@@ -107,11 +267,61 @@ class ElementLibrary(QGroupBox):
             dest = Path(self._assets_dir) / Path(path).name
             if not dest.exists():
                 shutil.copy2(path, dest)
-            self._refresh()
+            # Новая строка сразу (наблюдатель потом изменений не найдёт)
+            self._sync()
             self.custom_file_loaded.emit(str(dest))
 
     def refresh_assets(self):
-        self._refresh()
+        self._sync()
+
+    def shutdown(self):
+        """Останавливает фоновую загрузку иконок и индексацию (при закрытии окна)."""
+        self._sync_timer.stop()
+        self._loader.shutdown()
+        for worker in list(self._index_workers):
+            worker.requestInterruption()
+            worker.wait()
+
+
+# ---------------------------------------------------------------------------
+# Выбор шрифта
+# ---------------------------------------------------------------------------
+class FontFamilyCombo(QComboBox):
+    """
+    Список семейств шрифтов, каждое — своим шрифтом. До готовности индекса
+    шрифтов показывает семейства Qt, затем — только семейства из индекса
+    (их найдёт рендер текста).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMaxVisibleItems(16)
+        self.set_families(QFontDatabase.families())
+
+    def set_families(self, families: List[str]) -> None:
+        """Заменить список; выбранное семейство сохраняется (или добавляется)."""
+        current = self.currentText()
+        blocked = self.blockSignals(True)
+        try:
+            self.clear()
+            for family in families:
+                self.addItem(family)
+                self.setItemData(self.count() - 1, QFont(family), Qt.ItemDataRole.FontRole)
+            if current:
+                self.set_current_family(current)
+        finally:
+            self.blockSignals(blocked)
+
+    def current_family(self) -> str:
+        return self.currentText()
+
+    def set_current_family(self, family: str) -> None:
+        """Выбрать семейство (без учёта регистра); неизвестное добавляется в конец."""
+        index = self.findText(family, Qt.MatchFlag.MatchFixedString)
+        if index < 0:
+            self.addItem(family)
+            index = self.count() - 1
+        self.setCurrentIndex(index)
 
 
 # ---------------------------------------------------------------------------
@@ -254,9 +464,9 @@ class ElementProperties(QGroupBox):
         form.addRow("Текст:", self.edit_text)
 
         # Шрифт
-        self.combo_font = QFontComboBox()
-        self.combo_font.setCurrentFont(QFont("Arial"))
-        self.combo_font.currentFontChanged.connect(self._on_text_change)
+        self.combo_font = FontFamilyCombo()
+        self.combo_font.set_current_family("Arial")
+        self.combo_font.currentIndexChanged.connect(self._on_text_change)
         form.addRow("Шрифт:", self.combo_font)
 
         # Размер шрифта
@@ -390,7 +600,7 @@ class ElementProperties(QGroupBox):
             self._show_text_widgets(is_text)
             if is_text:
                 self.edit_text.setText(self._element.text)
-                self.combo_font.setCurrentFont(QFont(self._element.font_family))
+                self.combo_font.set_current_family(self._element.font_family)
                 self.spin_font_size.setValue(self._element.font_size)
                 self._font_color = self._element.font_color
                 self._update_color_btn(self.btn_font_color, self._font_color)
@@ -430,6 +640,16 @@ class ElementProperties(QGroupBox):
         if on and self._element and self._element.until_end:
             self.spin_duration.setEnabled(False)
 
+    def set_font_families(self, families: List[str]):
+        """Список шрифтов из индекса шрифтов — только те, что найдёт рендер."""
+        if not families:
+            return
+        self._updating = True
+        try:
+            self.combo_font.set_families(families)
+        finally:
+            self._updating = False
+
     def _show_text_widgets(self, show: bool):
         """Показать/скрыть виджеты текстовых свойств."""
         for w in self._text_widgets:
@@ -512,7 +732,7 @@ class ElementProperties(QGroupBox):
         if self._updating or not self._element or not self._element.is_text:
             return
         self._element.text = self.edit_text.text()
-        self._element.font_family = self.combo_font.currentFont().family()
+        self._element.font_family = self.combo_font.current_family()
         self._element.font_size = self.spin_font_size.value()
         self._element.font_color = self._font_color
         self._element.text_bold = self.chk_bold.isChecked()
@@ -0,0 +1,143 @@
+"""
+startup.py — Замер холодного запуска интерфейса.
+
+main.py делит запуск на этапы (импорт PyQt6, импорт модулей приложения,
+QApplication, создание окна, первая отрисовка) и отмечает каждый через
+startup_profile.phase(). Для этапа записывается время и пакеты верхнего
+уровня, впервые загруженные на нём — разбивка в духе «python -X
+importtime»: новый тяжёлый импорт сразу виден в отчёте.
+
+После первой отрисовки окна фоново догружаются тяжёлые зависимости
+(PRELOAD_MODULES, см. lazy_import), затем отчёт пишется в
+cache/startup.log; краткая сводка — в stderr. Если тяжёлый модуль
+оказался загружен ещё до первой отрисовки, отчёт это отмечает.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional, Set, Tuple
+
+from app.cache_dir import CACHE_DIR
+from app.lazy_import import preload_modules, preload_times
+
+# Загружаются в фоне после показа окна; до первой отрисовки их быть не должно
+PRELOAD_MODULES = ("cv2", "moviepy", "git")
+
+STARTUP_LOG = CACHE_DIR / "startup.log"
+
+
+def _top_level_modules() -> Set[str]:
+    """Загруженные пакеты верхнего уровня, кроме стандартной библиотеки."""
+    return {top for top in (name.partition(".")[0] for name in list(sys.modules))
+            if top not in sys.stdlib_module_names}
+
+
+# ---------------------------------------------------------------------------
+# Профиль запуска
+# ---------------------------------------------------------------------------
+class StartupProfile:
+    """Этапы запуска: (название, секунды, новые пакеты верхнего уровня)."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._last = self._start
+        self._seen = _top_level_modules()
+        self.phases: List[Tuple[str, float, List[str]]] = []
+        self.first_paint: Optional[float] = None     # секунды от старта
+        self.eager_heavy: List[str] = []
+
+    def mark(self, name: str) -> None:
+        """Завершает этап name: время с предыдущей отметки и новые пакеты."""
+        now = time.perf_counter()
+        current = _top_level_modules()
+        new = sorted(m for m in current - self._seen if not m.startswith("_"))
+        self._seen = current
+        self.phases.append((name, now - self._last, new))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Этап запуска: with startup_profile.phase("…"): … Код между этапами
+        относится к следующему — сумма этапов равна времени до отметки.
+        """
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    # --- Первая отрисовка ---
+    def watch_first_paint(self, widget, on_done: Optional[Callable[[], None]] = None) -> None:
+        """
+        Отмечает первую отрисовку widget, затем запускает фоновую
+        догрузку PRELOAD_MODULES и запись отчёта. on_done — после
+        отметки (в GUI-потоке).
+        """
+        # Qt — только здесь: main.py замеряет и сам импорт PyQt6
+        from PyQt6.QtCore import QEvent, QObject
+
+        profile = self
+
+        class _FirstPaintFilter(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint:
+                    obj.removeEventFilter(self)
+                    self.deleteLater()
+                    profile._on_first_paint()
+                    if on_done is not None:
+                        on_done()
+                return False
+
+        # Родитель — сам виджет: фильтр живёт, пока не сработает
+        widget.installEventFilter(_FirstPaintFilter(widget))
+
+    def _on_first_paint(self) -> None:
+        self.mark("первая отрисовка")
+        self.first_paint = time.perf_counter() - self._start
+        self.eager_heavy = [m for m in PRELOAD_MODULES if m in sys.modules]
+        self._print_summary()
+        self.write_report()
+        preload_modules(PRELOAD_MODULES, on_done=self.write_report)
+
+    # --- Отчёт ---
+    def report(self) -> str:
+        lines = [f"Запуск {datetime.now():%Y-%m-%d %H:%M:%S}"]
+        width = max((len(name) for name, _, _ in self.phases), default=0)
+        for name, seconds, new in self.phases:
+            line = f"  {name.ljust(width)}  {seconds * 1000:7.1f} мс"
+            if new:
+                line += "  + " + ", ".join(new)
+            lines.append(line)
+        if self.first_paint is not None:
+            lines.append(f"  {'до первой отрисовки'.ljust(width)}  {self.first_paint * 1000:7.1f} мс")
+        if self.eager_heavy:
+            lines.append("  ВНИМАНИЕ: загружены до первой отрисовки: " + ", ".join(self.eager_heavy))
+        if preload_times:
+            lines.append("Фоновая догрузка после показа окна:")
+            for name, seconds in preload_times.items():
+                lines.append(f"  {name.ljust(width)}  {seconds * 1000:7.1f} мс")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self) -> None:
+        """Записывает отчёт в cache/startup.log (перезаписывается при каждом запуске)."""
+        try:
+            STARTUP_LOG.parent.mkdir(parents=True, exist_ok=True)
+            STARTUP_LOG.write_text(self.report(), encoding="utf-8")
+        except OSError:
+            pass
+
+    def _print_summary(self) -> None:
+        # В собранном exe без консоли stderr нет
+        if sys.stderr is None:
+            return
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds, _ in self.phases)
+        print(f"Запуск: первая отрисовка через {self.first_paint * 1000:.0f} мс ({parts} мс); "
+              f"подробно — {STARTUP_LOG}", file=sys.stderr, flush=True)
+
+
+# Профиль процесса (создаётся при первом импорте — в main.py до PyQt6)
+startup_profile = StartupProfile()
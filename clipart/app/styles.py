@@ -111,7 +111,7 @@ QSlider::sub-page:horizontal {
 }
 
 /* ===== Таблица ===== */
-QTableWidget {
+QTableView {
     background-color: #1e1e2e;
     color: #cdd6f4;
     gridline-color: #313244;
@@ -128,7 +128,7 @@ QHeaderView::section {
     font-weight: bold;
     font-size: 12px;
 }
-QTableWidget::item:selected {
+QTableView::item:selected {
     background-color: #45475a;
 }
 
@@ -150,8 +150,8 @@ QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
     height: 0px;
 }
 
-/* ===== Список (QListWidget) ===== */
-QListWidget {
+/* ===== Список (QListView) ===== */
+QListView {
     background-color: #181825;
     color: #cdd6f4;
     border: 1px solid #313244;
@@ -159,15 +159,15 @@ QListWidget {
     outline: none;
     font-size: 13px;
 }
-QListWidget::item {
+QListView::item {
     padding: 6px 10px;
     border-radius: 4px;
     margin: 2px 4px;
 }
-QListWidget::item:hover {
+QListView::item:hover {
     background-color: #313244;
 }
-QListWidget::item:selected {
+QListView::item:selected {
     background-color: #45475a;
     color: #89b4fa;
 }
@@ -0,0 +1,253 @@
+"""
+text_render.py — Растеризация текстовых CTA (общая для превью и рендера).
+
+Текст рисуется Pillow в маску покрытия (L), из неё собирается RGBA:
+подложка со скруглёнными углами, обводка и сам текст. Обводка строится
+по полю расстояний до контуров маски (cv2.distanceTransform) за один
+проход, а не (2w+1)²−1 повторными отрисовками текста со сдвигом: время
+не зависит от толщины обводки.
+
+Кеши:
+  • разрешение шрифта: (семейство, жирный, курсив) → файл шрифта —
+    поиск по индексу системных шрифтов (font_index);
+  • загруженные шрифты: (файл, размер) → FreeTypeFont;
+  • строки: (текст, шрифт, размер) → маска покрытия — повторная
+    отрисовка той же строки (другой цвет, обводка, подложка) не трогает
+    FreeType.
+
+Превью и рендер используют одни и те же функции и геометрию (отступы,
+толщина обводки, радиус подложки считаются от размера шрифта в пикселях),
+поэтому текст на экране совпадает с текстом в готовом видео.
+"""
+
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+from PIL import ImageDraw, ImageFont
+
+from app.font_index import font_index
+from app.lazy_import import lazy_module
+from app.models import OverlayElement
+
+# OpenCV — при первой отрисовке текста
+cv2 = lazy_module("cv2")
+
+# Минимальный размер шрифта элемента (pt) — как в прежнем рендере
+MIN_FONT_SIZE = 8
+# Прозрачность подложки текста (0–255)
+BG_ALPHA = 200
+# Наклон синтетического курсива (если у шрифта нет курсивного начертания)
+_FAUX_ITALIC_SHEAR = 0.2
+# Утолщение синтетического жирного: радиус = размер шрифта / _FAUX_BOLD_DIV
+_FAUX_BOLD_DIV = 32
+
+# FreeType-объекты Pillow не потокобезопасны: растеризация под замком
+_raster_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Разрешение шрифтов
+# ---------------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def resolve_font(family: str, bold: bool, italic: bool) -> Tuple[Optional[str], int, bool, bool]:
+    """
+    Файл шрифта для семейства и начертания по индексу шрифтов (font_index).
+    Возвращает (путь или None — встроенный шрифт Pillow, номер в коллекции,
+    начертание жирное, начертание курсивное).
+    """
+    face = font_index.find(family, bold, italic)
+    if face is None:
+        return None, 0, False, False
+    return face.path, face.index, face.bold, face.italic
+
+
+@lru_cache(maxsize=64)
+def _load_font(path: Optional[str], index: int, size: int):
+    """Шрифт нужного размера (FreeTypeFont), None в пути — встроенный шрифт."""
+    if path is None:
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            # Pillow < 10.1: встроенный шрифт только одного размера
+            return ImageFont.load_default()
+    return ImageFont.truetype(path, size, index=index)
+
+
+# ---------------------------------------------------------------------------
+# Кеш строк
+# ---------------------------------------------------------------------------
+@lru_cache(maxsize=256)
+def text_mask(text: str, family: str, bold: bool, italic: bool, size: int) -> np.ndarray:
+    """
+    Маска покрытия строки (uint8, H×W, только для чтения) шрифтом size px,
+    обрезанная по габаритам текста. Недостающие начертания синтезируются:
+    жирный — утолщением маски, курсив — наклоном.
+    """
+    path, index, has_bold, has_italic = resolve_font(family, bold, italic)
+    with _raster_lock:
+        font = _load_font(path, index, size)
+        draw = ImageDraw.Draw(PILImage.new("L", (1, 1)))
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        img = PILImage.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(img).text((-left, -top), text, font=font, fill=255)
+    mask = np.array(img)
+
+    if bold and not has_bold:
+        r = max(1, size // _FAUX_BOLD_DIV)
+        mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (r * 2 + 1,) * 2))
+    if italic and not has_italic:
+        h, w = mask.shape
+        dx = int(np.ceil(h * _FAUX_ITALIC_SHEAR))
+        m = np.float32([[1, -_FAUX_ITALIC_SHEAR, dx], [0, 1, 0]])
+        mask = cv2.warpAffine(mask, m, (w + dx, h), flags=cv2.INTER_LINEAR)
+
+    mask.setflags(write=False)
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Сборка RGBA
+# ---------------------------------------------------------------------------
+def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+    """Конвертирует hex-цвет (#RRGGBB) в (R, G, B); некорректный — белый."""
+    hex_color = (hex_color or "").lstrip("#")
+    if len(hex_color) == 6:
+        try:
+            return int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
+        except ValueError:
+            pass
+    return 255, 255, 255
+
+
+def text_metrics(size: int, outline: bool) -> Tuple[int, int, int]:
+    """(отступ, толщина обводки, радиус подложки) для шрифта size px."""
+    padding = int(size * 0.4)
+    outline_w = max(1, size // 12) if outline else 0
+    radius = max(1, round(size / 6))
+    return padding, outline_w, radius
+
+
+def _compose(layers: List[Tuple[Tuple[int, int, int], np.ndarray]]) -> np.ndarray:
+    """
+    Слои (цвет, покрытие uint8) снизу вверх → RGBA (прямая альфа).
+    Вклад слоя — его покрытие × прозрачность всех слоёв выше; цвет
+    пикселя — взвешенная сумма цветов слоёв, делённая на итоговую альфу.
+    """
+    h, w = layers[0][1].shape
+    weights = []
+    remaining = np.ones((h, w), dtype=np.float32)
+    for color, coverage in reversed(layers):
+        wk = coverage.astype(np.float32)
+        wk *= remaining * (1.0 / 255.0)
+        remaining -= wk
+        weights.append((color, wk))
+    alpha = 1.0 - remaining
+    inv_alpha = 255.0 / np.maximum(alpha, 1e-6)
+
+    channels = []
+    for c in range(3):
+        acc = np.zeros((h, w), dtype=np.float32)
+        for color, wk in weights:
+            if color[c]:
+                acc += wk * (color[c] / 255.0)
+        acc *= inv_alpha
+        channels.append(acc)
+    channels.append(alpha * 255.0)
+    out = np.empty((h, w, 4), dtype=np.uint8)
+    for c, acc in enumerate(channels):
+        acc += 0.5
+        np.clip(acc, 0, 255, out=acc)
+        out[..., c] = acc
+    return out
+
+
+def _outline_mask(glyphs: np.ndarray, width: int) -> np.ndarray:
+    """
+    Покрытие обводки толщиной width: поле расстояний до текста
+    (cv2.distanceTransform) с мягким краем в 1 px. Время не зависит
+    от width — в отличие от дилатации ядром (2w+1)².
+    """
+    _, outside = cv2.threshold(glyphs, 127, 255, cv2.THRESH_BINARY_INV)
+    dist = cv2.distanceTransform(outside, cv2.DIST_L2, cv2.DIST_MASK_5)
+    np.subtract(width + 1.0, dist, out=dist)
+    np.clip(dist, 0.0, 1.0, out=dist)
+    dist *= 255.0
+    dist += 0.5
+    return np.maximum(glyphs, dist.astype(np.uint8))
+
+
+def render_text(text: str, family: str, size: int, bold: bool, italic: bool,
+                color: str, outline_color: Optional[str] = None,
+                bg_color: Optional[str] = None) -> np.ndarray:
+    """
+    Текст как RGBA-массив (uint8, прямая альфа): подложка bg_color
+    (если задана), обводка outline_color (если задана) и текст color.
+    size — размер шрифта в пикселях.
+    """
+    size = max(1, int(size))
+    mask = text_mask(text, family, bold, italic, size)
+    padding, outline_w, radius = text_metrics(size, bool(outline_color))
+    mh, mw = mask.shape
+    off = padding + outline_w
+    h, w = mh + off * 2, mw + off * 2
+
+    glyphs = np.zeros((h, w), dtype=np.uint8)
+    glyphs[off:off + mh, off:off + mw] = mask
+
+    layers = []
+    if bg_color:
+        bg = np.zeros((h, w), dtype=np.uint8)
+        r = min(radius, (w - 1) // 2, (h - 1) // 2)
+        cv2.rectangle(bg, (r, 0), (w - 1 - r, h - 1), BG_ALPHA, -1)
+        cv2.rectangle(bg, (0, r), (w - 1, h - 1 - r), BG_ALPHA, -1)
+        for cx, cy in ((r, r), (w - 1 - r, r), (r, h - 1 - r), (w - 1 - r, h - 1 - r)):
+            cv2.circle(bg, (cx, cy), r, BG_ALPHA, -1, lineType=cv2.LINE_AA)
+        layers.append((hex_to_rgb(bg_color), bg))
+
+    if outline_color and outline_w > 0:
+        layers.append((hex_to_rgb(outline_color), _outline_mask(glyphs, outline_w)))
+
+    layers.append((hex_to_rgb(color), glyphs))
+    return _compose(layers)
+
+
+def text_size(text: str, family: str, size: int, bold: bool, italic: bool,
+              outline: bool) -> Tuple[int, int]:
+    """Размер картинки render_text (w, h) без сборки RGBA."""
+    size = max(1, int(size))
+    mh, mw = text_mask(text, family, bold, italic, size).shape
+    padding, outline_w, _ = text_metrics(size, outline)
+    off = padding + outline_w
+    return mw + off * 2, mh + off * 2
+
+
+# ---------------------------------------------------------------------------
+# Текстовый элемент
+# ---------------------------------------------------------------------------
+def element_font_px(elem: OverlayElement, factor: float) -> int:
+    """Размер шрифта элемента в пикселях: font_size × factor (factor — масштаб вывода)."""
+    return max(1, round(max(MIN_FONT_SIZE, elem.font_size) * factor))
+
+
+def render_text_element(elem: OverlayElement, factor: float) -> np.ndarray:
+    """
+    RGBA текстового CTA. factor — пикселей на пункт шрифта: в рендере
+    elem.scale / 100, в превью дополнительно × масштаб экрана.
+    """
+    return render_text(
+        elem.text, elem.font_family, element_font_px(elem, factor),
+        elem.text_bold, elem.text_italic, elem.font_color,
+        outline_color=elem.text_outline_color if elem.text_outline else None,
+        bg_color=elem.text_bg_color or None,
+    )
+
+
+def text_element_size(elem: OverlayElement, factor: float) -> Tuple[int, int]:
+    """Размер (w, h) картинки render_text_element без её сборки."""
+    return text_size(elem.text, elem.font_family, element_font_px(elem, factor),
+                     elem.text_bold, elem.text_italic, elem.text_outline)
@@ -3,12 +3,17 @@ video_preview.py — Виджет превью видео с наложение
 
 Использует OpenCV для чтения кадров и QPainter для отрисовки оверлеев.
 Поддерживает:
-  • воспроизведение / пауза
-  • перемотка через слайдер
+  • воспроизведение / пауза (кадры декодируются заранее в фоновом потоке)
+  • перемотка через слайдер (по индексу ключевых кадров, миниатюры при перетаскивании)
   • размещение элементов кликом
   • перетаскивание (drag) размещённых элементов
   • масштабирование угловыми маркерами
   • контекстное меню (удаление)
+
+Оверлеи рисуются из кеша готовых QPixmap (OverlayPixmapCache): пока
+состояние элемента, кадр GIF и размер на экране не меняются, элемент
+стоит один drawPixmap, а перерисовка из-за нового кадра видео не
+перестраивает ни одного оверлея.
 """
 
 from __future__ import annotations
@@ -16,14 +21,14 @@ from __future__ import annotations
 import os
 import time
 from pathlib import Path
-from typing import Optional, List, Dict
+from collections import OrderedDict
+from typing import Callable, Optional, List, Dict, Hashable, Tuple
 
-import cv2
 import numpy as np
 from PIL import Image as PILImage
 
 from PyQt6.QtCore import (
-    Qt, QTimer, QPointF, QRectF, QSize, pyqtSignal, QThread
+    Qt, QTimer, QPoint, QPointF, QRectF, QSize, QSettings, pyqtSignal, QThread
 )
 from PyQt6.QtGui import (
     QImage, QPixmap, QPainter, QColor, QPen, QCursor, QAction,
@@ -31,10 +36,22 @@ from PyQt6.QtGui import (
 )
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QPushButton,
-    QSizePolicy, QMenu, QFrame
+    QSizePolicy, QMenu, QFrame, QStyle
 )
 
+from app.chroma_key import remove_background
+from app.frame_decoder import FramePrefetcher, prepare_preview_frame
+from app.gif_decoder import DecodedGif, load_gif
+from app.gif_timeline import GifTimeline
+from app.keyframe_index import KeyframeIndex, get_keyframe_index
+from app.lazy_import import lazy_module
 from app.models import OverlayElement, Project
+from app.overlay_cache import file_digest
+from app.scrub_thumbnails import ThumbnailSprite, get_thumbnail_sprite
+from app.text_render import render_text_element, text_element_size
+
+# OpenCV — при открытии первого видео (или фоновой догрузкой после показа окна)
+cv2 = lazy_module("cv2")
 
 
 # ---------------------------------------------------------------------------
@@ -46,6 +63,7 @@ def remove_background_rgba(arr: np.ndarray, tolerance: int = 40) -> np.ndarray:
 
     Алгоритм: определяет цвет фона по четырём углам изображения,
     затем делает прозрачными все пиксели, близкие к этому цвету.
+    Реализация — общий движок chroma_key (тот же, что и в рендере).
 
     Args:
         arr: numpy-массив формы (H, W, 4) — RGBA
@@ -54,174 +72,394 @@ def remove_background_rgba(arr: np.ndarray, tolerance: int = 40) -> np.ndarray:
     Returns:
         numpy-массив (H, W, 4) с прозрачным фоном
     """
-    if arr.ndim != 3 or arr.shape[2] < 3:
-        return arr
-
-    h, w = arr.shape[:2]
-    result = arr.copy()
-
-    # Собираем цвета из четырёх углов (по несколько пикселей для надёжности)
-    corner_size = max(1, min(4, h // 10, w // 10))
-    corners = []
-    for cy, cx in [(0, 0), (0, w - corner_size), (h - corner_size, 0),
-                   (h - corner_size, w - corner_size)]:
-        patch = arr[cy:cy + corner_size, cx:cx + corner_size, :3]
-        corners.append(patch.reshape(-1, 3))
-
-    corner_pixels = np.concatenate(corners, axis=0)
+    return remove_background(arr, tolerance)
 
-    # Медианный цвет углов — это и есть фон
-    bg_color = np.median(corner_pixels, axis=0).astype(np.float32)
 
-    # Расстояние каждого пикселя до цвета фона (по всем каналам RGB)
-    rgb = result[:, :, :3].astype(np.float32)
-    diff = np.sqrt(np.sum((rgb - bg_color) ** 2, axis=2))
-
-    # Пиксели с расстоянием < tolerance → прозрачные
-    mask = diff < tolerance
-
-    # Плавный переход на краю допуска (anti-aliasing)
-    edge_zone = tolerance * 0.3
-    soft_mask = np.clip((diff - tolerance + edge_zone) / max(edge_zone, 1), 0, 1)
+# ---------------------------------------------------------------------------
+# Кеш кадров GIF-анимаций
+# ---------------------------------------------------------------------------
+# Лимит памяти GifCache по умолчанию (МБ) и допустимый диапазон настройки
+GIF_CACHE_DEFAULT_MB = 256
+GIF_CACHE_MIN_MB = 32
+GIF_CACHE_MAX_MB = 4096
 
-    # Применяем: где mask=True → альфа=0, на краю — плавно
-    if result.shape[2] == 4:
-        result[:, :, 3] = (result[:, :, 3].astype(np.float32) * soft_mask).astype(np.uint8)
-    else:
-        # Если нет альфа-канала — добавляем
-        alpha = (soft_mask * 255).astype(np.uint8)
-        result = np.dstack([result[:, :, :3], alpha])
 
-    return result
+def size_bucket(n: int) -> int:
+    """
+    Размер (px), округлённый вверх до сетки с шагом ~1/8 октавы:
+    16 px до 256, 32 px до 512 и т.д. Отличие от запрошенного — не больше
+    ~12 %, а плавное изменение масштаба элемента попадает в одну корзину.
+    """
+    n = max(1, int(n))
+    step = 1 << max(4, n.bit_length() - 4)
+    return -(-n // step) * step
 
 
-# ---------------------------------------------------------------------------
-# Кеш кадров GIF-анимаций
-# ---------------------------------------------------------------------------
 class GifCache:
     """
-    Загружает все кадры GIF / APNG и хранит их как numpy RGBA-массивы.
-    При запросе кадра может применить удаление фона и возвращает QPixmap.
+    Загружает GIF / APNG (через gif_decoder: индексы палитры без дубликатов
+    кадров) и статичные изображения.
+
+    QPixmap кадров хранятся уже уменьшенными до размера элемента на экране,
+    округлённого до корзины size_bucket(): сглаженное масштабирование
+    делается один раз на корзину, а не на каждую перерисовку.
+
+    Декодированные файлы и наборы QPixmap (файл × tolerance × корзина)
+    вытесняются по LRU с общим лимитом max_bytes: подбор bg_tolerance
+    в течение долгой сессии не накапливает память. Статистика — stats().
     """
 
-    def __init__(self):
-        # Сырые RGBA-массивы кадров
-        self._raw: Dict[str, List[np.ndarray]] = {}
+    def __init__(self, max_bytes: int = GIF_CACHE_DEFAULT_MB * 1024 * 1024):
+        # Декодированные кадры (RGBA разворачивается только по запросу)
+        self._raw: Dict[str, DecodedGif] = {}
         self._durations: Dict[str, List[int]] = {}  # мс на кадр
-        # Кеш QPixmap после удаления фона: ключ = (path, tolerance или -1)
-        self._px_cache: Dict[tuple, List[QPixmap]] = {}
+        self._timelines: Dict[str, GifTimeline] = {}
+        # QPixmap уникальных кадров: ключ = ("px", path, tolerance или -1, w, h),
+        # значение — список по уникальным кадрам (None — ещё не создан)
+        self._px_cache: Dict[tuple, List[Optional[QPixmap]]] = {}
+        # Порядок LRU и размер записей: ("raw", path) и ключи _px_cache
+        self._lru: "OrderedDict[tuple, int]" = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- Учёт памяти ---
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """Новый лимит памяти; лишнее вытесняется сразу."""
+        self._max_bytes = max(0, int(max_bytes))
+        self._evict()
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики для диагностики: попадания, промахи, вытеснения, байты."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "files": len(self._raw),
+            "variants": len(self._px_cache),
+        }
+
+    def _add_bytes(self, key: tuple, nbytes: int, keep: Tuple[tuple, ...] = ()) -> None:
+        """Учитывает nbytes за записью *key* и вытесняет старые записи (кроме keep)."""
+        self._lru[key] = self._lru.get(key, 0) + nbytes
+        self._lru.move_to_end(key)
+        self._bytes += nbytes
+        self._evict(keep + (key,))
+
+    def _evict(self, keep: Tuple[tuple, ...] = ()) -> None:
+        """Вытесняет самые давние записи, пока размер больше лимита."""
+        if self._bytes <= self._max_bytes:
+            return
+        for key in list(self._lru):
+            if self._bytes <= self._max_bytes:
+                break
+            if key in keep:
+                continue
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key: tuple) -> None:
+        self._bytes -= self._lru.pop(key, 0)
+        if key[0] == "raw":
+            path = key[1]
+            self._raw.pop(path, None)
+            self._durations.pop(path, None)
+            self._timelines.pop(path, None)
+        else:
+            self._px_cache.pop(key, None)
 
+    # --- Загрузка ---
     def load(self, path: str) -> None:
         if path in self._raw:
+            self._lru.move_to_end(("raw", path))
             return
         ext = Path(path).suffix.lower()
         if ext in ('.gif', '.apng'):
             self._load_animated(path)
         else:
             self._load_static(path)
+        self._add_bytes(("raw", path), self._raw[path].nbytes)
 
     def _load_animated(self, path: str) -> None:
-        frames: List[np.ndarray] = []
-        durations: List[int] = []
-        try:
-            pil_img = PILImage.open(path)
-            n = getattr(pil_img, 'n_frames', 1)
-            for i in range(n):
-                pil_img.seek(i)
-                frame_rgba = pil_img.convert("RGBA")
-                frames.append(np.array(frame_rgba))
-                dur = pil_img.info.get('duration', 100)
-                durations.append(dur if dur > 0 else 100)
-        except Exception:
-            frames = []
-            durations = []
-
-        if not frames:
+        decoded = load_gif(path)
+        if decoded is None or decoded.n_frames == 0:
             self._load_static(path)
             return
 
-        self._raw[path] = frames
+        durations = decoded.durations_ms
+        self._raw[path] = decoded
         self._durations[path] = durations
+        self._timelines[path] = GifTimeline(durations)
 
     def _load_static(self, path: str) -> None:
         try:
             pil_img = PILImage.open(path).convert("RGBA")
-            self._raw[path] = [np.array(pil_img)]
+            frame = np.array(pil_img)
         except Exception:
             # Заглушка
-            placeholder = np.zeros((64, 64, 4), dtype=np.uint8)
-            placeholder[:, :, 0] = 255
-            placeholder[:, :, 3] = 128
-            self._raw[path] = [placeholder]
+            frame = np.zeros((64, 64, 4), dtype=np.uint8)
+            frame[:, :, 0] = 255
+            frame[:, :, 3] = 128
+        self._raw[path] = DecodedGif.from_rgba([frame], [0])
         self._durations[path] = [0]
+        self._timelines[path] = GifTimeline([0])
+
+    def _unique_pixmap(self, path: str, unique: int, remove_bg: bool,
+                       tolerance: int, size: Tuple[int, int]) -> Optional[QPixmap]:
+        """QPixmap уникального кадра размером *size*, при необходимости без фона."""
+        decoded = self._raw[path]
+        cache_key = ("px", path, tolerance if remove_bg else -1) + size
+        pixmaps = self._px_cache.get(cache_key)
+        if pixmaps is None:
+            pixmaps = [None] * decoded.unique_count
+            self._px_cache[cache_key] = pixmaps
+            self._lru[cache_key] = 0
+        self._lru.move_to_end(cache_key)
+        if pixmaps[unique] is not None:
+            self.hits += 1
+            return pixmaps[unique]
+        self.misses += 1
+
+        if remove_bg:
+            # Фон оценивается один раз на файл, результат кешируется
+            # по (хеш файла, tolerance) и общий с рендером
+            digest = file_digest(path)
+            arr = decoded.rgba(unique, tolerance, ("file", digest) if digest else None)
+        else:
+            arr = decoded.rgba(unique)
 
-    def _get_pixmaps(self, path: str, remove_bg: bool, tolerance: int) -> List[QPixmap]:
-        """Возвращает список QPixmap, при необходимости с удалённым фоном."""
-        cache_key = (path, tolerance if remove_bg else -1)
-        if cache_key in self._px_cache:
-            return self._px_cache[cache_key]
-
-        raw_frames = self._raw.get(path, [])
-        pixmaps = []
-        for arr in raw_frames:
-            if remove_bg:
-                arr = remove_background_rgba(arr, tolerance)
-
-            h, w = arr.shape[:2]
-            if arr.shape[2] == 4:
-                fmt = QImage.Format.Format_RGBA8888
-            else:
-                fmt = QImage.Format.Format_RGB888
-
-            qimg = QImage(arr.data, w, h, arr.strides[0], fmt).copy()
-            pixmaps.append(QPixmap.fromImage(qimg))
-
-        self._px_cache[cache_key] = pixmaps
-        return pixmaps
-
-    def get_frame(self, path: str, time_ms: int,
-                  remove_bg: bool = False, tolerance: int = 40) -> Optional[QPixmap]:
-        """Получить нужный кадр для заданного момента времени (мс)."""
+        h, w = arr.shape[:2]
+        qimg = QImage(arr.data, w, h, arr.strides[0], QImage.Format.Format_RGBA8888)
+        if size == (w, h):
+            qimg = qimg.copy()
+        else:
+            # Масштабирование прямо из массива — QPixmap полного размера не нужен
+            qimg = qimg.scaled(size[0], size[1],
+                               Qt.AspectRatioMode.IgnoreAspectRatio,
+                               Qt.TransformationMode.SmoothTransformation)
+        px = QPixmap.fromImage(qimg)
+        pixmaps[unique] = px
+        self._add_bytes(cache_key, px.width() * px.height() * 4, keep=(("raw", path),))
+        return px
+
+    def frame_index(self, path: str, time_ms: int) -> int:
+        """Индекс кадра для момента времени (мс) по временной шкале."""
         if path not in self._raw:
             self.load(path)
-        if path not in self._raw:
+        timeline = self._timelines.get(path)
+        decoded = self._raw.get(path)
+        if timeline is None or decoded is None:
+            return 0
+        return min(timeline.index_at_ms(time_ms), decoded.n_frames - 1)
+
+    def frame_pixmap(self, path: str, index: int,
+                     remove_bg: bool = False, tolerance: int = 40,
+                     size: Optional[Tuple[int, int]] = None) -> Optional[QPixmap]:
+        """
+        Кадр с номером *index* (при необходимости с удалённым фоном).
+        size — нужный размер в пикселях устройства: возвращается кадр
+        размера корзины size_bucket() (не меньше запрошенного); None —
+        исходный размер.
+        """
+        self.load(path)
+        decoded = self._raw.get(path)
+        if decoded is None or decoded.n_frames == 0:
             return None
+        if size is None:
+            bucket = (decoded.width, decoded.height)
+        else:
+            bucket = (size_bucket(size[0]), size_bucket(size[1]))
+        unique = decoded.frame_map[max(0, min(index, decoded.n_frames - 1))]
+        return self._unique_pixmap(path, unique, remove_bg, tolerance, bucket)
 
-        frames = self._get_pixmaps(path, remove_bg, tolerance)
-        if not frames:
+    def aspect_ratio(self, path: str) -> Optional[float]:
+        """Отношение ширины к высоте (по первому кадру, без QPixmap)."""
+        if path not in self._raw:
+            self.load(path)
+        decoded = self._raw.get(path)
+        if decoded is None:
             return None
-        if len(frames) == 1:
-            return frames[0]
-
-        # Определяем кадр по суммарной длительности
-        durations = self._durations.get(path, [100])
-        total_dur = sum(durations)
-        if total_dur == 0:
-            return frames[0]
-        t = time_ms % total_dur
-        accum = 0
-        for i, dur in enumerate(durations):
-            accum += dur
-            if t < accum:
-                return frames[i]
-        return frames[-1]
+        return decoded.width / max(decoded.height, 1)
+
+    def get_frame(self, path: str, time_ms: int,
+                  remove_bg: bool = False, tolerance: int = 40) -> Optional[QPixmap]:
+        """Получить нужный кадр для заданного момента времени (мс)."""
+        return self.frame_pixmap(path, self.frame_index(path, time_ms),
+                                 remove_bg, tolerance)
 
     def invalidate(self, path: str) -> None:
         """Сбросить кеш QPixmap для файла (при изменении tolerance)."""
-        keys_to_remove = [k for k in self._px_cache if k[0] == path]
+        keys_to_remove = [k for k in self._px_cache if k[1] == path]
         for k in keys_to_remove:
-            del self._px_cache[k]
+            self._drop(k)
 
     def clear(self) -> None:
         self._raw.clear()
         self._durations.clear()
+        self._timelines.clear()
         self._px_cache.clear()
+        self._lru.clear()
+        self._bytes = 0
 
 
 # Глобальный кеш
 gif_cache = GifCache()
 
 
+def load_gif_cache_limit_setting() -> int:
+    """Загружает лимит памяти кеша GIF превью (МБ) из QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    value = s.value("preview/gif_cache_mb", GIF_CACHE_DEFAULT_MB, type=int)
+    return max(GIF_CACHE_MIN_MB, min(GIF_CACHE_MAX_MB, value))
+
+
+def save_gif_cache_limit_setting(limit_mb: int) -> None:
+    """Сохраняет лимит памяти кеша GIF превью (МБ) в QSettings."""
+    s = QSettings("VideoCTAEditor", "VideoCTAEditor")
+    s.setValue("preview/gif_cache_mb", limit_mb)
+
+
+# ---------------------------------------------------------------------------
+# Проверка существования файла (с кешем)
+# ---------------------------------------------------------------------------
+# Сколько секунд доверять результату os.path.exists
+_EXISTS_TTL = 2.0
+_exists_memo: Dict[str, Tuple[float, bool]] = {}
+
+
+def file_exists(path: str) -> bool:
+    """os.path.exists, закешированный на _EXISTS_TTL секунд."""
+    now = time.monotonic()
+    memo = _exists_memo.get(path)
+    if memo is not None and now - memo[0] < _EXISTS_TTL:
+        return memo[1]
+    exists = os.path.exists(path)
+    _exists_memo[path] = (now, exists)
+    return exists
+
+
+# ---------------------------------------------------------------------------
+# Кеш готовых QPixmap оверлеев
+# ---------------------------------------------------------------------------
+class OverlayPixmapCache:
+    """
+    LRU-кеш отрисованных оверлеев превью с лимитом по байтам.
+
+    Ключ описывает всё, что влияет на картинку: параметры элемента,
+    кадр GIF и размер на экране. Прозрачность (fade) в ключ не входит —
+    она применяется при рисовании через painter.setOpacity().
+    """
+
+    def __init__(self, max_bytes: int = 96 * 1024 * 1024):
+        self._max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, QPixmap]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _nbytes(px: QPixmap) -> int:
+        return px.width() * px.height() * 4
+
+    def get(self, key: Hashable) -> Optional[QPixmap]:
+        px = self._items.get(key)
+        if px is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return px
+
+    def put(self, key: Hashable, px: QPixmap) -> None:
+        nbytes = self._nbytes(px)
+        if nbytes > self._max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= self._nbytes(old)
+        self._items[key] = px
+        self._bytes += nbytes
+        while self._bytes > self._max_bytes and self._items:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= self._nbytes(evicted)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+# Глобальный кеш
+overlay_pixmap_cache = OverlayPixmapCache()
+
+
+# ---------------------------------------------------------------------------
+# Фоновое построение индекса ключевых кадров
+# ---------------------------------------------------------------------------
+class KeyframeIndexWorker(QThread):
+    """Загружает из кеша или строит индекс ключевых кадров видео."""
+
+    index_ready = pyqtSignal(str, object)   # (путь, KeyframeIndex | None)
+
+    def __init__(self, path: str, fps: float, parent=None):
+        super().__init__(parent)
+        self._path = path
+        self._fps = fps
+
+    def run(self):
+        try:
+            index = get_keyframe_index(self._path, self._fps)
+        except Exception:
+            index = None
+        self.index_ready.emit(self._path, index)
+
+
+class ThumbnailSpriteWorker(QThread):
+    """Загружает из кеша или строит спрайт миниатюр для перемотки."""
+
+    sprite_ready = pyqtSignal(str, object)   # (путь, ThumbnailSprite | None)
+
+    def __init__(self, path: str, fps: float, total_frames: int,
+                 video_size: tuple, keyframes: Optional[List[int]], parent=None):
+        super().__init__(parent)
+        self._path = path
+        self._fps = fps
+        self._total_frames = total_frames
+        self._video_size = video_size
+        self._keyframes = keyframes
+        self._stop = False
+
+    def stop(self):
+        """Прерывает построение (не ждёт завершения потока)."""
+        self._stop = True
+
+    def run(self):
+        try:
+            sprite = get_thumbnail_sprite(
+                self._path, self._fps, self._total_frames, self._video_size,
+                self._keyframes, should_stop=lambda: self._stop,
+            )
+        except Exception:
+            sprite = None
+        if not self._stop:
+            self.sprite_ready.emit(self._path, sprite)
+
+
 # ---------------------------------------------------------------------------
 # Основной виджет превью
 # ---------------------------------------------------------------------------
@@ -240,6 +478,10 @@ class VideoPreviewWidget(QWidget):
     PREVIEW_MAX_FPS = 24
     # Максимальная ширина кадра для превью (даунскейл экономит CPU и память)
     PREVIEW_MAX_WIDTH = 960
+    # CAP_PROP_POS_FRAMES в OpenCV (FFmpeg) ищет ключевой кадр перед
+    # (кадр − 16) и декодирует вперёд; перемотка ровно на ключевой кадр
+    # поэтому декодирует всю предыдущую GOP
+    CV_SEEK_BACKOFF = 16
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -249,6 +491,7 @@ class VideoPreviewWidget(QWidget):
 
         # Состояние видео
         self._cap: Optional[cv2.VideoCapture] = None
+        self._video_path: str = ""
         self._fps: float = 30.0
         self._total_frames: int = 0
         self._current_frame: int = 0
@@ -256,6 +499,20 @@ class VideoPreviewWidget(QWidget):
         self._video_h: int = 0
         self._duration: float = 0.0
         self._playing: bool = False
+        # Номер кадра, который вернёт следующий cap.read()
+        self._cap_next: int = 0
+
+        # Индекс ключевых кадров (None — ещё строится или недоступен)
+        self._kf_index: Optional[KeyframeIndex] = None
+        # Перетаскивание слайдера: показанный ключевой кадр и
+        # нужно ли продолжить воспроизведение после отпускания
+        self._scrub_keyframe: Optional[int] = None
+        self._resume_after_scrub: bool = False
+        # Миниатюры для перетаскивания слайдера (строятся в фоне)
+        self._thumbs: Optional[ThumbnailSprite] = None
+        self._thumbs_worker: Optional[ThumbnailSpriteWorker] = None
+        # Все запущенные фоновые потоки (ждём их при закрытии)
+        self._workers: set = set()
 
         # Текущий кадр (QPixmap)
         self._frame_pixmap: Optional[QPixmap] = None
@@ -284,6 +541,9 @@ class VideoPreviewWidget(QWidget):
         # Если видео 60fps, а превью ограничено 24fps, пропускаем кадры
         self._frame_skip: int = 1  # 1 = каждый кадр, 2 = каждый второй
 
+        # Фоновый декодер кадров (только во время воспроизведения)
+        self._prefetcher: Optional[FramePrefetcher] = None
+
         # Таймер воспроизведения
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._on_timer)
@@ -300,17 +560,80 @@ class VideoPreviewWidget(QWidget):
             return False
 
         self._cap = cap
+        self._video_path = path
         self._fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
         self._total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self._video_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self._video_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self._duration = self._total_frames / self._fps if self._fps > 0 else 0.0
         self._current_frame = 0
+        self._cap_next = 0
+        self._kf_index = None
+        self._thumbs = None
+        if self._thumbs_worker is not None:
+            self._thumbs_worker.stop()
+            self._thumbs_worker = None
+        self._scrub_keyframe = None
+        self._resume_after_scrub = False
 
         self._read_current_frame()
+        self._start_keyframe_index()
         self.update()
         return True
 
+    def _start_keyframe_index(self):
+        """Запускает фоновую загрузку/построение индекса ключевых кадров."""
+        worker = KeyframeIndexWorker(self._video_path, self._fps, self)
+        worker.index_ready.connect(self._on_keyframe_index)
+        self._start_worker(worker)
+
+    def _start_worker(self, worker: QThread):
+        self._workers.add(worker)
+        worker.finished.connect(lambda w=worker: self._workers.discard(w))
+        worker.finished.connect(worker.deleteLater)
+        worker.start()
+
+    def shutdown(self):
+        """Останавливает воспроизведение и дожидается фоновых потоков."""
+        self.pause()
+        for worker in list(self._workers):
+            if isinstance(worker, ThumbnailSpriteWorker):
+                worker.stop()
+        for worker in list(self._workers):
+            worker.wait()
+        self._workers.clear()
+
+    def _on_keyframe_index(self, path: str, index: Optional[KeyframeIndex]):
+        # Результат для ранее открытого видео игнорируем
+        if path != self._video_path:
+            return
+        self._kf_index = index
+        # Миниатюры строятся после индекса — по ключевым кадрам
+        worker = ThumbnailSpriteWorker(
+            path, self._fps, self._total_frames, self.video_size,
+            index.keyframes if index is not None else None, self,
+        )
+        worker.sprite_ready.connect(self._on_thumbnail_sprite)
+        self._thumbs_worker = worker
+        self._start_worker(worker)
+
+    def _on_thumbnail_sprite(self, path: str, sprite: Optional[ThumbnailSprite]):
+        if path == self._video_path:
+            self._thumbs = sprite
+            self._thumbs_worker = None
+
+    def thumbnail_pixmap(self, frame: int) -> Optional[QPixmap]:
+        """Миниатюра для кадра *frame* (None — миниатюры ещё не готовы)."""
+        if self._thumbs is None:
+            return None
+        rgb = self._thumbs.thumbnail_at(frame)
+        if rgb is None:
+            return None
+        h, w = rgb.shape[:2]
+        return QPixmap.fromImage(
+            QImage(rgb.data, w, h, 3 * w, QImage.Format.Format_RGB888).copy()
+        )
+
     # --- Управление проектом ---
     def set_project(self, project: Project):
         self._project = project
@@ -324,17 +647,34 @@ class VideoPreviewWidget(QWidget):
             preview_fps = min(self._fps, self.PREVIEW_MAX_FPS)
             self._frame_skip = max(1, round(self._fps / preview_fps))
             interval = max(1, int(1000 / preview_fps))
+
+            self._start_prefetcher()
             self._timer.start(interval)
 
     def pause(self):
         self._playing = False
         self._timer.stop()
+        self._stop_prefetcher()
+
+    def _start_prefetcher(self):
+        """Запускает фоновый декодер со следующего после текущего кадра."""
+        self._stop_prefetcher()
+        self._prefetcher = FramePrefetcher(
+            self._video_path, self._current_frame + self._frame_skip,
+            self._frame_skip, self._total_frames, self.PREVIEW_MAX_WIDTH,
+        )
+        self._prefetcher.start()
+
+    def _stop_prefetcher(self):
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
 
     def stop(self):
         self.pause()
         self._current_frame = 0
         if self._cap:
-            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._position_cap(0)
             self._read_current_frame()
         self.update()
 
@@ -345,16 +685,87 @@ class VideoPreviewWidget(QWidget):
             self.play()
 
     def seek(self, frame: int):
-        """Перемотка к указанному кадру."""
+        """
+        Точная перемотка к указанному кадру.
+
+        С индексом ключевых кадров перемотка выполняется, только если это
+        дешевле декодирования вперёд (grab()) с текущей позиции — например,
+        шаги вперёд в пределах GOP не перематывают декодер.
+        """
         if not self._cap:
             return
         frame = max(0, min(frame, self._total_frames - 1))
         self._current_frame = frame
-        self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        self._scrub_keyframe = None
+        self._position_cap(frame)
         self._read_current_frame()
+        if self._resume_after_scrub:
+            self._resume_after_scrub = False
+            self.play()
+        elif self._playing:
+            # Буфер декодера относится к старой позиции — начинаем заново
+            self._start_prefetcher()
+        self.time_changed.emit(self.current_time)
+        self.update()
+
+    def scrub(self, frame: int):
+        """
+        Быстрая перемотка во время перетаскивания слайдера.
+
+        Если готовы миниатюры — показывает миниатюру без обращения
+        к декодеру. Иначе — кадр у ближайшего предшествующего ключевого
+        кадра (не дальше CV_SEEK_BACKOFF от него), без повторного
+        декодирования, пока слайдер в пределах той же GOP. Время и оверлеи —
+        для запрошенного кадра. Точный кадр декодирует seek() после
+        отпускания слайдера.
+        """
+        if not self._cap:
+            return
+        if self._thumbs is None and self._kf_index is None:
+            # Ни миниатюр, ни индекса ещё нет — обычная точная перемотка
+            self.seek(frame)
+            return
+
+        if self._playing:
+            self._resume_after_scrub = True
+            self.pause()
+
+        frame = max(0, min(frame, self._total_frames - 1))
+        self._current_frame = frame
+        if self._thumbs is not None:
+            self._set_frame_rgb(self._thumbs.thumbnail_at(frame))
+            self.time_changed.emit(self.current_time)
+            self.update()
+            return
+        keyframe = self._kf_index.preceding(frame)
+        if keyframe != self._scrub_keyframe:
+            self._scrub_keyframe = keyframe
+            self._position_cap(min(frame, keyframe + self.CV_SEEK_BACKOFF))
+            self._read_current_frame()
         self.time_changed.emit(self.current_time)
         self.update()
 
+    def _position_cap(self, frame: int):
+        """Готовит cap так, чтобы следующий read() вернул кадр *frame*."""
+        if self._kf_index is None:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            self._cap_next = frame
+            return
+
+        # Стоимость — число кадров, которые придётся декодировать.
+        # Перемотка OpenCV попадает на ключевой кадр перед (frame − BACKOFF)
+        landing = self._kf_index.preceding(max(frame - self.CV_SEEK_BACKOFF, 0))
+        reseek_cost = frame - landing
+        if self._cap_next <= frame and frame - self._cap_next <= reseek_cost:
+            # Дешевле декодировать вперёд с текущей позиции
+            while self._cap_next < frame:
+                if not self._cap.grab():
+                    break
+                self._cap_next += 1
+        else:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            self._cap_next = frame
+
     def seek_time(self, t: float):
         """Перемотка к указанному времени (сек)."""
         if self._fps > 0:
@@ -415,19 +826,13 @@ class VideoPreviewWidget(QWidget):
         if not ret:
             self.pause()
             return
+        self._cap_next += 1
 
         # Даунскейл для превью — ключевая оптимизация CPU
-        h, w = frame.shape[:2]
-        if w > self.PREVIEW_MAX_WIDTH:
-            scale = self.PREVIEW_MAX_WIDTH / w
-            new_w = self.PREVIEW_MAX_WIDTH
-            new_h = int(h * scale)
-            # INTER_AREA — самый быстрый для уменьшения
-            frame = cv2.resize(frame, (new_w, new_h),
-                               interpolation=cv2.INTER_AREA)
-
-        # BGR → RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self._set_frame_rgb(prepare_preview_frame(frame, self.PREVIEW_MAX_WIDTH))
+
+    def _set_frame_rgb(self, frame_rgb: np.ndarray):
+        """RGB-кадр → QPixmap текущего кадра."""
         h, w, ch = frame_rgb.shape
         bytes_per_line = ch * w
         qimg = QImage(frame_rgb.data, w, h, bytes_per_line,
@@ -438,24 +843,22 @@ class VideoPreviewWidget(QWidget):
         """
         Вызывается таймером при воспроизведении.
 
-        Оптимизация: пропускает кадры (frame_skip) при высоком FPS видео,
-        чтобы превью работало на ≤24 fps и не грузило CPU.
-        Вместо чтения каждого кадра — перепрыгиваем через N кадров.
+        Кадры декодирует FramePrefetcher в фоновом потоке (с пропуском
+        кадров через grab() при высоком FPS видео), здесь только забираем
+        готовый кадр. Если кадр ещё не готов — тик пропускается, UI не ждёт.
         """
-        if not self._cap:
+        if not self._cap or self._prefetcher is None:
             self.pause()
             return
 
-        # Пропускаем кадры для снижения нагрузки
-        self._current_frame += self._frame_skip
-        if self._current_frame >= self._total_frames:
-            self._current_frame = 0
-            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        elif self._frame_skip > 1:
-            # При пропуске кадров нужно явно перемотать
-            self._cap.set(cv2.CAP_PROP_POS_FRAMES, self._current_frame)
+        item = self._prefetcher.get()
+        if item is None:
+            if self._prefetcher.finished:
+                self.pause()
+            return
 
-        self._read_current_frame()
+        self._current_frame, frame_rgb = item
+        self._set_frame_rgb(frame_rgb)
         self.time_changed.emit(self.current_time)
         self.update()
 
@@ -508,35 +911,23 @@ class VideoPreviewWidget(QWidget):
             return self._text_element_rect(elem, center, size)
 
         # Если есть кеш изображения, используем его пропорции
-        if elem.file_path and os.path.exists(elem.file_path):
-            px = gif_cache.get_frame(elem.file_path, int(self.current_time * 1000),
-                                     remove_bg=elem.remove_bg,
-                                     tolerance=elem.bg_tolerance)
-            if px and not px.isNull():
-                aspect = px.width() / max(px.height(), 1)
+        if elem.file_path and file_exists(elem.file_path):
+            aspect = gif_cache.aspect_ratio(elem.file_path)
+            if aspect:
                 w = size * aspect
                 h = size
                 return QRectF(center.x() - w / 2, center.y() - h / 2, w, h)
 
         return QRectF(center.x() - size / 2, center.y() - size / 2, size, size)
 
-    def _text_element_rect(self, elem: OverlayElement, center: QPointF, base_size: float) -> QRectF:
-        """Рассчитывает прямоугольник текстового элемента."""
-        # Масштаб шрифта относительно виджета
-        display_scale = self._display_rect.height() / max(self._video_h, 1) if self._video_h > 0 else 1.0
-        font_size = max(8, int(elem.font_size * display_scale * elem.scale / 100.0))
-
-        font = QFont(elem.font_family, font_size)
-        font.setBold(elem.text_bold)
-        font.setItalic(elem.text_italic)
-
-        from PyQt6.QtGui import QFontMetrics
-        fm = QFontMetrics(font)
-        text_rect = fm.boundingRect(elem.text)
-        padding = font_size * 0.3
-        w = text_rect.width() + padding * 2
-        h = text_rect.height() + padding * 2
+    def _text_scale(self) -> float:
+        """Пикселей виджета на пункт шрифта (без elem.scale)."""
+        return self._display_rect.height() / self._video_h if self._video_h > 0 else 1.0
 
+    def _text_element_rect(self, elem: OverlayElement, center: QPointF, base_size: float) -> QRectF:
+        """Прямоугольник текстового элемента — размер картинки text_render на экране."""
+        factor = self._text_scale() * elem.scale / 100.0
+        w, h = text_element_size(elem, factor)
         return QRectF(center.x() - w / 2, center.y() - h / 2, w, h)
 
     def _handle_rect(self, elem_rect: QRectF) -> QRectF:
@@ -550,10 +941,9 @@ class VideoPreviewWidget(QWidget):
             return None
         t = self.current_time
         # Проходим в обратном порядке (верхний элемент — последний)
-        for elem in reversed(self._project.elements):
-            if elem.is_visible_at(t):
-                if self._element_rect(elem).contains(pos):
-                    return elem.id
+        for elem in reversed(self._project.visible_elements_at(t)):
+            if self._element_rect(elem).contains(pos):
+                return elem.id
         return None
 
     # --- Отрисовка ---
@@ -580,7 +970,13 @@ class VideoPreviewWidget(QWidget):
         # Оверлеи
         if self._overlay_mode and self._project:
             t = self.current_time
-            for elem in self._project.elements:
+            elems = self._project.visible_elements_at(t)
+            # Выделенный, но невидимый сейчас элемент рисуется полупрозрачным
+            selected = self._project.get_element(self._selected_id) if self._selected_id else None
+            if selected is not None and selected not in elems:
+                elems.append(selected)
+                elems.sort(key=self._project.position_of)
+            for elem in elems:
                 self._draw_overlay(painter, elem, t)
 
         painter.end()
@@ -601,31 +997,18 @@ class VideoPreviewWidget(QWidget):
         painter.save()
         painter.setOpacity(opacity)
 
-        # === Текстовый элемент ===
-        if elem.is_text and elem.text:
-            self._draw_text_overlay(painter, elem, rect)
+        px = self._overlay_pixmap(elem, rect, t)
+        if px is not None:
+            # Готовый оверлей нужного размера — один drawPixmap
+            painter.drawPixmap(rect.topLeft(), px)
         else:
-            # === Графический элемент (GIF/PNG) ===
-            px = None
-            if elem.file_path and os.path.exists(elem.file_path):
-                gif_cache.load(elem.file_path)
-                elapsed_ms = int((t - elem.start_time) * 1000)
-                px = gif_cache.get_frame(
-                    elem.file_path, max(0, elapsed_ms),
-                    remove_bg=elem.remove_bg,
-                    tolerance=elem.bg_tolerance
-                )
-
-            if px and not px.isNull():
-                painter.drawPixmap(rect.toRect(), px)
-            else:
-                # Заглушка — цветной прямоугольник с текстом
-                painter.setBrush(QBrush(QColor(137, 180, 250, int(opacity * 180))))
-                painter.setPen(QPen(QColor(205, 214, 244), 1))
-                painter.drawRoundedRect(rect, 6, 6)
-                painter.setFont(QFont("Segoe UI", 9))
-                painter.setPen(QColor(205, 214, 244))
-                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, elem.name)
+            # Заглушка — цветной прямоугольник с текстом
+            painter.setBrush(QBrush(QColor(137, 180, 250, int(opacity * 180))))
+            painter.setPen(QPen(QColor(205, 214, 244), 1))
+            painter.drawRoundedRect(rect, 6, 6)
+            painter.setFont(QFont("Segoe UI", 9))
+            painter.setPen(QColor(205, 214, 244))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, elem.name)
 
         painter.restore()
 
@@ -644,40 +1027,65 @@ class VideoPreviewWidget(QWidget):
             painter.drawEllipse(handle)
             painter.restore()
 
-    def _draw_text_overlay(self, painter: QPainter, elem: OverlayElement, rect: QRectF):
-        """Рисует текстовый CTA-элемент."""
-        # Масштаб шрифта
-        display_scale = self._display_rect.height() / max(self._video_h, 1) if self._video_h > 0 else 1.0
-        font_size = max(8, int(elem.font_size * display_scale * elem.scale / 100.0))
-
-        font = QFont(elem.font_family, font_size)
-        font.setBold(elem.text_bold)
-        font.setItalic(elem.text_italic)
-        painter.setFont(font)
-
-        # Фон текста
-        if elem.text_bg_color:
-            bg_color = QColor(elem.text_bg_color)
-            bg_color.setAlpha(180)
-            painter.setBrush(QBrush(bg_color))
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.drawRoundedRect(rect, 6, 6)
+    def _overlay_pixmap(self, elem: OverlayElement, rect: QRectF, t: float) -> Optional[QPixmap]:
+        """
+        Готовый QPixmap оверлея размером *rect* из overlay_pixmap_cache.
+        При промахе отрисовывается один раз. None — рисовать заглушку.
+        """
+        w, h = max(1, round(rect.width())), max(1, round(rect.height()))
+        dpr = self.devicePixelRatioF()
 
-        # Обводка текста (рисуем текст смещённым в 8 направлениях)
-        if elem.text_outline:
-            outline_color = QColor(elem.text_outline_color)
-            painter.setPen(outline_color)
-            outline_w = max(1, font_size // 15)
-            for dx in range(-outline_w, outline_w + 1):
-                for dy in range(-outline_w, outline_w + 1):
-                    if dx == 0 and dy == 0:
-                        continue
-                    shifted = rect.translated(dx, dy)
-                    painter.drawText(shifted, Qt.AlignmentFlag.AlignCenter, elem.text)
-
-        # Основной текст
-        painter.setPen(QColor(elem.font_color))
-        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, elem.text)
+        if elem.is_text and elem.text:
+            key = ("text", elem.text, elem.font_family, elem.font_size, elem.scale,
+                   elem.text_bold, elem.text_italic, elem.font_color,
+                   elem.text_bg_color, elem.text_outline, elem.text_outline_color,
+                   round(self._display_rect.height()), w, h, dpr)
+        else:
+            if not elem.file_path or not file_exists(elem.file_path):
+                return None
+            elapsed_ms = max(0, int((t - elem.start_time) * 1000))
+            index = gif_cache.frame_index(elem.file_path, elapsed_ms)
+            tolerance = elem.bg_tolerance if elem.remove_bg else -1
+            key = ("file", elem.file_path, tolerance, index, w, h, dpr)
+
+        px = overlay_pixmap_cache.get(key)
+        if px is not None:
+            return px
+
+        if key[0] == "text":
+            # Тот же растеризатор, что и в рендере, сразу в пикселях экрана
+            factor = self._text_scale() * elem.scale / 100.0 * dpr
+            arr = render_text_element(elem, factor)
+            ah, aw = arr.shape[:2]
+            pw, ph = int(w * dpr), int(h * dpr)
+            qimg = QImage(arr.data, aw, ah, arr.strides[0], QImage.Format.Format_RGBA8888)
+            if (aw, ah) == (pw, ph):
+                qimg = qimg.copy()
+            else:
+                qimg = qimg.scaled(pw, ph, Qt.AspectRatioMode.IgnoreAspectRatio,
+                                   Qt.TransformationMode.SmoothTransformation)
+            px = QPixmap.fromImage(qimg)
+            px.setDevicePixelRatio(dpr)
+        else:
+            # Кадр из корзины близкого размера: доводка до точного размера
+            # дешёвая и при плавном изменении масштаба не трогает исходник
+            pw, ph = int(w * dpr), int(h * dpr)
+            src = gif_cache.frame_pixmap(elem.file_path, index,
+                                         remove_bg=elem.remove_bg,
+                                         tolerance=elem.bg_tolerance,
+                                         size=(pw, ph))
+            if src is None or src.isNull():
+                return None
+            if src.width() == pw and src.height() == ph:
+                px = src.copy()
+            else:
+                px = src.scaled(pw, ph,
+                                Qt.AspectRatioMode.IgnoreAspectRatio,
+                                Qt.TransformationMode.SmoothTransformation)
+            px.setDevicePixelRatio(dpr)
+
+        overlay_pixmap_cache.put(key, px)
+        return px
 
     # --- События мыши ---
     def mousePressEvent(self, event):
@@ -794,7 +1202,8 @@ class PlaybackControlBar(QFrame):
       [⏮] [▶/⏸] [⏭]  ──────────  0:05.2 / 1:23.0
     """
 
-    seek_requested = pyqtSignal(int)   # номер кадра
+    seek_requested = pyqtSignal(int)    # номер кадра (точная перемотка)
+    scrub_requested = pyqtSignal(int)   # номер кадра (перетаскивание слайдера)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -823,8 +1232,48 @@ class PlaybackControlBar(QFrame):
         self.time_label.setMinimumWidth(160)
         layout.addWidget(self.time_label)
 
+        # Всплывающая миниатюра над слайдером при перетаскивании
+        self._thumb_provider: Optional[Callable[[int], Optional[QPixmap]]] = None
+        self._thumb_popup = QLabel(self, Qt.WindowType.ToolTip)
+        self._thumb_popup.setObjectName("scrubThumbnail")
+        self._thumb_popup.setStyleSheet("border: 1px solid #89b4fa; background: #11111b;")
+        self._thumb_popup.hide()
+
         # Подключения
-        self.slider.sliderMoved.connect(lambda val: self.seek_requested.emit(val))
+        # Во время перетаскивания — быстрый показ по ключевым кадрам,
+        # точное декодирование — после отпускания
+        self.slider.sliderMoved.connect(self._on_slider_moved)
+        self.slider.sliderReleased.connect(self._on_slider_released)
+
+    def set_thumbnail_provider(self, provider: Optional[Callable[[int], Optional[QPixmap]]]):
+        """Источник миниатюр: кадр → QPixmap или None (миниатюр ещё нет)."""
+        self._thumb_provider = provider
+
+    def _on_slider_moved(self, value: int):
+        self.scrub_requested.emit(value)
+        self._show_thumbnail(value)
+
+    def _on_slider_released(self):
+        self._thumb_popup.hide()
+        self.seek_requested.emit(self.slider.value())
+
+    def _show_thumbnail(self, value: int):
+        """Показывает миниатюру над ручкой слайдера."""
+        pixmap = self._thumb_provider(value) if self._thumb_provider else None
+        if pixmap is None:
+            self._thumb_popup.hide()
+            return
+        self._thumb_popup.setPixmap(pixmap)
+        self._thumb_popup.adjustSize()
+        x = QStyle.sliderPositionFromValue(
+            self.slider.minimum(), self.slider.maximum(), value, self.slider.width()
+        )
+        popup = self._thumb_popup.size()
+        pos = self.slider.mapToGlobal(
+            QPoint(x - popup.width() // 2, -popup.height() - 6)
+        )
+        self._thumb_popup.move(pos)
+        self._thumb_popup.show()
 
     def set_duration(self, total_frames: int, fps: float):
         self.slider.setMaximum(max(0, total_frames - 1))
@@ -12,16 +12,24 @@ OpenCV для превью, GitPython для выгрузки на GitHub.
 
 import sys
 import os
+import multiprocessing
 
 # Добавляем корневую директорию проекта в sys.path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QFont
+# Замер запуска — до импорта PyQt6 (отчёт в cache/startup.log)
+from app.startup import startup_profile
 
-from app.styles import APP_STYLESHEET
-from app.main_window import MainWindow
+with startup_profile.phase("импорт PyQt6"):
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtGui import QFont
+
+# Тяжёлые зависимости (MoviePy, OpenCV, GitPython) здесь не импортируются:
+# они загружаются при первом использовании или фоново после показа окна
+with startup_profile.phase("импорт модулей приложения"):
+    from app.styles import APP_STYLESHEET
+    from app.main_window import MainWindow
 
 
 def main():
@@ -30,24 +38,29 @@ def main():
     # Включаем высокий DPI
     os.environ["QT_ENABLE_HIGHDPI_SCALING"] = "1"
 
-    app = QApplication(sys.argv)
-    app.setApplicationName("Video CTA Overlay Editor")
-    app.setOrganizationName("VideoCTAEditor")
-    app.setApplicationVersion("1.0.0")
+    with startup_profile.phase("QApplication"):
+        app = QApplication(sys.argv)
+        app.setApplicationName("Video CTA Overlay Editor")
+        app.setOrganizationName("VideoCTAEditor")
+        app.setApplicationVersion("1.0.0")
 
-    # Шрифт по умолчанию
-    font = QFont("Segoe UI", 10)
-    app.setFont(font)
+        # Шрифт по умолчанию
+        font = QFont("Segoe UI", 10)
+        app.setFont(font)
 
-    # Применяем стиль
-    app.setStyleSheet(APP_STYLESHEET)
+        # Применяем стиль
+        app.setStyleSheet(APP_STYLESHEET)
 
     # Создаём и показываем главное окно
-    window = MainWindow()
+    with startup_profile.phase("главное окно"):
+        window = MainWindow()
+    startup_profile.watch_first_paint(window)
     window.show()
 
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
+    # Нужно для пула процессов пакетного рендера в собранном exe (PyInstaller)
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+bench_compositor.py — FrameCompositor против полнокадровой композиции MoviePy.
+
+На синтетическом фоне 1920×1080 и 3840×2160 накладывает несколько
+небольших RGBA-оверлеев (с прозрачностью и разными интервалами
+видимости) двумя способами и печатает среднее время на кадр:
+
+  • MoviePy — CompositeVideoClip из ImageClip (прежний путь рендера):
+    get_frame(t) собирает полный кадр с float-масками;
+  • FrameCompositor.composite — смешивание на месте только в
+    прямоугольниках активных оверлеев (compositor.py).
+
+Кодирование не входит в замер — только композиция кадра. Для проверки
+печатается и средняя разница кадров между способами (0–255).
+
+Запуск (из папки clipart/):
+    python scripts/bench_compositor.py
+    python scripts/bench_compositor.py --frames 50 --overlays 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from app.compositor import FrameCompositor, make_layer
+from app.models import OverlayElement
+
+DURATION = 10.0
+SIZES = ((1920, 1080), (3840, 2160))
+
+
+# ---------------------------------------------------------------------------
+# Тестовые данные
+# ---------------------------------------------------------------------------
+def make_overlays(count: int, width: int, height: int,
+                  rng: np.random.Generator) -> List[Tuple[OverlayElement, np.ndarray, int, int]]:
+    """Оверлеи ~10% ширины кадра: (элемент, RGBA, x, y), с мягкой альфой."""
+    side = max(32, width // 10)
+    yy, xx = np.mgrid[0:side, 0:side]
+    dist = np.hypot(xx - side / 2, yy - side / 2) / (side / 2)
+    alpha = (np.clip(1.2 - dist, 0, 1) * 255).astype(np.uint8)
+
+    overlays = []
+    for i in range(count):
+        rgba = np.empty((side, side, 4), dtype=np.uint8)
+        rgba[..., :3] = rng.integers(0, 256, 3, dtype=np.uint8)
+        rgba[..., 3] = alpha
+        x = int(rng.integers(0, width - side))
+        y = int(rng.integers(0, height - side))
+        start = i * DURATION / (count * 2)
+        elem = OverlayElement(name=f"o{i}", start_time=start,
+                              duration=DURATION - start, opacity=90)
+        overlays.append((elem, rgba, x, y))
+    return overlays
+
+
+# ---------------------------------------------------------------------------
+# Способы композиции
+# ---------------------------------------------------------------------------
+def moviepy_composite(background: np.ndarray, overlays, times) -> Tuple[float, List[np.ndarray]]:
+    from moviepy import CompositeVideoClip, ImageClip
+
+    h, w = background.shape[:2]
+    clips = [ImageClip(background).with_duration(DURATION)]
+    for elem, rgba, x, y in overlays:
+        clips.append(ImageClip(rgba, transparent=True)
+                     .with_position((x, y))
+                     .with_start(elem.start_time)
+                     .with_duration(elem.duration)
+                     .with_opacity(elem.opacity / 100.0))
+    comp = CompositeVideoClip(clips, size=(w, h))
+
+    frames = []
+    start = time.perf_counter()
+    for t in times:
+        frames.append(comp.get_frame(t).astype(np.uint8))
+    return (time.perf_counter() - start) / len(times), frames
+
+
+def frame_compositor(background: np.ndarray, overlays, times) -> Tuple[float, List[np.ndarray]]:
+    h, w = background.shape[:2]
+    layers = [make_layer(elem, x, y, [rgba]) for elem, rgba, x, y in overlays]
+    compositor = FrameCompositor(layers, w, h)
+
+    # composite() возвращает общий буфер: копия для сравнения — вне замера
+    frames = []
+    elapsed = 0.0
+    for t in times:
+        start = time.perf_counter()
+        frame = compositor.composite(background, t)
+        elapsed += time.perf_counter() - start
+        frames.append(frame.copy())
+    return elapsed / len(times), frames
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--frames", type=int, default=30, help="кадров на замер")
+    parser.add_argument("--overlays", type=int, default=4, help="число оверлеев")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    times = np.linspace(0, DURATION - 0.01, args.frames)
+    for width, height in SIZES:
+        background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        overlays = make_overlays(args.overlays, width, height, rng)
+
+        mp_time, mp_frames = moviepy_composite(background, overlays, times)
+        fc_time, fc_frames = frame_compositor(background, overlays, times)
+        diff = np.mean([np.mean(np.abs(a.astype(np.int16) - b.astype(np.int16)))
+                        for a, b in zip(mp_frames, fc_frames)])
+        print(f"{width}×{height}, {args.overlays} оверлея(ев), {args.frames} кадров:")
+        print(f"  MoviePy CompositeVideoClip {mp_time * 1000:8.1f} мс/кадр")
+        print(f"  FrameCompositor            {fc_time * 1000:8.1f} мс/кадр"
+              f"  (×{mp_time / fc_time:.0f})")
+        print(f"  разница кадров (0–255): {diff:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+bench_elements.py — Поиск и перестановка элементов проекта: индекс id против перебора.
+
+Строит проект из 1 000 и 10 000 элементов и печатает среднее время
+одного вызова:
+
+  • Project.get_element и move_element_up/down — позиция по словарю
+    id → индекс (models.py);
+  • линейный перебор списка elements — как до появления индекса.
+
+Id для запросов выбираются случайно по всему списку, так что перебор
+в среднем проходит половину элементов.
+
+Запуск (из папки clipart/):
+    python scripts/bench_elements.py
+    python scripts/bench_elements.py --calls 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.models import OverlayElement, Project
+
+SIZES = (1_000, 10_000)
+
+
+# ---------------------------------------------------------------------------
+# Линейный перебор (прежняя реализация)
+# ---------------------------------------------------------------------------
+def scan_get_element(project: Project, elem_id: str) -> Optional[OverlayElement]:
+    for elem in project.elements:
+        if elem.id == elem_id:
+            return elem
+    return None
+
+
+def scan_move_up(project: Project, elem_id: str) -> bool:
+    els = project.elements
+    for i, elem in enumerate(els):
+        if elem.id == elem_id:
+            if i == 0:
+                return False
+            els[i], els[i - 1] = els[i - 1], els[i]
+            return True
+    return False
+
+
+def scan_move_down(project: Project, elem_id: str) -> bool:
+    els = project.elements
+    for i, elem in enumerate(els):
+        if elem.id == elem_id:
+            if i >= len(els) - 1:
+                return False
+            els[i], els[i + 1] = els[i + 1], els[i]
+            return True
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Замер
+# ---------------------------------------------------------------------------
+def per_call(fn: Callable[[str], object], ids: List[str]) -> float:
+    """Среднее время одного вызова fn(id), секунды."""
+    start = time.perf_counter()
+    for elem_id in ids:
+        fn(elem_id)
+    return (time.perf_counter() - start) / len(ids)
+
+
+def make_project(count: int) -> Project:
+    return Project(elements=[OverlayElement(name=f"e{i}", start_time=i * 0.1)
+                             for i in range(count)])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=2000, help="вызовов на замер")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for count in SIZES:
+        indexed = make_project(count)
+        scanned = make_project(count)
+        ids = [e.id for e in indexed.elements]
+        queries = [rng.choice(ids) for _ in range(args.calls)]
+        scan_queries = [scanned.elements[ids.index(q)].id for q in queries]
+
+        rows = [
+            ("get_element",
+             per_call(indexed.get_element, queries),
+             per_call(lambda i: scan_get_element(scanned, i), scan_queries)),
+            ("move_element_up",
+             per_call(indexed.move_element_up, queries),
+             per_call(lambda i: scan_move_up(scanned, i), scan_queries)),
+            ("move_element_down",
+             per_call(indexed.move_element_down, queries),
+             per_call(lambda i: scan_move_down(scanned, i), scan_queries)),
+        ]
+        # Обе копии проделали одни и те же перестановки
+        assert [e.name for e in indexed.elements] == [e.name for e in scanned.elements]
+
+        print(f"{count} элементов, {args.calls} вызовов:")
+        for name, fast, slow in rows:
+            print(f"  {name:18s} индекс {fast * 1e6:8.2f} мкс   перебор {slow * 1e6:9.2f} мкс"
+                  f"   (×{slow / fast:.0f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
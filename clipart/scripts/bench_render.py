@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+bench_render.py — Сравнение движков рендера: MoviePy и ffmpeg filter_complex.
+
+Генерирует тестовое видео (по умолчанию 1920×1080, 30 fps, 10 с, со
+звуком), рендерит один и тот же проект обоими движками (CPU, libx264)
+и печатает время рендера и среднюю абсолютную разницу кадров между
+результатами — проверка, что ffmpeg-движок совпадает с MoviePy.
+
+Проект: текст с обводкой и подложкой, PNG с прозрачностью и fade,
+GIF из assets/ (если есть) с удалением фона.
+
+Запуск (из папки clipart/):
+    python scripts/bench_render.py
+    python scripts/bench_render.py --size 1280x720 --duration 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+from PIL import Image as PILImage, ImageDraw
+
+from app.lazy_import import lazy_module
+from app.models import OverlayElement, Project
+from app.render_engine import BACKEND_FFMPEG, BACKEND_MOVIEPY, get_ffmpeg_exe, render_project
+
+cv2 = lazy_module("cv2")
+
+
+# ---------------------------------------------------------------------------
+# Тестовые данные
+# ---------------------------------------------------------------------------
+def make_video(path: str, width: int, height: int, fps: int, duration: float) -> None:
+    """Тестовое видео testsrc2 + синус (libx264, быстрый пресет)."""
+    subprocess.run(
+        [get_ffmpeg_exe(), "-v", "error", "-y",
+         "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}",
+         "-f", "lavfi", "-i", "sine=frequency=440",
+         "-t", str(duration), "-c:v", "libx264", "-preset", "ultrafast",
+         "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path],
+        check=True,
+    )
+
+
+def make_png(path: str, size: int = 256) -> None:
+    """Полупрозрачный круг с градиентом — PNG с альфа-каналом."""
+    img = PILImage.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for r in range(size // 2, 0, -4):
+        c = int(255 * r / (size / 2))
+        draw.ellipse((size // 2 - r, size // 2 - r, size // 2 + r, size // 2 + r),
+                     fill=(255, c, 64, 220))
+    img.save(path)
+
+
+def make_project(video_path: str, png_path: str, duration: float) -> Project:
+    elements = [
+        OverlayElement(name="text", is_text=True, text="Подпишись!",
+                       font_family="DejaVu Sans", font_size=48,
+                       text_bg_color="#202040", start_time=0.0,
+                       duration=duration, x_percent=50, y_percent=85),
+        OverlayElement(name="png", file_path=png_path, start_time=1.0,
+                       duration=max(1.0, duration - 2.0), x_percent=80,
+                       y_percent=25, scale=60, opacity=90,
+                       fade_in=0.5, fade_out=0.5),
+    ]
+    gif = ROOT / "assets" / "output (1).gif"
+    if gif.exists():
+        elements.append(OverlayElement(
+            name="gif", file_path=str(gif), start_time=0.5,
+            duration=max(1.0, duration - 1.0), x_percent=20, y_percent=30,
+            scale=80, remove_bg=True))
+    return Project(video_path=video_path, elements=elements)
+
+
+# ---------------------------------------------------------------------------
+# Замер
+# ---------------------------------------------------------------------------
+def mean_frame_diff(path_a: str, path_b: str) -> tuple:
+    """(средняя |a−b| по всем кадрам и каналам, максимум по кадрам, число кадров)."""
+    cap_a, cap_b = cv2.VideoCapture(path_a), cv2.VideoCapture(path_b)
+    diffs = []
+    try:
+        while True:
+            ok_a, fa = cap_a.read()
+            ok_b, fb = cap_b.read()
+            if not (ok_a and ok_b):
+                break
+            diffs.append(float(np.mean(cv2.absdiff(fa, fb))))
+    finally:
+        cap_a.release()
+        cap_b.release()
+    if not diffs:
+        return float("nan"), float("nan"), 0
+    return float(np.mean(diffs)), float(np.max(diffs)), len(diffs)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", default="1920x1080", help="размер видео, ШxВ")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    with tempfile.TemporaryDirectory(prefix="bench_render_") as tmp:
+        video = os.path.join(tmp, "source.mp4")
+        png = os.path.join(tmp, "overlay.png")
+        print(f"Видео: {width}×{height}, {args.fps} fps, {args.duration:g} с")
+        make_video(video, width, height, args.fps, args.duration)
+        make_png(png)
+
+        outputs = {}
+        times = {}
+        for backend in (BACKEND_MOVIEPY, BACKEND_FFMPEG):
+            out = os.path.join(tmp, f"{backend}.mp4")
+            project = make_project(video, png, args.duration)
+            start = time.perf_counter()
+            render_project(project, out, use_gpu=False, backend=backend)
+            times[backend] = time.perf_counter() - start
+            outputs[backend] = out
+            print(f"  {backend:8s} {times[backend]:7.2f} с")
+
+        speedup = times[BACKEND_MOVIEPY] / times[BACKEND_FFMPEG]
+        mean, worst, n = mean_frame_diff(outputs[BACKEND_MOVIEPY], outputs[BACKEND_FFMPEG])
+        print(f"Ускорение ffmpeg: ×{speedup:.2f}")
+        print(f"Разница кадров (0–255): средняя {mean:.2f}, худший кадр {worst:.2f}, кадров {n}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())